@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+
+from llm import RateLimitedBackend, RateLimiter
+from scheduler import SchedulingBackend
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class BatchRunner:
+    """
+    MCPClient'ı arayüz olmadan toplu işler için çalıştırır.
+
+    Girdi JSONL dosyası satır satır okunur; her satır bağımsız bir sohbettir
+    (`{"id": ..., "prompt": "..."}` ya da çok turlu `{"id": ..., "turns": [...]}`).
+    Sohbetler sunucu havuzunu ve araç kataloğunu paylaşarak eşzamanlı
+    çalıştırılır, sonuçlar tamamlandıkça çıktı dosyasına eklenir. Çıktıda
+    hatasız kaydı bulunan kimlikler yeniden çalıştırılmaz, böylece yarıda
+    kalan bir iş kaldığı yerden devam eder.
+
+    Args:
+        client: Sunuculara bağlanmış MCPClient
+        concurrency: Aynı anda çalışacak sohbet sayısı
+        rpm: LLM istekleri için dakikalık sınır. None ise sınırsız.
+    """
+
+    def __init__(self, client, concurrency: int = 8, rpm: Optional[float] = None):
+        self.client = client
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rpm) if rpm else None
+        if self.limiter:
+            # Sınırlayıcı zamanlayıcının altına konur; yeniden denemeler ve
+            # yedek istekler de sağlayıcıya giden her istek gibi token bekler
+            if isinstance(self.client.llm, SchedulingBackend):
+                self.client.llm.backend = RateLimitedBackend(self.client.llm.backend, self.limiter)
+            else:
+                self.client.llm = RateLimitedBackend(self.client.llm, self.limiter)
+        self.latencies = []
+        self.errors = 0
+        self.skipped = 0
+
+    @staticmethod
+    def completed_ids(output_path: str) -> set:
+        """Çıktı dosyasında hatasız tamamlanmış kimlikleri döndürür"""
+        done = set()
+        if not os.path.exists(output_path):
+            return done
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Kesintide yarım yazılmış son satır
+                    continue
+                if "error" not in record:
+                    done.add(str(record["id"]))
+        return done
+
+    @staticmethod
+    def _invalid_reason(item) -> Optional[str]:
+        """Kayıt çalıştırılamıyorsa nedenini döndürür"""
+        if not isinstance(item, dict):
+            return f"Kayıt nesne ya da metin olmalı, {type(item).__name__} geldi"
+        if "turns" in item:
+            turns = item["turns"]
+            if not isinstance(turns, list) or not turns or not all(isinstance(turn, str) for turn in turns):
+                return "'turns' boş olmayan bir metin listesi olmalı"
+        elif not isinstance(item.get("prompt"), str) or not item["prompt"]:
+            return "Kayıtta metin 'prompt' ya da 'turns' alanı yok"
+        return None
+
+    @staticmethod
+    def _read_items(input_path: str):
+        """
+        Girdi kayıtlarını okur. Okunamayan ya da geçersiz satırlar iş
+        durdurulmadan `invalid` alanıyla döner; bunların kimliği (verilmemişse)
+        None'dır, kullanıcı kimlikleriyle karışmasın diye satır numarası ayrı tutulur.
+        """
+        with open(input_path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    # Bozuk satır tüm işi durdurmaz; satır numarasıyla hata kaydı olur
+                    yield {"id": None, "line": number, "invalid": f"Geçersiz JSON: {e}"}
+                    continue
+                if isinstance(item, str):
+                    item = {"prompt": item}
+                reason = BatchRunner._invalid_reason(item)
+                if reason:
+                    user_id = item.get("id") if isinstance(item, dict) else None
+                    yield {"id": user_id, "line": number, "invalid": reason}
+                    continue
+                item.setdefault("id", number)
+                yield item
+
+    async def run(self, input_path: str, output_path: str) -> dict:
+        done = self.completed_ids(output_path)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        started = time.perf_counter()
+
+        with open(output_path, "a", encoding="utf-8") as output:
+            async def worker():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    record = await self._run_item(item)
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                # Girdi bellekte tutulmaz; kuyruk dolunca okuma bekler
+                for item in self._read_items(input_path):
+                    if "invalid" in item:
+                        self.errors += 1
+                        record = {"id": item["id"], "line": item["line"], "error": item["invalid"]}
+                        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        output.flush()
+                        continue
+                    if str(item["id"]) in done:
+                        self.skipped += 1
+                        continue
+                    await queue.put(item)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "completed": len(self.latencies),
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_per_min": round(len(self.latencies) / elapsed * 60, 2) if elapsed else 0,
+            "p50_latency_ms": round(_percentile(self.latencies, 50), 1),
+            "p99_latency_ms": round(_percentile(self.latencies, 99), 1)
+        }
+
+    async def _run_item(self, item: dict) -> dict:
+        conversation = self.client.new_conversation()
+        turns = item["turns"] if "turns" in item else [item["prompt"]]
+        record = {"id": item["id"]}
+        started = time.perf_counter()
+        responses = []
+        try:
+            for turn in turns:
+                responses.append(await conversation.process_query(turn))
+                if conversation.last_error:
+                    raise conversation.last_error
+        except Exception as e:
+            record["error"] = str(e)
+            self.errors += 1
+        latency = (time.perf_counter() - started) * 1000
+        if "error" not in record:
+            self.latencies.append(latency)
+        record["response"] = responses[-1] if responses else None
+        if len(turns) > 1:
+            record["responses"] = responses
+        record["latency_ms"] = round(latency, 1)
+        return record
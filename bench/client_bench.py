@@ -0,0 +1,257 @@
+"""
+MCPClient için çevrimdışı performans ölçümü.
+
+Together API'si yerine `fake_llm.py`, YouTube sunucusu yerine `fake_mcp.py`
+kullanılır; ağ erişimi ve API anahtarı gerekmez. Ölçülenler:
+
+- sequential: ardışık turların gecikmesi (p50/p99) ve ilk token süresi (TTFT)
+- concurrent: `--concurrency` eşzamanlı sohbetle dakikadaki tur sayısı
+- gui_thread: GUI'deki gibi AsyncioThread üzerinden gönderilen turların gecikmesi
+- long_session: uzun bir sohbette Python belleğinin büyümesi (tracemalloc)
+
+`--json` ile sonuçlar dosyaya yazılır; `--baseline` verilirse sonuçlar bu
+dosyayla karşılaştırılır ve `--max-regression` oranından fazla kötüleşme
+varsa çıkış kodu 1 olur (CI için).
+
+Kullanım:
+    python bench/client_bench.py --json bench_sonuc.json
+    python bench/client_bench.py --baseline bench_sonuc.json --max-regression 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+# Karşılaştırmada büyümesi kötüleşme sayılan metrikler; geri kalanlarda düşüş kötüleşmedir
+LOWER_IS_BETTER = ("latency", "ttft", "memory")
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def summarize(latencies: list, ttfts: list) -> dict:
+    return {
+        "turns": len(latencies),
+        "p50_latency_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_latency_ms": round(percentile(latencies, 99) * 1000, 2),
+        "p50_ttft_ms": round(percentile(ttfts, 50) * 1000, 2),
+        "p99_ttft_ms": round(percentile(ttfts, 99) * 1000, 2)
+    }
+
+
+def write_server_launcher(directory: str, latency: float, payload: int) -> str:
+    """
+    Sahte MCP sunucusunu ayarlarıyla başlatan bir script yazar.
+
+    stdio sunucuları yalnızca güvenli ortam değişkenlerini devraldığı için
+    ayarlar doğrudan scriptin içine yazılır.
+    """
+    path = os.path.join(directory, "fake.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            "import os, runpy\n"
+            f"os.environ['FAKE_MCP_LATENCY'] = {str(latency)!r}\n"
+            f"os.environ['FAKE_MCP_PAYLOAD'] = {str(payload)!r}\n"
+            f"runpy.run_path({str(ROOT / 'bench' / 'fake_mcp.py')!r}, run_name='__main__')\n")
+    return path
+
+
+async def timed_turn(conversation, query: str):
+    """Bir turu çalıştırır; (toplam süre, ilk token süresi) döndürür"""
+    start = time.perf_counter()
+    first = None
+    async for _ in conversation.stream_query(query):
+        if first is None:
+            first = time.perf_counter() - start
+    if conversation.last_error:
+        raise conversation.last_error
+    return time.perf_counter() - start, first or 0.0
+
+
+async def bench_sequential(client, turns: int) -> dict:
+    conversation = client.new_conversation()
+    latencies, ttfts = [], []
+    for i in range(turns):
+        latency, ttft = await timed_turn(conversation, f"soru {i}")
+        latencies.append(latency)
+        ttfts.append(ttft)
+    return summarize(latencies, ttfts)
+
+
+async def bench_concurrent(client, concurrency: int, turns: int) -> dict:
+    latencies, ttfts = [], []
+
+    async def conversation_worker(n):
+        conversation = client.new_conversation()
+        for i in range(turns):
+            latency, ttft = await timed_turn(conversation, f"sohbet {n} soru {i}")
+            latencies.append(latency)
+            ttfts.append(ttft)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation_worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = summarize(latencies, ttfts)
+    result["concurrency"] = concurrency
+    result["throughput_turns_per_min"] = round(len(latencies) / elapsed * 60, 1)
+    return result
+
+
+def bench_gui_thread(runner, client, turns: int) -> dict:
+    """
+    Turları GUI'deki gibi ayrı iş parçacığındaki döngüye gönderir; token'lar
+    çağıran iş parçacığına kuyrukla taşınır (Tk'nin `after` döngüsüne benzer).
+    """
+    conversation = client.new_conversation()
+    latencies, ttfts = [], []
+    for i in range(turns):
+        tokens = queue.SimpleQueue()
+        done = object()
+
+        async def produce(query):
+            try:
+                async for token in conversation.stream_query(query):
+                    tokens.put(token)
+            finally:
+                tokens.put(done)
+
+        start = time.perf_counter()
+        runner.submit(produce(f"soru {i}"))
+        first = None
+        while tokens.get() is not done:
+            if first is None:
+                first = time.perf_counter() - start
+        latencies.append(time.perf_counter() - start)
+        ttfts.append(first or 0.0)
+    return summarize(latencies, ttfts)
+
+
+async def bench_long_session(client, turns: int, samples: int = 5) -> dict:
+    """Uzun bir sohbette izlenen bellek; ısınma turlarından sonraki büyüme raporlanır"""
+    conversation = client.new_conversation()
+    warmup = max(1, turns // 10)
+    for i in range(warmup):
+        await timed_turn(conversation, f"ısınma {i}")
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    curve = []
+    step = max(1, turns // samples)
+    for i in range(turns):
+        await timed_turn(conversation, f"uzun sohbet {i}")
+        if (i + 1) % step == 0:
+            curve.append(round((tracemalloc.get_traced_memory()[0] - baseline) / 1024, 1))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "turns": turns,
+        "memory_growth_kb": curve[-1] if curve else 0.0,
+        "memory_peak_kb": round((peak - baseline) / 1024, 1),
+        "memory_curve_kb": curve,
+        "context_tokens": conversation.context.total_tokens
+    }
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """Temel sonuçlara göre izin verilen oranı aşan kötüleşmeleri listeler"""
+    regressions = []
+    for scenario, metrics in results.items():
+        if scenario == "config":
+            continue
+        for name, value in metrics.items():
+            old = baseline.get(scenario, {}).get(name)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or old <= 0:
+                continue
+            if name in ("turns", "concurrency", "context_tokens"):
+                continue
+            if any(key in name for key in LOWER_IS_BETTER):
+                worse = value > old * (1 + max_regression)
+            else:
+                worse = value < old * (1 - max_regression)
+            if worse:
+                regressions.append(f"{scenario}.{name}: {old} -> {value}")
+    return regressions
+
+
+def run(args) -> dict:
+    llm = FakeLLMServer(ttft=args.ttft, token_delay=args.token_delay,
+                        tokens=args.tokens, tool_rate=args.tool_rate).start()
+    os.environ["TOGETHER_BASE_URL"] = llm.base_url
+    os.environ.setdefault("TOGETHER_API", "bench")
+
+    from d1 import MCPClient
+    from gui import AsyncioThread
+
+    workdir = tempfile.mkdtemp()
+    server = write_server_launcher(workdir, args.tool_latency, args.payload)
+    runner = AsyncioThread()
+    client = MCPClient(max_concurrent_tools=args.concurrency)
+    client.pool.manifest_path = os.path.join(workdir, "manifest.json")
+    results = {}
+    try:
+        runner.run(client.connect_to_servers([server]))
+        results["sequential"] = runner.run(bench_sequential(client, args.turns))
+        results["concurrent"] = runner.run(bench_concurrent(client, args.concurrency, args.turns))
+        results["gui_thread"] = bench_gui_thread(runner, client, args.turns)
+        results["long_session"] = runner.run(bench_long_session(client, args.session_turns))
+    finally:
+        runner.run(client.cleanup(), timeout=15)
+        runner.stop()
+        llm.stop()
+    results["config"] = {
+        "ttft_s": args.ttft, "token_delay_s": args.token_delay, "tokens": args.tokens,
+        "tool_rate": args.tool_rate, "tool_latency_s": args.tool_latency, "payload_chars": args.payload,
+        "llm_requests": llm.requests
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCPClient çevrimdışı performans ölçümü")
+    parser.add_argument("--turns", type=int, default=30, help="senaryo başına tur sayısı")
+    parser.add_argument("--concurrency", type=int, default=8, help="eşzamanlı sohbet sayısı")
+    parser.add_argument("--session-turns", type=int, default=200, help="uzun sohbetteki tur sayısı")
+    parser.add_argument("--ttft", type=float, default=0.05, help="sahte LLM ilk token gecikmesi, saniye")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="sahte LLM token gecikmesi, saniye")
+    parser.add_argument("--tokens", type=int, default=20, help="sahte LLM yanıt uzunluğu, token")
+    parser.add_argument("--tool-rate", type=float, default=0.5, help="araç çağıran tur oranı (0-1)")
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="sahte araç gecikmesi, saniye")
+    parser.add_argument("--payload", type=int, default=2000, help="sahte araç yanıt boyutu, karakter")
+    parser.add_argument("--json", metavar="PATH", help="sonuçları JSON olarak yaz")
+    parser.add_argument("--baseline", metavar="PATH", help="karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="izin verilen kötüleşme oranı (0.25 = %%25)")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print("Performans kötüleşmesi:", *regressions, sep="\n  ", file=sys.stderr)
+            sys.exit(1)
+        print("Temel sonuçlara göre kötüleşme yok.")
+
+
+if __name__ == "__main__":
+    main()
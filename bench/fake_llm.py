@@ -0,0 +1,163 @@
+"""
+Ölçümler için OpenAI uyumlu sahte LLM sunucusu.
+
+`/v1/chat/completions` uç noktasını hem tek seferlik hem SSE akışı olarak
+yanıtlar. İlk token gecikmesi, token başına gecikme ve yanıt uzunluğu
+ayarlanabilir. İstekte araç listesi varsa ve son mesaj kullanıcıdansa,
+`tool_rate` oranında ilk araç için bir araç çağrısı döndürülür; araç
+sonucundan sonra gelen istekler her zaman metinle yanıtlanır.
+
+Together istemcisi `TOGETHER_BASE_URL` ortam değişkeniyle bu sunucuya
+yönlendirilir, böylece MCPClient hiç değiştirilmeden ölçülebilir.
+
+Kullanım:
+    python bench/fake_llm.py --port 8765 --ttft 0.2 --tokens 50
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMServer:
+    """
+    Arka planda çalışan sahte LLM sunucusu.
+
+    Args:
+        host: Dinlenecek adres
+        port: Dinlenecek port (0 ise boş bir port seçilir)
+        ttft: İlk token'dan önceki gecikme, saniye
+        token_delay: Token'lar arası gecikme, saniye
+        tokens: Metin yanıtındaki token sayısı
+        tool_rate: Araç çağrısı döndürülecek kullanıcı mesajlarının oranı (0-1)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, ttft: float = 0.05,
+                 token_delay: float = 0.0, tokens: int = 20, tool_rate: float = 0.5):
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.tool_rate = tool_rate
+        self.requests = 0
+        self._user_turns = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _wants_tool(self, body: dict) -> bool:
+        messages = body.get("messages") or []
+        if not body.get("tools") or not messages or messages[-1].get("role") != "user":
+            return False
+        # Oran deterministik uygulanır: her 1/tool_rate kullanıcı turundan biri araç çağırır
+        with self._lock:
+            self._user_turns += 1
+            turn = self._user_turns
+        return int(turn * self.tool_rate) != int((turn - 1) * self.tool_rate)
+
+    def _reply(self, body: dict) -> dict:
+        """Yanıtı OpenAI mesajı biçiminde üretir"""
+        with self._lock:
+            self.requests += 1
+        if self._wants_tool(body):
+            name = body["tools"][0]["function"]["name"]
+            return {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": name, "arguments": "{}"}
+            }]}
+        return {"role": "assistant", "content": " ".join(f"tok{i}" for i in range(self.tokens))}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                reply = server._reply(body)
+                base = {"id": f"fake-{uuid.uuid4().hex[:8]}", "created": int(time.time()),
+                        "model": body.get("model", "fake")}
+
+                time.sleep(server.ttft)
+                if not body.get("stream"):
+                    payload = json.dumps({**base, "object": "chat.completion", "choices": [{
+                        "index": 0, "message": reply,
+                        "finish_reason": "tool_calls" if reply.get("tool_calls") else "stop"
+                    }]}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for delta in self._deltas(reply):
+                    chunk = {**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": delta}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    if server.token_delay:
+                        time.sleep(server.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            @staticmethod
+            def _deltas(reply: dict):
+                if reply.get("tool_calls"):
+                    for index, call in enumerate(reply["tool_calls"]):
+                        yield {"tool_calls": [{"index": index, **call}]}
+                    return
+                words = reply["content"].split(" ")
+                for i, word in enumerate(words):
+                    yield {"content": word if i == 0 else " " + word}
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sahte OpenAI uyumlu LLM sunucusu")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.05, help="ilk token gecikmesi, saniye")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="token başına gecikme, saniye")
+    parser.add_argument("--tokens", type=int, default=20, help="yanıttaki token sayısı")
+    parser.add_argument("--tool-rate", type=float, default=0.5, help="araç çağrısı oranı (0-1)")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(port=args.port, ttft=args.ttft, token_delay=args.token_delay,
+                           tokens=args.tokens, tool_rate=args.tool_rate).start()
+    print(f"Sahte LLM: {server.base_url}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Ölçümler için sahte MCP sunucusu.
+
+Tek bir `work` aracı sunar; gecikmesi ve döndürdüğü metnin boyutu ortam
+değişkenleriyle ayarlanır. Harness tarafından stdio üzerinden başlatılır.
+
+Ortam değişkenleri:
+    FAKE_MCP_LATENCY: Araç gecikmesi, saniye (varsayılan 0.05)
+    FAKE_MCP_PAYLOAD: Araç yanıtının boyutu, karakter (varsayılan 2000)
+"""
+import asyncio
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+LATENCY = float(os.getenv("FAKE_MCP_LATENCY", "0.05"))
+PAYLOAD = int(os.getenv("FAKE_MCP_PAYLOAD", "2000"))
+
+mcp = FastMCP("fake", log_level="WARNING")
+
+
+@mcp.tool()
+async def work(query: str = "") -> str:
+    """Simulated tool that waits for a fixed latency and returns a payload of fixed size.
+
+    Args:
+        query: Free-form input, echoed at the start of the result
+    """
+    await asyncio.sleep(LATENCY)
+    head = f"result for {query!r}: "
+    return head + "x" * max(0, PAYLOAD - len(head))
+
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
@@ -0,0 +1,205 @@
+"""
+server.py için yerel yük testi.
+
+Together API'si yerine `fake_llm.py`, MCP sunucusu yerine `fake_mcp.py`
+kullanılır; HTTP sunucusu aynı süreçte uvicorn ile başlatılır ve istemciler
+gerçek HTTP/SSE bağlantılarıyla konuşur. İki tür kullanıcı çalıştırılır:
+
+- light: her biri tek oturumda ardışık tur gönderen `--users` kullanıcı
+- heavy: `--heavy-streams` paralel oturumla sürekli tur gönderen tek kullanıcı
+
+Adil sıralama çalışıyorsa heavy kullanıcı, light kullanıcıların gecikmesini
+kendi payından fazla artıramaz; sınırı aşan istekleri 429 ile reddedilir.
+
+Kullanım:
+    python bench/server_load.py --users 8 --heavy-streams 16 --max-active 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from client_bench import percentile, write_server_launcher  # noqa: E402
+from fake_llm import FakeLLMServer  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def summarize(latencies: list, ttfts: list, waits: list) -> dict:
+    return {
+        "turns": len(latencies),
+        "p50_latency_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_latency_ms": round(percentile(latencies, 99) * 1000, 2),
+        "p50_ttft_ms": round(percentile(ttfts, 50) * 1000, 2),
+        "p99_ttft_ms": round(percentile(ttfts, 99) * 1000, 2),
+        "queued_turns": len(waits)
+    }
+
+
+class UserStats:
+    def __init__(self):
+        self.latencies = []
+        self.ttfts = []
+        self.waits = []
+        self.rejected = 0
+        self.errors = 0
+
+
+async def turn(http, session_id: str, user: str, query: str, stats: UserStats):
+    """Bir turu SSE ile çalıştırır; reddedilirse kısa bir süre sonra yeniden dener"""
+    while True:
+        start = time.perf_counter()
+        first = None
+        async with http.stream("POST", f"/sessions/{session_id}/messages", json={"message": query},
+                               headers={"X-User": user}) as response:
+            if response.status_code in (429, 503):
+                stats.rejected += 1
+                await response.aread()
+                await asyncio.sleep(0.05)
+                continue
+            response.raise_for_status()
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    if event == "token" and first is None:
+                        first = time.perf_counter() - start
+                    elif event == "queued":
+                        stats.waits.append(json.loads(line[5:])["position"])
+                    elif event == "error":
+                        stats.errors += 1
+        stats.latencies.append(time.perf_counter() - start)
+        stats.ttfts.append(first or 0.0)
+        return
+
+
+async def user_sessions(http, user: str, sessions: int, turns: int, stats: UserStats, stop=None):
+    async def worker(n):
+        response = await http.post("/sessions", headers={"X-User": user})
+        response.raise_for_status()
+        session_id = response.json()["session"]
+        i = 0
+        while (stop is None and i < turns) or (stop is not None and not stop.is_set()):
+            await turn(http, session_id, user, f"{user} oturum {n} soru {i}", stats)
+            i += 1
+
+    await asyncio.gather(*(worker(n) for n in range(sessions)))
+
+
+async def run_load(args, client, server_script: str) -> dict:
+    import httpx
+    import uvicorn
+
+    from server import ChatServer, FairScheduler
+
+    chat = ChatServer(client, servers=[server_script],
+                      scheduler=FairScheduler(args.max_active, args.max_queued, args.max_per_user))
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(chat.create_app(), host="127.0.0.1", port=port,
+                                           log_level="warning", lifespan="on"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    light = {f"light-{n}": UserStats() for n in range(args.users)}
+    heavy = UserStats()
+    limits = httpx.Limits(max_connections=args.users + args.heavy_streams + 8)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits,
+                                     timeout=httpx.Timeout(120)) as http:
+            stop = asyncio.Event()
+            start = time.perf_counter()
+            heavy_task = asyncio.create_task(user_sessions(http, "heavy", args.heavy_streams, 0, heavy, stop))
+            await asyncio.gather(*(user_sessions(http, user, 1, args.turns, stats)
+                                   for user, stats in light.items()))
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await heavy_task
+            health = (await http.get("/health")).json()
+    finally:
+        server.should_exit = True
+        await serving
+
+    light_latencies = [value for stats in light.values() for value in stats.latencies]
+    light_ttfts = [value for stats in light.values() for value in stats.ttfts]
+    light_waits = [value for stats in light.values() for value in stats.waits]
+    results = {
+        "light": summarize(light_latencies, light_ttfts, light_waits),
+        "heavy": summarize(heavy.latencies, heavy.ttfts, heavy.waits),
+        "server": health
+    }
+    results["light"]["rejected"] = sum(stats.rejected for stats in light.values())
+    results["light"]["errors"] = sum(stats.errors for stats in light.values())
+    results["heavy"]["rejected"] = heavy.rejected
+    results["heavy"]["errors"] = heavy.errors
+    total = len(light_latencies) + len(heavy.latencies)
+    results["throughput_turns_per_min"] = round(total / elapsed * 60, 1)
+    # Light kullanıcıların tamamlanan turlardaki payı; adil dağılımda kullanıcı sayısı oranına yakındır
+    results["light_share"] = round(len(light_latencies) / total, 3) if total else 0.0
+    return results
+
+
+def run(args) -> dict:
+    llm = FakeLLMServer(ttft=args.ttft, token_delay=args.token_delay,
+                        tokens=args.tokens, tool_rate=args.tool_rate).start()
+    os.environ["TOGETHER_BASE_URL"] = llm.base_url
+    os.environ.setdefault("TOGETHER_API", "bench")
+
+    from d1 import MCPClient
+
+    workdir = tempfile.mkdtemp()
+    server_script = write_server_launcher(workdir, args.tool_latency, args.payload)
+    client = MCPClient(max_concurrent_tools=args.max_active)
+    client.pool.manifest_path = os.path.join(workdir, "manifest.json")
+    try:
+        results = asyncio.run(run_load(args, client, server_script))
+    finally:
+        llm.stop()
+    results["config"] = {
+        "users": args.users, "heavy_streams": args.heavy_streams, "turns": args.turns,
+        "max_active": args.max_active, "max_queued": args.max_queued, "max_per_user": args.max_per_user,
+        "ttft_s": args.ttft, "token_delay_s": args.token_delay, "tokens": args.tokens,
+        "tool_rate": args.tool_rate, "tool_latency_s": args.tool_latency, "llm_requests": llm.requests
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/SSE sunucusu için yerel yük testi")
+    parser.add_argument("--users", type=int, default=8, help="ardışık tur gönderen kullanıcı sayısı")
+    parser.add_argument("--turns", type=int, default=10, help="light kullanıcı başına tur sayısı")
+    parser.add_argument("--heavy-streams", type=int, default=16, help="heavy kullanıcının paralel oturum sayısı")
+    parser.add_argument("--max-active", type=int, default=4, help="aynı anda çalışan azami tur")
+    parser.add_argument("--max-queued", type=int, default=64, help="bekleyebilecek azami tur")
+    parser.add_argument("--max-per-user", type=int, default=4, help="kullanıcı başına azami tur")
+    parser.add_argument("--ttft", type=float, default=0.05, help="sahte LLM ilk token gecikmesi, saniye")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="sahte LLM token gecikmesi, saniye")
+    parser.add_argument("--tokens", type=int, default=20, help="sahte LLM yanıt uzunluğu, token")
+    parser.add_argument("--tool-rate", type=float, default=0.5, help="araç çağıran tur oranı (0-1)")
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="sahte araç gecikmesi, saniye")
+    parser.add_argument("--payload", type=int, default=2000, help="sahte araç yanıt boyutu, karakter")
+    parser.add_argument("--json", metavar="PATH", help="sonuçları JSON olarak yaz")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
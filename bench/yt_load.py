@@ -0,0 +1,75 @@
+"""
+yt.py sunucusu için yük testi.
+
+YouTube yerine gecikmesi ayarlanabilen sahte bir kaynak kullanılır ve araçlar
+gerçek MCP protokolü üzerinden (bellek içi akışlarla) çağrılır. N eşzamanlı
+çağrının toplam süresinin tek çağrının süresine yakın olması beklenir.
+
+Kullanım:
+    python bench/yt_load.py --calls 16 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def stub_provider(latency, counter):
+    def provider(video_id, languages):
+        counter.append(video_id)
+        time.sleep(latency)
+        return [{"text": f"{video_id} line {i}", "start": i * 2.0, "duration": 2.0} for i in range(200)]
+    return provider
+
+
+async def timed_calls(session, calls):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(session.call_tool(name, args) for name, args in calls))
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results if r.isError or "failed" in r.content[0].text)
+    return elapsed, failed
+
+
+async def run(args):
+    os.environ["YT_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "transcripts.db")
+    os.environ["YT_MAX_WORKERS"] = str(args.workers)
+    import yt
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    provider_calls = []
+    yt.get_fetcher().provider = stub_provider(args.latency, provider_calls)
+
+    async with create_connected_server_and_client_session(yt.mcp._mcp_server) as session:
+        single, _ = await timed_calls(session, [("get_transcript", {"video_id": "warmup"})])
+
+        distinct = [("get_transcript", {"video_id": f"video{i}"}) for i in range(args.calls)]
+        elapsed, failed = await timed_calls(session, distinct)
+        print(f"tek çağrı: {single:.3f} sn")
+        print(f"{args.calls} farklı video, eşzamanlı: {elapsed:.3f} sn "
+              f"(ardışık tahmini {single * args.calls:.3f} sn, hata {failed})")
+
+        before = len(provider_calls)
+        same = [("get_transcript", {"video_id": "shared"}) for _ in range(args.calls)]
+        elapsed, failed = await timed_calls(session, same)
+        print(f"{args.calls} aynı video, eşzamanlı: {elapsed:.3f} sn, "
+              f"kaynak çağrısı {len(provider_calls) - before}, hata {failed}")
+
+        elapsed, failed = await timed_calls(session, distinct)
+        print(f"{args.calls} farklı video, önbellekten: {elapsed:.3f} sn, hata {failed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="yt.py yük testi")
+    parser.add_argument("--calls", type=int, default=16, help="eşzamanlı çağrı sayısı")
+    parser.add_argument("--latency", type=float, default=0.5, help="sahte kaynak gecikmesi, saniye")
+    parser.add_argument("--workers", type=int, default=16, help="yt.py iş parçacığı havuzu boyutu")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
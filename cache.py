@@ -0,0 +1,289 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+
+def canonical_json(value) -> str:
+    """Anahtar sırası ve boşluklardan bağımsız, kararlı JSON metni"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def stable_hash(value) -> str:
+    return hashlib.blake2b(canonical_json(value).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def normalize_messages(messages: list) -> list:
+    """
+    Mesaj geçmişini anahtar üretimi için sadeleştirir.
+
+    Metinlerin baş/son boşlukları atılır, boş alanlar çıkarılır ve her
+    istekte rastgele üretilen araç çağrısı kimlikleri sıra numarasıyla
+    değiştirilir; böylece aynı içerikli geçmişler aynı anahtarı üretir.
+    """
+    ids = {}
+    normalized = []
+    for message in messages:
+        item = {}
+        for key, value in message.items():
+            if value is None or value == "" or value == []:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            if key == "tool_call_id":
+                value = ids.setdefault(value, f"call_{len(ids)}")
+            elif key == "tool_calls":
+                value = [{**call, "id": ids.setdefault(call.get("id"), f"call_{len(ids)}")} for call in value]
+            item[key] = value
+        normalized.append(item)
+    return normalized
+
+
+class LRUStore:
+    """
+    Boyutu sınırlı LRU önbelleklerin ortak davranışı.
+
+    Değerler JSON'a çevrilip sıkıştırılarak saklanır; toplam boyut
+    `max_bytes` değerini aşınca en uzun süredir erişilmeyen kayıtlar silinir.
+    Alt sınıflar yalnızca saklama işlemlerini (`_load`, `_save`, `_remove`,
+    `_oldest`) tanımlar.
+
+    Args:
+        max_bytes: Sıkıştırılmış verinin azami toplam boyutu
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Süresi dolmamış değeri döndürür, yoksa None"""
+        now = time.time()
+        with self._lock:
+            row = self._load(key, now)
+            if row is None:
+                self.misses += 1
+                return None
+            payload, expires = row
+            if expires is not None and expires < now:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(zlib.decompress(payload))
+
+    def put(self, key: str, value, ttl: Optional[float] = None):
+        payload = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if len(payload) > self.max_bytes:
+            return
+        now = time.time()
+        expires = now + ttl if ttl else None
+        with self._lock:
+            self._remove(key)
+            self._save(key, payload, expires, now)
+            self.total_bytes += len(payload)
+            while self.total_bytes > self.max_bytes:
+                oldest = self._oldest()
+                if oldest is None:
+                    break
+                self._remove(oldest)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self.total_bytes}
+
+    def close(self):
+        pass
+
+
+class MemoryStore(LRUStore):
+    """Süreç belleğinde tutulan LRU önbellek"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        super().__init__(max_bytes)
+        self._entries = OrderedDict()
+
+    def _load(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _save(self, key, payload, expires, now):
+        self._entries[key] = (payload, expires)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= len(entry[0])
+
+    def _oldest(self):
+        return next(iter(self._entries), None)
+
+
+class DiskStore(LRUStore):
+    """
+    SQLite dosyasında tutulan, yeniden başlatmalar arasında korunan LRU önbellek.
+
+    Args:
+        path: Veritabanı dosyası
+        max_bytes: Sıkıştırılmış verinin azami toplam boyutu
+    """
+
+    def __init__(self, path: str = "mcp_cache.db", max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(max_bytes)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires REAL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed)")
+        self._db.commit()
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def _load(self, key, now):
+        row = self._db.execute("SELECT payload, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return row
+
+    def _save(self, key, payload, expires, now):
+        self._db.execute(
+            "INSERT INTO cache (key, payload, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, payload, len(payload), expires, now))
+        self._db.commit()
+
+    def _remove(self, key):
+        row = self._db.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._db.commit()
+            self.total_bytes -= row[0]
+
+    def _oldest(self):
+        row = self._db.execute("SELECT key FROM cache ORDER BY accessed LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class ResponseCache:
+    """
+    LLM yanıtlarını model, araç listesi ve sadeleştirilmiş mesaj geçmişine göre saklar.
+
+    Yalnızca birebir aynı istekler eşleşir; yanıt metni ve araç çağrıları
+    birlikte saklanır.
+
+    Args:
+        store: MemoryStore ya da DiskStore
+        ttl: Kayıtların geçerlilik süresi, saniye (None ise süresiz)
+    """
+
+    def __init__(self, store: LRUStore, ttl: Optional[float] = 3600):
+        self.store = store
+        self.ttl = ttl
+
+    @staticmethod
+    def key(model: str, messages: list, tools: Optional[list] = None, **params) -> str:
+        return "llm:" + stable_hash({
+            "model": model,
+            "tools": tools or [],
+            "messages": normalize_messages(messages),
+            "params": params
+        })
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.store.get(key)
+
+    def put(self, key: str, content: str, tool_calls: list):
+        self.store.put(key, {"content": content, "tool_calls": tool_calls}, ttl=self.ttl)
+
+
+class ToolCache:
+    """
+    Araç sonuçlarını (sunucu, araç, kanonik JSON argümanlar) anahtarıyla saklar.
+
+    Önbellek isteğe bağlıdır: yalnızca politikada adı geçen araçlar ve
+    sunucusunun salt okunur olarak işaretlediği araçlar (`readOnlyHint`)
+    önbelleklenir. Yan etkili ya da zamana bağlı araçların tekrar eden
+    çağrıları böylece her seferinde gerçekten çalışır.
+
+    Args:
+        store: MemoryStore ya da DiskStore
+        ttl: Önbelleklenen araçlar için süre, saniye (politikada ayrıca süre verilmemişse)
+        policies: `sunucu__araç` adından saniye cinsinden süreye eşleme (None: `ttl`, 0: kapalı)
+    """
+
+    def __init__(self, store: LRUStore, ttl: float = 300, policies: Optional[dict] = None):
+        self.store = store
+        self.ttl = ttl
+        self.policies = policies or {}
+
+    def ttl_for(self, qualified_name: str, read_only: bool = False) -> float:
+        if qualified_name in self.policies:
+            ttl = self.policies[qualified_name]
+            return self.ttl if ttl is None else ttl
+        return self.ttl if read_only else 0
+
+    def cacheable(self, qualified_name: str, read_only: bool = False) -> bool:
+        return self.ttl_for(qualified_name, read_only) > 0
+
+    @staticmethod
+    def key(server: str, tool: str, arguments: dict) -> str:
+        return "tool:" + stable_hash([server, tool, arguments])
+
+    def get(self, key: str) -> Optional[str]:
+        return self.store.get(key)
+
+    def put(self, key: str, qualified_name: str, result: str, read_only: bool = False):
+        self.store.put(key, result, ttl=self.ttl_for(qualified_name, read_only))
+
+
+def parse_policies(text: str) -> dict:
+    """
+    "yt__get_transcript,yt__search_transcript=3600,diger__yaz=0" biçimindeki
+    metni sözlüğe çevirir; süresi verilmeyen araçlar varsayılan süreyi (None) alır
+    """
+    policies = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, ttl = item.partition("=")
+        policies[name.strip()] = float(ttl) if ttl.strip() else None
+    return policies
+
+
+def create_caches(kind: Optional[str], path: str = "mcp_cache.db", max_bytes: int = 64 * 1024 * 1024,
+                  llm_ttl: Optional[float] = 3600, tool_ttl: float = 300, tool_policies: Optional[dict] = None):
+    """
+    Ayarlara göre (ResponseCache, ToolCache) çiftini kurar.
+
+    Args:
+        kind: "memory", "disk" ya da None (önbellek kapalı)
+
+    Returns:
+        İki önbellek de aynı depoyu paylaşır; kapalıysa (None, None)
+    """
+    if not kind:
+        return None, None
+    if kind == "memory":
+        store = MemoryStore(max_bytes)
+    elif kind == "disk":
+        store = DiskStore(path, max_bytes)
+    else:
+        raise ValueError(f"Bilinmeyen önbellek türü: {kind}")
+    return ResponseCache(store, ttl=llm_ttl), ToolCache(store, ttl=tool_ttl, policies=tool_policies)
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Optional
+
+
+def tool_to_spec(tool, name: Optional[str] = None) -> dict:
+    """MCP araç tanımını OpenAI tarzı function şemasına çevirir"""
+    return {
+        "type": "function",
+        "function": {
+            "name": name or tool.name,
+            "description": tool.description,
+            "parameters": tool.inputSchema
+        }
+    }
+
+
+def is_read_only(tool) -> bool:
+    """
+    Sunucu aracı yan etkisiz olarak işaretlemiş mi (`annotations.readOnlyHint`).
+
+    mcp 1.6 şemasında bu alan yok; daha yeni sunucular gönderirse ek alan olarak okunur.
+    """
+    annotations = getattr(tool, "annotations", None)
+    if annotations is None:
+        annotations = (tool.model_extra or {}).get("annotations") if hasattr(tool, "model_extra") else None
+    if isinstance(annotations, dict):
+        return bool(annotations.get("readOnlyHint"))
+    return bool(getattr(annotations, "readOnlyHint", False))
+
+
+class ToolCatalog:
+    """
+    MCP sunucusunun araç listesini ve dönüştürülmüş şemalarını önbellekte tutar.
+
+    Liste bağlantı sırasında bir kez doldurulur. Sunucu
+    `notifications/tools/list_changed` gönderdiğinde ya da TTL dolduğunda
+    bir sonraki istekte yeniden çekilir; aksi halde her sorgu önbellekten beslenir.
+
+    Args:
+        ttl: Saniye cinsinden geçerlilik süresi. None ise süre sınırı yoktur.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self.tools = []
+        self.specs = []
+        self.hits = 0
+        self.misses = 0
+        # Liste her değiştiğinde artar; birleşik şemaları tutanlar yeniden oluşturmak için bakar
+        self.version = 0
+        self._loaded_at: Optional[float] = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Önbelleği geçersiz kılar, bir sonraki istekte liste yenilenir"""
+        self._stale = True
+
+    def is_fresh(self) -> bool:
+        if self._stale or self._loaded_at is None:
+            return False
+        if self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl:
+            return False
+        return True
+
+    def load(self, tools: list):
+        """Listeyi sunucuya sormadan doldurur (ör. kayıtlı bir manifestten)"""
+        self.tools = list(tools)
+        self.specs = [tool_to_spec(tool) for tool in self.tools]
+        self.version += 1
+        self._loaded_at = time.monotonic()
+        self._stale = False
+
+    async def refresh(self, session):
+        """Araç listesini sunucudan çeker ve şemaları yeniden oluşturur"""
+        # Yenileme sırasında gelen list_changed bildirimini kaybetmemek için
+        # bayrağı istekten önce temizle
+        self._stale = False
+        try:
+            response = await session.list_tools()
+        except Exception:
+            self._stale = True
+            raise
+        self.tools = list(response.tools)
+        self.specs = [tool_to_spec(tool) for tool in self.tools]
+        self.version += 1
+        self._loaded_at = time.monotonic()
+
+    async def get_specs(self, session) -> list:
+        """Önbellekteki şemaları döndürür, gerekiyorsa önce yeniler"""
+        if self.is_fresh():
+            self.hits += 1
+            return self.specs
+
+        async with self._lock:
+            # Kilit beklenirken başka bir görev yenilemiş olabilir
+            if self.is_fresh():
+                self.hits += 1
+                return self.specs
+            self.misses += 1
+            await self.refresh(session)
+            return self.specs
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "tools": len(self.tools)}
@@ -0,0 +1,195 @@
+import json
+
+# Mesaj başına rol/ayraç gibi biçim ek yükü için eklenen token sayısı
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(message: dict) -> int:
+    """Mesajın token sayısını kabaca tahmin eder (yaklaşık 4 karakter = 1 token)"""
+    content = message.get("content") or ""
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False)
+    chars = len(content)
+    if message.get("tool_calls"):
+        chars += len(json.dumps(message["tool_calls"], ensure_ascii=False))
+    return chars // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def _snippet(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class ContextManager:
+    """
+    Sohbet geçmişini bir token bütçesi içinde tutar.
+
+    Token sayıları mesaj eklenirken bir kez hesaplanır, geçmiş her istekte
+    yeniden taranmaz. Bütçe aşıldığında önce eski ve büyük araç çıktıları kısa
+    özetlerle değiştirilir, ardından en eski turlar tek bir özet mesajına
+    katlanır. Sistem mesajı ve son tur (son araç alışverişi dahil) her zaman korunur.
+
+    Args:
+        system_prompt: Sabit sistem mesajı
+        budget: Modele gönderilecek geçmiş için token bütçesi
+        stub_threshold: Bu sınırı aşan eski araç çıktıları özetlenir
+        summary_max_chars: Katlanan turların özet mesajının azami uzunluğu
+        journal: Eklenen mesajları kalıcı olarak kaydeden günlük (bkz. store.ConversationLog)
+    """
+
+    def __init__(self, system_prompt: str, budget: int = 24000, stub_threshold: int = 500,
+                 summary_max_chars: int = 2000, journal=None):
+        self.system_prompt = system_prompt
+        self.journal = journal
+        self.budget = budget
+        self.stub_threshold = stub_threshold
+        self.summary_max_chars = summary_max_chars
+        self.messages = []
+        self._tokens = []
+        # Mesajların günlükteki kayıt kimlikleri (günlük yoksa ya da mesaj değiştirildiyse None)
+        self._ids = []
+        self.total_tokens = 0
+        self.evicted_turns = 0
+        self.stubbed_outputs = 0
+        self._summary_lines = []
+        self._summary_message = None
+        self.reset()
+
+    def reset(self):
+        self.messages = []
+        self._tokens = []
+        self._ids = []
+        self.total_tokens = 0
+        self._summary_lines = []
+        self._summary_message = None
+        self.append({"role": "system", "content": self.system_prompt})
+
+    def append(self, message: dict):
+        tokens = estimate_tokens(message)
+        self.messages.append(message)
+        self._tokens.append(tokens)
+        self._ids.append(self.journal.append(message) if self.journal else None)
+        self.total_tokens += tokens
+
+    def extend(self, messages: list):
+        for message in messages:
+            self.append(message)
+
+    def restore(self, messages: list, ids: list, summary_lines: list = (), evicted_turns: int = 0):
+        """Günlükten yüklenen canlı bağlamı, mesajları yeniden kaydetmeden geri yükler"""
+        self.messages = list(messages)
+        self._tokens = [estimate_tokens(message) for message in self.messages]
+        self._ids = list(ids)
+        self.total_tokens = sum(self._tokens)
+        self._summary_lines = list(summary_lines)
+        self._summary_message = None
+        if self._summary_lines and len(self.messages) > 1 and self.messages[1]["role"] == "system":
+            self._summary_message = self.messages[1]
+        self.evicted_turns = evicted_turns
+
+    def entries(self) -> list:
+        """(kayıt kimliği, mesaj) çiftleri"""
+        return list(zip(self._ids, self.messages))
+
+    @property
+    def last_id(self):
+        """Son mesajın günlükteki kayıt kimliği"""
+        return self._ids[-1] if self._ids else None
+
+    def _replace(self, index: int, message: dict):
+        tokens = estimate_tokens(message)
+        self.total_tokens += tokens - self._tokens[index]
+        self.messages[index] = message
+        self._tokens[index] = tokens
+        self._ids[index] = None
+
+    def _has_summary(self) -> bool:
+        return len(self.messages) > 1 and self.messages[1] is self._summary_message
+
+    def _turn_starts(self) -> list:
+        first = 2 if self._has_summary() else 1
+        return [i for i in range(first, len(self.messages)) if self.messages[i]["role"] == "user"]
+
+    def _latest_tool_exchange(self) -> set:
+        """Son araç çağrısı mesajı ile ona ait araç yanıtlarının indeksleri"""
+        for i in range(len(self.messages) - 1, 0, -1):
+            if self.messages[i].get("tool_calls"):
+                pinned = {i}
+                j = i + 1
+                while j < len(self.messages) and self.messages[j]["role"] == "tool":
+                    pinned.add(j)
+                    j += 1
+                return pinned
+        return set()
+
+    def window(self) -> list:
+        """Bütçeyi gerekiyorsa sıkıştırır ve modele gönderilecek mesajları döndürür"""
+        if self.total_tokens > self.budget:
+            self._stub_tool_outputs()
+        if self.total_tokens > self.budget:
+            self._evict_turns()
+        return self.messages
+
+    def _stub_tool_outputs(self):
+        pinned = self._latest_tool_exchange()
+        for i, message in enumerate(self.messages):
+            if self.total_tokens <= self.budget:
+                return
+            if message["role"] != "tool" or i in pinned or self._tokens[i] <= self.stub_threshold:
+                continue
+            stub = dict(message)
+            stub["content"] = (f"[Eski araç çıktısı kısaltıldı, yaklaşık {self._tokens[i]} token] "
+                               f"{_snippet(message.get('content') or '', 200)}")
+            self._replace(i, stub)
+            self.stubbed_outputs += 1
+
+    def _evict_turns(self):
+        starts = self._turn_starts()
+        # Son tur korunur; ondan önceki turlar en eskiden başlayarak katlanır
+        cut = None
+        freed = 0
+        for k in range(len(starts) - 1):
+            end = starts[k + 1]
+            freed += sum(self._tokens[starts[k]:end])
+            cut = end
+            if self.total_tokens - freed <= self.budget:
+                break
+        if cut is None:
+            return
+
+        first = starts[0]
+        for message in self.messages[first:cut]:
+            if message["role"] == "user":
+                self._summary_lines.append(f"- Kullanıcı: {_snippet(message['content'], 150)}")
+            elif message["role"] == "assistant" and message.get("content"):
+                self._summary_lines.append(f"- Asistan: {_snippet(message['content'], 150)}")
+            elif message.get("tool_calls"):
+                names = ", ".join(call["function"]["name"] for call in message["tool_calls"])
+                self._summary_lines.append(f"- Araç çağrıları: {names}")
+        self.evicted_turns += sum(1 for m in self.messages[first:cut] if m["role"] == "user")
+
+        summary = "Önceki konuşmanın özeti:\n" + "\n".join(self._summary_lines)
+        while len(summary) > self.summary_max_chars and len(self._summary_lines) > 1:
+            self._summary_lines.pop(0)
+            summary = "Önceki konuşmanın özeti:\n" + "\n".join(self._summary_lines)
+
+        self._summary_message = {"role": "system", "content": summary}
+        tail = self.messages[cut:]
+        tail_tokens = self._tokens[cut:]
+        tail_ids = self._ids[cut:]
+        self.messages = [self.messages[0], self._summary_message] + tail
+        self._tokens = [self._tokens[0], estimate_tokens(self._summary_message)] + tail_tokens
+        self._ids = [self._ids[0], None] + tail_ids
+        self.total_tokens = sum(self._tokens)
+        # Devam ederken katlanan turların yeniden okunmaması için canlı bağlam kaydedilir
+        if self.journal:
+            self.journal.checkpoint(self.messages, self._ids, self._summary_lines, self.evicted_turns)
+
+    def stats(self) -> dict:
+        return {
+            "messages": len(self.messages),
+            "tokens": self.total_tokens,
+            "budget": self.budget,
+            "evicted_turns": self.evicted_turns,
+            "stubbed_outputs": self.stubbed_outputs
+        }
@@ -1,148 +1,471 @@
 import asyncio
-from contextlib import AsyncExitStack
+import copy
 import json
 import os
 import sys
-from typing import Optional
-import base64
-from pathlib import Path
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 import traceback
+from contextlib import aclosing
 from dotenv import load_dotenv
-from mcp import ClientSession, StdioServerParameters, stdio_client
-from together import Together
+from cache import create_caches, parse_policies
+from context import ContextManager, estimate_tokens
+from images import ImagePipeline, InvalidImage
+from llm import StreamedMessage, create_backend
+from pool import ServerPool, ToolProgress
+from prefetch import SpeculativeCalls, is_prefetch_tool
+from scheduler import AdaptiveLimiter, SchedulingBackend, parse_mapping
+from store import ConversationStore
+from tracing import NOOP_SPAN, RingBufferSink, create_tracer
+
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+SYSTEM_PROMPT = "Sen bir yardımcı asistansın ve gerektiğinde araçları kullanabilirsin."
+# Araç seçimi (ve görsel sorgular) için ana model ile araç sonuçlarından sonraki yanıt modeli
+PRIMARY_MODEL = "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8"
+FOLLOWUP_MODEL = "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"
 
 class MCPClient:
-    def __init__(self):
-        self.session: Optional[ClientSession] = None
-        self.exit_stack = AsyncExitStack()
+    def __init__(self, tool_cache_ttl: Optional[float] = None, llm_backend=None,
+                 max_concurrent_tools: int = 4, tool_timeout: Optional[float] = 120,
+                 context_budget: int = 24000, tracer=None, caches: Optional[tuple] = None,
+                 store: Optional[ConversationStore] = None):
         load_dotenv()
-        self.client = Together(api_key=os.getenv('TOGETHER_API'))
-        self.messages = [
-            {"role": "system", "content": "Sen bir yardımcı asistansın ve gerektiğinde araçları kullanabilirsin."}
-        ]
+        # Sunucu başına eşzamanlı araç çağrısı sınırı havuzdaki her bağlantıda ayrı tutulur
+        self.pool = ServerPool(tool_cache_ttl=tool_cache_ttl, max_concurrent_tools=max_concurrent_tools,
+                               notify_cancel=os.getenv('MCP_CANCEL_NOTIFY', '0') != '0')
+        self.tool_timeout = tool_timeout
+        # Bir turdaki azami araç turu ile token (istem + yanıt) ve süre bütçesi;
+        # biri dolunca model araçsız son bir yanıt üretir
+        self.max_tool_rounds = int(os.getenv('MCP_MAX_TOOL_ROUNDS', '5'))
+        self.turn_token_budget = int(os.getenv('MCP_TURN_TOKEN_BUDGET', '100000'))
+        self.turn_time_budget = float(os.getenv('MCP_TURN_TIME_BUDGET', '300'))
+        # Muhtemel araç çağrıları model yanıtı beklenirken önden başlatılır
+        self.prefetch = os.getenv('MCP_PREFETCH', '1') != '0'
+        # Parça parça sonuç gönderen araçlar bu kadar karakterden sonra iptal edilir (0: sınırsız)
+        self.tool_max_chars = int(os.getenv('MCP_TOOL_MAX_CHARS', '0'))
+        # Araç ilerleme bildirimleri için çağrılır: on_tool_progress(araç_adı, ToolProgress)
+        self.on_tool_progress = None
+        # LLM_BACKEND: "async" (varsayılan) ya da "thread"
+        self.llm = llm_backend or create_backend(
+            os.getenv('LLM_BACKEND', 'async'),
+            api_key=os.getenv('TOGETHER_API'),
+            max_workers=int(os.getenv('LLM_MAX_WORKERS', '4'))
+        )
+        self.primary_model = os.getenv('LLM_PRIMARY_MODEL', PRIMARY_MODEL)
+        self.followup_model = os.getenv('LLM_FOLLOWUP_MODEL', FOLLOWUP_MODEL)
+        # İstekler süre sınırı, yeniden deneme, yedek istek ve uyarlanır eşzamanlılıkla çalışır
+        if os.getenv('LLM_SCHEDULER', '1') != '0':
+            self.llm = SchedulingBackend(
+                self.llm,
+                deadlines={model: float(seconds) for model, seconds in
+                           parse_mapping(os.getenv('LLM_DEADLINES', '')).items()},
+                default_deadline=float(os.getenv('LLM_DEADLINE', '120')),
+                max_retries=int(os.getenv('LLM_MAX_RETRIES', '3')),
+                hedge_models=parse_mapping(os.getenv('LLM_HEDGE_MODELS', '')),
+                hedge_percentile=float(os.getenv('LLM_HEDGE_PERCENTILE', '95')),
+                limiter=AdaptiveLimiter(max_limit=int(os.getenv('LLM_MAX_CONCURRENCY', '64')))
+            )
+        # Görseller tek geçişte küçültülüp yeniden kodlanır, sonuç içerik özetiyle önbelleklenir
+        self.images = ImagePipeline(
+            max_edge=int(os.getenv('IMAGE_MAX_EDGE', '1568')),
+            format=os.getenv('IMAGE_FORMAT', 'JPEG'),
+            quality=int(os.getenv('IMAGE_QUALITY', '85'))
+        )
+        # MCP_STORE=dosya.db ile her mesaj eklendiği anda kalıcı günlüğe yazılır
+        self.store = store
+        if self.store is None and os.getenv('MCP_STORE'):
+            self.store = ConversationStore(os.getenv('MCP_STORE'))
+        # Geçmiş token bütçesi içinde tutulur; eski turlar özetlenir
+        self.context = ContextManager(SYSTEM_PROMPT, budget=context_budget,
+                                      journal=self.store.create() if self.store else None)
+        # Son sorguda yanıt metnine katlanan hata (başsız kullanımda ayırt etmek için)
+        self.last_error: Optional[Exception] = None
+        # MCP_CACHE=memory|disk ile aynı istekler ve araç çağrıları önbellekten yanıtlanır
+        self.response_cache, self.tool_cache = caches or create_caches(
+            os.getenv('MCP_CACHE'),
+            path=os.getenv('MCP_CACHE_PATH', 'mcp_cache.db'),
+            max_bytes=int(float(os.getenv('MCP_CACHE_MAX_MB', '64')) * 1024 * 1024),
+            llm_ttl=float(os.getenv('MCP_LLM_CACHE_TTL', '3600')),
+            tool_ttl=float(os.getenv('MCP_TOOL_CACHE_TTL', '300')),
+            tool_policies=parse_policies(os.getenv('MCP_TOOL_CACHE_POLICY', ''))
+        )
+        # MCP_TRACE=1 ya da dosya yollarından biri verilirse tur aşamaları ölçülür
+        self.tracer = tracer or create_tracer(
+            trace_file=os.getenv('MCP_TRACE_FILE'),
+            metrics_file=os.getenv('MCP_METRICS_FILE'),
+            enabled=os.getenv('MCP_TRACE', '') not in ('', '0'),
+            metrics_interval=float(os.getenv('MCP_METRICS_INTERVAL', '10'))
+        )
 
-    async def connect_to_server(self, server_script_path: str):
-        if not (server_script_path.endswith('.py') or server_script_path.endswith('.js')):
-            raise ValueError("Sunucu scripti .py ya da .js dosyası olmalı")
+    @property
+    def messages(self) -> list:
+        return self.context.messages
 
-        command = "python" if server_script_path.endswith('.py') else "node"
-        server_params = StdioServerParameters(command=command, args=[server_script_path], env=None)
+    @property
+    def conversation_id(self) -> Optional[str]:
+        """Sohbetin kalıcı kimliği (günlük kapalıysa None)"""
+        return self.context.journal.id if self.context.journal else None
 
-        try:
-            stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-            self.stdio, self.write = stdio_transport
-            self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
+    @property
+    def last_message_id(self) -> Optional[int]:
+        """Son mesajın günlükteki kayıt kimliği (GUI'de daraltılan mesajları yüklemek için)"""
+        return self.context.last_id
+
+    def new_conversation(self) -> "MCPClient":
+        """
+        Aynı sunucu havuzunu, araç kataloğunu ve LLM bağlantısını paylaşan,
+        kendi geçmişine sahip yeni bir sohbet döndürür.
+
+        Paylaşılan kaynaklar yalnızca ana istemcinin cleanup çağrısıyla kapatılmalıdır.
+        """
+        conversation = copy.copy(self)
+        conversation.context = ContextManager(SYSTEM_PROMPT, budget=self.context.budget,
+                                              journal=self.store.create() if self.store else None)
+        conversation.last_error = None
+        return conversation
+
+    def resume_conversation(self, conversation_id: str):
+        """
+        Kayıtlı bir sohbete devam eder.
+
+        Yalnızca canlı bağlam (son kontrol noktası ve sonrasındaki mesajlar)
+        okunur; LLM ya da araç çağrıları yeniden yapılmaz.
+        """
+        if not self.store:
+            raise RuntimeError("Sohbet günlüğü kapalı (MCP_STORE ayarlanmamış)")
+        self.context = self._restore_context(*self.store.load(conversation_id))
+
+    def fork_conversation(self, at: Optional[int] = None) -> "MCPClient":
+        """
+        Mevcut sohbetin kopyasını, günlüğü kopyalamadan yeni bir sohbet olarak döndürür.
+
+        Args:
+            at: Çatallanacak kayıt kimliği (verilmezse son mesaj)
+        """
+        if not self.store:
+            raise RuntimeError("Sohbet günlüğü kapalı (MCP_STORE ayarlanmamış)")
+        log = self.store.fork(self.conversation_id, at=at)
+        conversation = copy.copy(self)
+        conversation.context = self._restore_context(*self.store.load(log.id))
+        conversation.last_error = None
+        return conversation
+
+    def _restore_context(self, log, messages, ids, summary_lines, evicted_turns) -> ContextManager:
+        context = ContextManager(SYSTEM_PROMPT, budget=self.context.budget)
+        context.journal = log
+        if messages:
+            context.restore(messages, ids, summary_lines, evicted_turns)
+        else:
+            # Boş sohbet: sistem mesajı günlüğe yazılarak baştan başlatılır
+            context.reset()
+        return context
 
-            await self.session.initialize()
+    @property
+    def trace_buffer(self) -> Optional[RingBufferSink]:
+        """GUI durum çubuğu için son turların tutulduğu tampon (izleme kapalıysa None)"""
+        return next((sink for sink in self.tracer.sinks if isinstance(sink, RingBufferSink)), None)
+
+    @property
+    def session(self) -> Optional["ClientSession"]:
+        """Çalışan ilk sunucunun oturumu (tek sunuculu kullanım için)"""
+        return next((c.session for c in self.pool.connections.values() if c.running), None)
+
+    async def connect_to_server(self, server_script_path: str, lazy: bool = False):
+        await self.connect_to_servers([server_script_path], lazy=[server_script_path] if lazy else ())
+
+    async def connect_to_servers(self, server_script_paths: list, lazy=()):
+        """
+        Birden çok MCP sunucusunu eşzamanlı başlatır.
+
+        Args:
+            server_script_paths: .py ya da .js sunucu scriptleri
+            lazy: İlk araç çağrısına kadar başlatılmayacak scriptler
+        """
+        for path in server_script_paths:
+            self.pool.add_server(path, lazy=path in lazy)
+
+        try:
+            await self.pool.start()
         except Exception as e:
             await self.cleanup()
             raise RuntimeError(f"Sunucuya bağlanırken hata oluştu: {e}")
 
+    async def preload(self):
+        """LLM istemcisini (ağır SDK içe aktarımı dahil) iş parçacığı havuzunda önceden yükler"""
+        load = getattr(self.llm, "load", None)
+        if load:
+            await asyncio.get_running_loop().run_in_executor(None, load)
+
     async def process_query(self, query: str) -> str:
-        if not self.session:
+        """Sorguyu işler ve yanıtın tamamını tek seferde döndürür"""
+        parts = []
+        async for token in self.stream_query(query):
+            parts.append(token)
+        return "".join(parts)
+
+    async def stream_query(self, query: str) -> AsyncIterator[str]:
+        """
+        Sorguyu işler ve yanıt metnini üretildikçe parça parça döndürür.
+
+        Args:
+            query: Kullanıcı sorgusu
+
+        Yields:
+            LLM'den gelen metin parçaları
+        """
+        if not self.pool.connections:
             raise RuntimeError("İşlem yapmadan önce connect_to_server metodunu çağırmalısınız.")
             
-        self.messages.append({"role": "user", "content": query})
+        self.context.append({"role": "user", "content": query})
+        self.last_error = None
 
-        try:
-            response = await self.session.list_tools()
-            available_tools = [{
-                "type": "function",
-                "function": {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "parameters": tool.inputSchema
-                }
-            } for tool in response.tools]
-
-            response = self.client.chat.completions.create(
-                model="meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
-                max_tokens=5000,
-                messages=self.messages,
-                tools=available_tools
-            )
+        with self.tracer.span("turn") as turn:
+            if turn.recording:
+                turn.set(query_bytes=len(query.encode("utf-8")))
+            speculative = SpeculativeCalls(lambda call: self._call_tool(call, turn),
+                                           allowed=self._prefetchable) if self.prefetch else None
+            try:
+                with self.tracer.span("list_tools", parent=turn) as span:
+                    available_tools = await self.pool.get_specs()
+                    span.set(tools=len(available_tools))
+                if speculative:
+                    speculative.predict(query, available_tools)
 
-            message = response.choices[0].message
-            tool_calls = getattr(message, "tool_calls", None)
-
-            if tool_calls:
-                for tool_call in tool_calls:
-                    tool_name = tool_call.function.name
-                    tool_args = json.loads(tool_call.function.arguments)
-                    result = await self.session.call_tool(tool_name, tool_args)
-
-                    self.messages.append({
-                        "role": "assistant",
-                        "tool_calls": [tool_call.model_dump()]
-                    })
-
-                    tool_result_content = result.content
-                    try:
-                        if isinstance(tool_result_content, list):
-                            tool_result_content = "\n".join(
-                                [str(item.text) if hasattr(item, "text") else str(item) for item in tool_result_content])
-                        else:
-                            tool_result_content = str(tool_result_content)
-                    except Exception as e:
-                        tool_result_content = f"[Araç yanıtı işlenirken hata: {e}]"
-
-                    self.messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": tool_result_content
-                    })
-
-                response = self.client.chat.completions.create(
-                    model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
-                    max_tokens=2000,
-                    messages=self.messages
-                )
-                final_response = response.choices[0].message.content or "[Boş yanıt]"
-                self.messages.append({"role": "assistant", "content": final_response})
-                return final_response
+                started = time.monotonic()
+                spent_tokens = 0
+                for depth in range(self.max_tool_rounds + 1):
+                    # Derinlik ya da bütçe dolduysa araç sonuçlarından son yanıt araçsız istenir
+                    use_tools = (depth < self.max_tool_rounds
+                                 and spent_tokens < self.turn_token_budget
+                                 and time.monotonic() - started < self.turn_time_budget)
+                    kwargs = {
+                        "model": self.primary_model if use_tools or depth == 0 else self.followup_model,
+                        "max_tokens": 5000 if use_tools or depth == 0 else 2000,
+                        "messages": self.context.window()
+                    }
+                    if use_tools:
+                        kwargs["tools"] = available_tools
+                    spent_tokens += self.context.total_tokens
 
-            else:
-                content = message.content or "[Boş yanıt]"
-                self.messages.append({"role": "assistant", "content": content})
-                return content
+                    message = StreamedMessage()
+                    async for token in self._stream_llm(message, turn, speculative=speculative if use_tools else None,
+                                                        **kwargs):
+                        yield token
+                    spent_tokens += message.completion_tokens
+
+                    if not use_tools or not message.tool_calls:
+                        content = message.content or "[Boş yanıt]"
+                        if not message.content:
+                            yield content
+                        self.context.append({"role": "assistant", "content": content})
+                        break
+
+                    if message.content:
+                        yield "\n"
+                    await self._run_tool_calls(message.tool_calls, turn, speculative)
+                turn.set(tool_rounds=depth, spent_tokens=spent_tokens,
+                         prefetch_hits=speculative.hits if speculative else 0)
+
+            except Exception as e:
+                self.last_error = e
+                turn.fail(e)
+                error_msg = f"[Hata: {e}]"
+                self.context.append({"role": "assistant", "content": error_msg})
+                yield error_msg
+            finally:
+                if speculative:
+                    speculative.cancel()
+            turn.set(context_size=self.context.total_tokens)
+
+    def _prefetchable(self, tool_name: str) -> bool:
+        """Model mesajını bitirmeden başlatılabilecek (yan etkisiz) araç mı"""
+        if is_prefetch_tool(tool_name) or self.pool.is_read_only(tool_name):
+            return True
+        # Önbellek politikasına eklenen araçlar da tekrar çalıştırılabilir sayılır
+        return bool(self.tool_cache and self.tool_cache.cacheable(tool_name))
+
+    async def _stream_llm(self, message: StreamedMessage, turn, speculative: Optional[SpeculativeCalls] = None,
+                          **kwargs) -> AsyncIterator[str]:
+        """
+        LLM akışını `message` içinde biriktirir, metin parçalarını döndürür ve ölçer.
+
+        `speculative` verilirse argümanları tamamlanan araç çağrıları akış bitmeden başlatılır.
+        """
+        with self.tracer.span("llm", parent=turn, model=kwargs["model"]) as span:
+            if span.recording:
+                span.set(prompt_tokens=sum(estimate_tokens(m) for m in kwargs["messages"]),
+                         request_bytes=len(json.dumps(kwargs["messages"], ensure_ascii=False).encode("utf-8")))
+            cache_key = None
+            if self.response_cache:
+                cache_key = self.response_cache.key(**kwargs)
+                cached = self.response_cache.get(cache_key)
+                span.set(cache="hit" if cached else "miss")
+                if cached:
+                    message.restore(cached["content"], cached["tool_calls"])
+                    if message.content:
+                        yield message.content
+                    return
+
+            first_token = True
+            async for chunk in self.llm.stream(**kwargs):
+                token = message.add(chunk)
+                if speculative and not token and message.tool_calls:
+                    speculative.observe(message.tool_calls)
+                if token:
+                    if first_token and span.recording:
+                        span.set(ttft_ms=round(span.elapsed() * 1000, 1))
+                    first_token = False
+                    yield token
+            if span.recording:
+                span.set(chunks=message.chunks,
+                         completion_tokens=message.completion_tokens,
+                         response_bytes=len(message.content.encode("utf-8")),
+                         tool_calls=len(message.tool_calls))
+            if cache_key and (message.content or message.tool_calls):
+                self.response_cache.put(cache_key, message.content, message.tool_calls)
+
+    async def _run_tool_calls(self, tool_calls: list, turn=NOOP_SPAN,
+                              speculative: Optional[SpeculativeCalls] = None):
+        """
+        Modelin istediği araç çağrılarını eşzamanlı çalıştırır.
+
+        Sonuçlar orijinal sırayla tek bir asistan mesajının ardından
+        araç mesajları olarak geçmişe eklenir. Başarısız ya da zaman aşımına
+        uğrayan çağrılar turu kesmez, hata metni araç yanıtı olarak döner.
+        Önden başlatılmış aynı çağrı varsa onun sonucu beklenir.
+        """
+        results = await asyncio.gather(*(
+            (speculative and speculative.take(tool_call)) or self._call_tool(tool_call, turn)
+            for tool_call in tool_calls))
+
+        self.context.append({"role": "assistant", "tool_calls": tool_calls})
+        for tool_call, content in zip(tool_calls, results):
+            self.context.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": content
+            })
+
+    async def _call_tool(self, tool_call: dict, turn=NOOP_SPAN) -> str:
+        """Tek bir araç çağrısını eşzamanlılık sınırı ve zaman aşımıyla çalıştırır"""
+        tool_name = tool_call["function"]["name"]
+        with self.tracer.span("tool", parent=turn, tool=tool_name) as span:
+            content = await self._call_tool_content(tool_call, tool_name, span)
+            if span.recording:
+                span.set(result_bytes=len(content.encode("utf-8")))
+            return content
 
+    async def _call_tool_content(self, tool_call: dict, tool_name: str, span) -> str:
+        cache_key = None
+        try:
+            arguments = tool_call["function"]["arguments"] or "{}"
+            span.set(args_bytes=len(arguments))
+            tool_args = json.loads(arguments)
+            read_only = self.pool.is_read_only(tool_name)
+            if self.tool_cache and self.tool_cache.cacheable(tool_name, read_only):
+                connection, name = self.pool.resolve(tool_name)
+                cache_key = self.tool_cache.key(connection.name, name, tool_args)
+                cached = self.tool_cache.get(cache_key)
+                span.set(cache="hit" if cached is not None else "miss")
+                if cached is not None:
+                    return cached
+            result = await self._collect_tool(tool_name, tool_args, span)
+        except asyncio.TimeoutError as e:
+            span.fail(e)
+            return f"[Araç zaman aşımına uğradı: {tool_name} ({self.tool_timeout} sn)]"
+        except Exception as e:
+            span.fail(e)
+            return f"[Araç hatası ({tool_name}): {e}]"
+        if isinstance(result, str):
+            # Sınırda kesilen kısmi sonuç önbelleğe alınmaz
+            return result
+
+        tool_result_content = result.content
+        try:
+            if isinstance(tool_result_content, list):
+                tool_result_content = "\n".join(
+                    [str(item.text) if hasattr(item, "text") else str(item) for item in tool_result_content])
+            else:
+                tool_result_content = str(tool_result_content)
         except Exception as e:
-            error_msg = f"[Hata: {e}]"
-            self.messages.append({"role": "assistant", "content": error_msg})
-            return error_msg
+            tool_result_content = f"[Araç yanıtı işlenirken hata: {e}]"
+            cache_key = None
+        if cache_key and not getattr(result, "isError", False):
+            self.tool_cache.put(cache_key, tool_name, tool_result_content, read_only)
+        return tool_result_content
 
-    async def process_image_query(self, image_input: str, prompt: str) -> str:
+    def stream_tool(self, tool_name: str, arguments: dict, timeout: Optional[float] = None,
+                    chunks: bool = False):
+        """
+        Aracı çağırır ve ilerleme bildirimlerini geldikçe döndüren bir async iterator verir.
+
+        Son öğe CallToolResult'tır; iterator erken kapatılırsa (ör. `break`
+        sonrası aclose) çağrı sunucuda iptal edilir.
+
+        Args:
+            tool_name: `sunucu__araç` biçiminde araç adı
+            arguments: Araç argümanları
+            timeout: Saniye; verilmezse `tool_timeout`
+            chunks: Sonuç metni bildirimlerin `chunk` alanında istenir; destekleyen
+                sunucuların son sonucu bu durumda yalnızca bir özettir
+        """
+        return self.pool.stream_tool(tool_name, arguments,
+                                     timeout=timeout if timeout is not None else self.tool_timeout,
+                                     chunks=chunks)
+
+    async def _collect_tool(self, tool_name: str, tool_args: dict, span):
+        """
+        Aracı ilerleme bildirimleriyle çalıştırır ve sonucunu döndürür.
+
+        Bildirimler `on_tool_progress` ile iletilir. Sonuç metni yalnızca
+        `tool_max_chars` ayarlıysa parça parça istenir; sınıra ulaşınca çağrı
+        iptal edilir ve o ana kadar gelen metin döndürülür, aksi halde
+        parçalar birleştirilip sonucun yerine konur.
+        """
+        chunks, size = [], 0
+        async with aclosing(self.stream_tool(tool_name, tool_args, chunks=bool(self.tool_max_chars))) as events:
+            async for event in events:
+                if not isinstance(event, ToolProgress):
+                    if chunks and not event.isError:
+                        # Sunucu metni parçalarla gönderdi; sonuç yalnızca bir özet
+                        from mcp import types
+                        return event.model_copy(update={
+                            "content": [types.TextContent(type="text", text=" ".join(chunks))]})
+                    return event
+                if self.on_tool_progress:
+                    self.on_tool_progress(tool_name, event)
+                if event.chunk:
+                    chunks.append(event.chunk)
+                    size += len(event.chunk)
+                    if size >= self.tool_max_chars:
+                        span.set(truncated=True)
+                        return (" ".join(chunks)[:self.tool_max_chars]
+                                + f"\n[Araç çıktısı {self.tool_max_chars} karakterde kesildi]")
+        raise RuntimeError("Araç sonuç döndürmeden bitti")
+
+    async def process_image_query(self, image_input, prompt: str) -> str:
         """
         Resim verisi içeren bir sorguyu işler.
         
         Args:
-            image_input: Görsel verisi (data URL, base64 veya dosya yolu)
+            image_input: Görsel verisi (data URL, base64, dosya yolu veya PIL görseli)
             prompt: Resim hakkında sorgu
             
         Returns:
             LLM'den gelen yanıt
         """
         try:
-            # Data URL kontrolü
-            if image_input.startswith("data:image"):
-                image_url = image_input
-            # Dosya yolu kontrolü
-            elif os.path.exists(image_input):
-                image_path = Path(image_input)
-                with open(image_path, "rb") as image_file:
-                    base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-                    image_url = f"data:image/{image_path.suffix[1:]};base64,{base64_image}"
-            # Base64 formatında veri kontrolü
-            else:
-                try:
-                    # Base64 verisini decode etmeyi dene
-                    base64.b64decode(image_input)
-                    image_url = f"data:image/png;base64,{image_input}"
-                except:
-                    return f"[Hata: Geçersiz görsel verisi veya dosya yolu: {image_input[:30]}...]"
+            # Çözme, küçültme ve yeniden kodlama CPU yoğun olduğu için döngü dışında yapılır
+            loop = asyncio.get_running_loop()
+            try:
+                image_url = await loop.run_in_executor(None, self.images.to_data_url, image_input)
+            except InvalidImage as e:
+                return f"[Hata: {e}]"
             
-            response = self.client.chat.completions.create(
-                model="meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
+            response = await self.llm.create(
+                model=self.primary_model,
                 messages=[{
                     "role": "user",
                     "content": [
@@ -160,50 +483,54 @@ class MCPClient:
     
     def reset_conversation(self):
         """Sohbet geçmişini sıfırlar, sadece sistem mesajını korur"""
-        system_message = next((msg for msg in self.messages if msg["role"] == "system"), None)
-        self.messages = [system_message] if system_message else [
-            {"role": "system", "content": "Sen bir yardımcı asistansın ve gerektiğinde araçları kullanabilirsin."}
-        ]
+        # Günlük açıksa eski sohbet saklanır, yeni bir sohbet başlatılır
+        if self.store:
+            self.context.journal = self.store.create()
+        self.context.reset()
         return "Sohbet geçmişi temizlendi."
 
     async def cleanup(self):
         """Kaynakları temizle"""
         try:
-            await self.exit_stack.aclose()
+            await self.pool.close()
         except Exception as e:
             print(f"Temizleme sırasında hata: {e}")
         finally:
-            self.session = None
+            await self.llm.aclose()
+            self.tracer.close()
+            if self.response_cache:
+                self.response_cache.store.close()
+            if self.store:
+                self.store.close()
 
 
 def main():
     if len(sys.argv) < 2:
-        print("Kullanım: python d1.py <sunucu_script_yolu>")
+        print("Kullanım: python d1.py <sunucu_script_yolu> [<sunucu_script_yolu> ...]")
         sys.exit(1)
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    # GUI modülünü importla
+    from gui import GUI, AsyncioThread
 
+    runner = AsyncioThread()
     client = MCPClient()
     
     try:
         # Sunucuya bağlan
-        print(f"Sunucuya bağlanılıyor: {sys.argv[1]}")
-        loop.run_until_complete(client.connect_to_server(sys.argv[1]))
+        print(f"Sunuculara bağlanılıyor: {', '.join(sys.argv[1:])}")
+        runner.run(client.connect_to_servers(sys.argv[1:]))
         print("Sunucu bağlantısı başarılı")
         
-        # GUI modülünü importla
-        from gui import GUI
-        
         # GUI'yi başlat
-        gui = GUI(client, loop)
+        gui = GUI(client, runner.loop)
         gui.start()
     except Exception as e:
         print(f"Hata: {e}")
         traceback.print_exc()
     finally:
         print("Kaynaklar temizleniyor...")
-        loop.run_until_complete(client.cleanup())
+        runner.run(client.cleanup(), timeout=15)
+        runner.stop()
         print("Program sonlandı")
 
 
@@ -3,15 +3,250 @@
 import tkinter as tk
 from tkinter.scrolledtext import ScrolledText
 import asyncio
-from PIL import ImageGrab, Image
-import io
-import base64
+import concurrent.futures
+import itertools
+import os
+import queue
+import threading
+from typing import Optional
 import traceback
+import zlib
+
+class AsyncioThread:
+    """
+    asyncio olay döngüsünü kendi iş parçacığında çalıştırır.
+
+    Tk ana iş parçacığını bloklamadan coroutine'ler `submit` ile gönderilir;
+    `run` ise sonucu bekler (başlangıç ve kapanış için).
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="asyncio", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: Optional[float] = None):
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        if not self.loop.is_running():
+            self.loop.close()
+
+
+class TranscriptView:
+    """
+    Sohbet metnini sınırlı ve toplu güncellenen bir Text bileşeninde gösterir.
+
+    Yazılanlar bir tamponda birikir ve her karede tek bir ekleme ile ekrana
+    aktarılır (`flush`). Satır sayısı `max_lines` değerini aşınca en eski
+    satırlar silinir. `collapse_chars` karakterden uzun mesajlar kısa bir
+    önizleme ve "tümünü göster" bağlantısıyla daraltılır. Mesajın kalıcı
+    kaydı varsa tam metin bellekte tutulmaz, tıklanınca `loader` ile yüklenir;
+    yoksa sıkıştırılmış bir kopyası saklanır.
+
+    Her mesajın kendi tanıtıcısı ve başlangıç/bitiş işaretleri vardır; akış
+    sürerken araya giren mesajlar (hata raporları, görsel yanıtları) sona
+    eklenir, akan mesajın kalanı kendi bölgesine yazılmaya devam eder.
+
+    Args:
+        widget: Salt okunur Text bileşeni
+        max_lines: Bileşende tutulacak azami satır sayısı
+        collapse_chars: Bu uzunluktan büyük mesajlar daraltılır
+        preview_chars: Daraltılmış mesajda gösterilecek karakter sayısı
+        loader: `loader(kayıt_anahtarı, geri_çağrı)`; tam metni okur ve Tk iş
+            parçacığında `geri_çağrı(metin)` çağrılmasını sağlar. Okuma bu
+            iş parçacığında yapılmamalıdır.
+    """
+
+    def __init__(self, widget, max_lines: int = 5000, collapse_chars: int = 4000,
+                 preview_chars: int = 600, loader=None):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.collapse_chars = collapse_chars
+        self.preview_chars = preview_chars
+        self.loader = loader
+        self._pending = []
+        # Tanıtıcılar asyncio iş parçacığında da alınır; sayaç GIL altında atomik ilerler
+        self._handles = itertools.count(1)
+        # Açık mesajlar: tanıtıcı -> yazılan karakter sayısı
+        self._open = {}
+        # Daraltılmış mesajların kayıt anahtarları ya da (kaydı olmayanların)
+        # sıkıştırılmış tam metinleri, tanıtıcıya göre; bileşenden silinen
+        # mesajlarınki atılır. Yüklenip açılan metinler daraltılana kadar tutulur.
+        self._records = {}
+        self._bodies = {}
+        self._expanded = {}
+        self.widget.tag_config("link", foreground="blue", underline=True)
+        self.widget.tag_bind("link", "<Enter>", lambda event: self.widget.config(cursor="hand2"))
+        self.widget.tag_bind("link", "<Leave>", lambda event: self.widget.config(cursor=""))
+
+    def new_handle(self) -> int:
+        """Yeni bir mesaj tanıtıcısı ayırır (herhangi bir iş parçacığından çağrılabilir)"""
+        return next(self._handles)
+
+    def begin_message(self, handle: int):
+        """Mesajı metnin sonunda başlatır"""
+        self.flush()
+        self._open[handle] = 0
+        for mark in (f"msg{handle}", f"msg{handle}end"):
+            self.widget.mark_set(mark, "end-1c")
+            self.widget.mark_gravity(mark, tk.LEFT)
+
+    def write(self, handle: int, text: str):
+        if handle in self._open:
+            self._pending.append((handle, text))
+            self._open[handle] += len(text)
+
+    def end_message(self, handle: int, record_key=None):
+        """
+        Mesajı bitirir; çok uzunsa daraltır.
+
+        Args:
+            handle: begin_message ile başlatılan mesaj
+            record_key: Mesajın kalıcı kayıtlarını gösteren anahtar; `loader` bununla çağrılır
+        """
+        self.flush()
+        chars = self._open.pop(handle, None)
+        if chars is None:
+            return
+        start, end = f"msg{handle}", f"msg{handle}end"
+        if chars > self.collapse_chars:
+            body = self.widget.get(start, end)
+            # Baştan kırpılan mesajların kalan kısmı kısa olabilir
+            if len(body) > self.collapse_chars:
+                if self.loader is not None and record_key is not None:
+                    self._records[handle] = record_key
+                else:
+                    self._bodies[handle] = zlib.compress(body.encode("utf-8"))
+                self._render(self.widget.index(start), self.widget.index(end), handle, body, expanded=False)
+                self.widget.tag_bind(f"expand{handle}", "<Button-1>", lambda event: self._toggle(handle, True))
+                self.widget.tag_bind(f"collapse{handle}", "<Button-1>", lambda event: self._toggle(handle, False))
+        self.widget.mark_unset(start, end)
+
+    def flush(self):
+        """Tampondaki metni mesaj başına tek seferde ekler, eski satırları kırpar ve sona kaydırır"""
+        if not self._pending:
+            return
+        groups = []
+        for handle, text in self._pending:
+            if groups and groups[-1][0] == handle:
+                groups[-1][1].append(text)
+            else:
+                groups.append((handle, [text]))
+        self._pending.clear()
+        self.widget.config(state=tk.NORMAL)
+        for handle, parts in groups:
+            end = f"msg{handle}end"
+            self._insert(end, handle, "".join(parts), (end,))
+        self._trim()
+        self.widget.config(state=tk.DISABLED)
+        self.widget.see(tk.END)
+
+    def clear(self):
+        self._pending.clear()
+        for store in (self._records, self._bodies, self._expanded):
+            store.clear()
+        self.widget.config(state=tk.NORMAL)
+        self.widget.delete("1.0", tk.END)
+        self.widget.config(state=tk.DISABLED)
+
+    def _insert(self, index, handle: int, items, moved=(), delete_to=None):
+        """
+        Metni `index` konumuna ekler (varsa önce `delete_to`'ya kadar siler).
+
+        Bu mesajdan sonra başlamış açık mesajların aynı konumdaki işaretleri,
+        `moved` ile verilenlerle birlikte eklenen metnin arkasına kayar.
+        """
+        if isinstance(items, str):
+            items = (items,)
+        edge = delete_to if delete_to is not None else index
+        marks = list(moved) + [mark for other in self._open if other > handle
+                               for mark in (f"msg{other}", f"msg{other}end")
+                               if self.widget.compare(mark, "==", edge)]
+        for mark in marks:
+            self.widget.mark_gravity(mark, tk.RIGHT)
+        index = self.widget.index(index)
+        if delete_to is not None:
+            self.widget.delete(index, delete_to)
+        self.widget.insert(index, *items)
+        for mark in marks:
+            self.widget.mark_gravity(mark, tk.LEFT)
+
+    def _trim(self):
+        lines = int(self.widget.index("end-1c").split(".")[0])
+        excess = lines - self.max_lines
+        if excess <= 0:
+            return
+        self.widget.delete("1.0", f"{excess + 1}.0")
+        # Silinen daraltılmış mesajların metinleri artık gerekmez
+        for store in (self._records, self._bodies, self._expanded):
+            for key in [key for key in store if not self.widget.tag_ranges(f"body{key}")]:
+                del store[key]
+
+    def _load(self, key) -> str:
+        if key in self._bodies:
+            return zlib.decompress(self._bodies[key]).decode("utf-8")
+        if key in self._expanded:
+            return self._expanded.pop(key)
+        return "[Mesajın tam metni artık mevcut değil]"
+
+    def _toggle(self, key, expanded: bool):
+        if expanded and key in self._records:
+            # Tam metin arka planda okunur; gelince (mesaj hâlâ ekrandaysa) açılır
+            self.loader(self._records[key], lambda body: self._show(key, body, expanded=True))
+        else:
+            self._show(key, self._load(key), expanded)
+
+    def _show(self, key, body: str, expanded: bool):
+        ranges = self.widget.tag_ranges(f"body{key}")
+        if not ranges:
+            return
+        if expanded and key in self._records:
+            self._expanded[key] = body
+        self._render(ranges[0], ranges[-1], key, body, expanded)
+
+    def _render(self, start, end, key, body: str, expanded: bool):
+        tag = f"body{key}"
+        trailing = "\n" if body.endswith("\n") else ""
+        text = body[:len(body) - len(trailing)]
+        if expanded:
+            segments = [(text, (tag,)), (" [Daralt]", ("link", f"collapse{key}", tag))]
+        else:
+            segments = [(text[:self.preview_chars] + "… ", (tag,)),
+                        (f"[Tümünü göster ({len(text)} karakter)]", ("link", f"expand{key}", tag))]
+        if trailing:
+            segments.append((trailing, (tag,)))
+
+        self.widget.config(state=tk.NORMAL)
+        self._insert(start, key, [item for segment in segments for item in segment], delete_to=end)
+        self.widget.config(state=tk.DISABLED)
+
 
 class GUI:
-    def __init__(self, client, loop: asyncio.AbstractEventLoop):
+    # Arayüz kuyruğunun boşaltılma aralığı ve bir seferde uygulanan güncelleme sayısı
+    UI_FRAME_MS = 16
+    UI_BATCH_SIZE = 500
+
+    def __init__(self, client, loop: asyncio.AbstractEventLoop,
+                 ready: Optional[concurrent.futures.Future] = None):
         self.client = client
+        # Döngü ayrı bir iş parçacığında çalışır (bkz. AsyncioThread)
         self.loop = loop
+        # Sunucu bağlantısı arka planda sürerken gelen sorgular bu future'ı bekler
+        self.ready = ready
+        # Sorgular aynı sohbet geçmişini kullandığı için gönderim sırasıyla tek tek işlenir
+        self._query_lock = asyncio.Lock()
+        self._ui_thread = threading.get_ident()
+        self._ui_queue = queue.SimpleQueue()
         self.root = tk.Tk()
         self.root.title("MCP Chat GUI")
         
@@ -23,6 +258,14 @@ class GUI:
         self.text_area = ScrolledText(main_frame, wrap=tk.WORD, height=25, width=80)
         self.text_area.pack(fill=tk.BOTH, expand=True, padx=0, pady=(0, 10))
         self.text_area.config(state=tk.DISABLED)
+        # Uzun oturumlarda bileşen büyümesin diye satır sınırı ve uzun mesaj daraltma
+        self.view = TranscriptView(
+            self.text_area,
+            max_lines=int(os.getenv("GUI_MAX_LINES", "5000")),
+            collapse_chars=int(os.getenv("GUI_COLLAPSE_CHARS", "4000")),
+            # Sohbet günlüğü açıksa daraltılan mesajların tam metni bellekte tutulmaz
+            loader=self._load_message if getattr(client, "store", None) else None
+        )
         
         # Giriş ve buton çerçevesi
         input_frame = tk.Frame(main_frame)
@@ -83,6 +326,78 @@ class GUI:
         
         # Başlangıç mesajı
         self._append_text("MCP Chat sistemine hoş geldiniz! Yardım için 'Yardım' butonuna tıklayabilir veya Ctrl+2 kısayolunu kullanabilirsiniz.")
+        self._show_history()
+
+        if ready is not None and not ready.done():
+            self.status_var.set("Sunuculara bağlanılıyor...")
+        if ready is not None:
+            ready.add_done_callback(self._on_ready)
+        # Uzun süren araçların ilerlemesi durum çubuğunda canlı gösterilir
+        self.client.on_tool_progress = self._on_tool_progress
+
+    def _show_history(self):
+        """Devam edilen sohbetin canlı bağlamındaki mesajları gösterir"""
+        for record_id, message in self.client.context.entries():
+            content = message.get("content")
+            if message["role"] in ("user", "assistant") and isinstance(content, str) and content:
+                key = (record_id, record_id, message["role"]) if record_id is not None else None
+                self._append_text(f"{self._speaker(message)}: {content}", key)
+
+    @staticmethod
+    def _speaker(message: dict) -> str:
+        return "Kullanıcı" if message["role"] == "user" else "Asistan"
+
+    def _turn_key(self):
+        """
+        Son turun kayıt aralığı: kullanıcı mesajından son kayda kadar.
+
+        Akan yanıt birden çok araç turundaki asistan mesajlarından oluşur;
+        yalnızca son asistan kaydı ekranda görünen metnin tamamını içermez.
+        """
+        entries = self.client.context.entries()
+        first = next((record_id for record_id, message in reversed(entries) if message["role"] == "user"), None)
+        last = self.client.last_message_id
+        if first is None or last is None:
+            return None
+        return first, last, "assistant"
+
+    def _load_message(self, key, done):
+        """Daraltılan mesajı depodan okur; okuma Tk yerine asyncio iş parçacığı tarafında yapılır"""
+        self._submit(self._read_message(key, done))
+
+    async def _read_message(self, key, done):
+        first, last, role = key
+        try:
+            # SQLite okuması akışları da bekletmesin diye havuzda yapılır
+            messages = await asyncio.get_running_loop().run_in_executor(
+                None, self.client.store.messages_between, first, last)
+            contents = [message["content"] for message in messages
+                        if message["role"] == role and isinstance(message.get("content"), str)]
+            text = f"{self._speaker({'role': role})}: " + "\n".join(contents) + "\n"
+        except Exception as e:
+            text = f"[Mesaj yüklenemedi: {e}]\n"
+        self._call_ui(done, text)
+
+    def _on_tool_progress(self, tool_name: str, progress):
+        self._set_status(f"{tool_name}: {progress.describe()}")
+
+    def _on_ready(self, future):
+        if future.cancelled():
+            return
+        if future.exception():
+            self._append_text(f"Sistem: [Sunucu bağlantısı kurulamadı: {future.exception()}]")
+            self._set_status("Bağlantı hatası")
+        else:
+            self._set_status("Hazır")
+
+    async def _wait_ready(self):
+        """Sunucu bağlantısı bitene kadar bekler; sıraya alınan sorgular gönderildikleri sırayla devam eder"""
+        if self.ready is None:
+            return
+        if not self.ready.done():
+            self._set_status("Sunucu bağlantısı bekleniyor, sorgu sıraya alındı...")
+        await asyncio.wrap_future(self.ready)
+        self._set_status("İşleniyor...")
 
     def insert_shortcut(self, command, is_prefix=False):
         """Kısayolu giriş alanına ekler"""
@@ -101,26 +416,37 @@ class GUI:
     
     def clear_chat(self, event=None):
         """Sohbet alanını temizler"""
-        self.text_area.config(state=tk.NORMAL)
-        self.text_area.delete(1.0, tk.END)
-        self.text_area.config(state=tk.DISABLED)
-        self.status_var.set("Sohbet temizlendi")
+        self.view.clear()
+        self._set_status("Sohbet temizlendi")
         self._append_text("Sohbet alanı temizlendi. Sohbet geçmişi hala korunuyor.")
     
     def reset_conversation(self, event=None):
         """Sohbet geçmişini sıfırlar"""
-        asyncio.ensure_future(self._reset_conversation(), loop=self.loop)
+        self._submit(self._reset_conversation())
     
     async def _reset_conversation(self):
-        result = self.client.reset_conversation()
-        self.clear_chat()
+        # Süren tur bitmeden sıfırlanmaz; yanıt yeni sohbetin geçmişine yazılmasın
+        async with self._query_lock:
+            result = self.client.reset_conversation()
+        self._call_ui(self.clear_chat)
         self._append_text(f"Sistem: {result}")
-        self.status_var.set("Sohbet sıfırlandı")
+        self._set_status("Sohbet sıfırlandı")
         
     def start(self):
-        self._integrate_asyncio()
+        self._drain_ui_queue()
         self.root.mainloop()
 
+    def _submit(self, coro):
+        """Coroutine'i asyncio iş parçacığındaki döngüye gönderir"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(self._report_failure)
+        return future
+
+    def _report_failure(self, future):
+        if not future.cancelled() and future.exception():
+            self._append_text(f"[Hata: {future.exception()}]")
+            self._set_status("Hazır")
+
     def send_query(self):
         query = self.entry.get().strip()
         if not query:
@@ -132,126 +458,140 @@ class GUI:
         if query == "image:[Panodaki görsel]" or query == "image:":
             # Bu durumda panodan görsel işleme fonksiyonunu doğrudan çağır
             self._append_text(f"\nKullanıcı: [Panodan görsel yapıştırıldı]")
-            asyncio.ensure_future(self._process_clipboard_image(), loop=self.loop)
+            self._submit_clipboard_image()
         else:
             self._append_text(f"\nKullanıcı: {query}")
-            self.status_var.set("İşleniyor...")
+            self._set_status("İşleniyor...")
 
             if query.startswith("image:"):
                 image_data = query[len("image:"):].strip()
-                asyncio.ensure_future(self._handle_image_query(image_data), loop=self.loop)
+                self._submit(self._handle_image_query(image_data))
             else:
-                asyncio.ensure_future(self._handle_response(query), loop=self.loop)
+                self._submit(self._handle_response(query))
     async def _handle_response(self, query: str):
-        yanit = await self.client.process_query(query)
-        self._append_text(f"Asistan: {yanit}")
-        self.status_var.set("Hazır")
+        await self._wait_ready()
+        async with self._query_lock:
+            # Yanıtı parçalar geldikçe ekrana yaz
+            # Akış sürerken araya giren mesajlar yanıtı bölmesin diye yanıt kendi tanıtıcısıyla yazılır
+            handle = self.view.new_handle()
+            self._call_ui(self.view.begin_message, handle)
+            self._insert_text(handle, "Asistan: ")
+            async for token in self.client.stream_query(query):
+                self._insert_text(handle, token)
+            self._insert_text(handle, "\n")
+            self._call_ui(self.view.end_message, handle, self._turn_key())
+            # İzleme açıksa durum çubuğunda son turun aşama süreleri gösterilir
+            buffer = self.client.trace_buffer
+            self._set_status((buffer.summary() if buffer else None) or "Hazır")
 
     async def _handle_image_query(self, image_data: str):
-        """Görsel sorgularını işler. Base64 veya dosya yolu kabul eder."""
-        self.status_var.set("Görsel analiz ediliyor...")
-        yanit = None
-        
+        """Görsel sorgularını işler. Data URL, base64 veya dosya yolu kabul eder."""
+        if not image_data.strip():
+            # Pano Tk iş parçacığında okunur; görsel oradan yeniden gönderilir
+            self._call_ui(self._submit_clipboard_image)
+            return
+
+        self._set_status("Görsel analiz ediliyor...")
         try:
-            # Base64 verisi kontrolü
-            if image_data.startswith("data:image"):
-                # Zaten uygun formatta
-                yanit = await self.client.process_image_query(image_data, "Bu görseli açıkla.")
-            
-            elif len(image_data) > 100:  # Muhtemelen base64 verisi
-                try:
-                    # Base64 decode kontrolü
-                    base64.b64decode(image_data)
-                    image_url = f"data:image/png;base64,{image_data}"
-                    yanit = await self.client.process_image_query(image_url, "Bu görseli açıkla.")
-                except Exception as e:
-                    self._append_text(f"[Hata: Base64 verisi işlenemedi - {str(e)}]")
-            
-            # Boş veya kısa input - panoya bak veya dosya yolu olarak dene
-            if not yanit:
-                if not image_data.strip():
-                    # Panodan alma denemesi
-                    yanit = await self._process_clipboard_image()
-                else:
-                    # Dosya yolu olarak dene
-                    try:
-                        with open(image_data, "rb") as image_file:
-                            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-                            image_url = f"data:image/png;base64,{base64_image}"
-                            yanit = await self.client.process_image_query(image_url, "Bu görseli açıkla.")
-                    except FileNotFoundError:
-                        yanit = f"[Hata: '{image_data}' dosyası bulunamadı]"
-                    except Exception as e:
-                        yanit = f"[Hata: Dosya okuma hatası - {str(e)}]"
-        
+            # Doğrulama, küçültme ve kodlama istemcideki görsel hattında tek seferde yapılır
+            yanit = await self.client.process_image_query(image_data, "Bu görseli açıkla.")
         except Exception as e:
             yanit = f"[Görsel işleme hatası: {str(e)}]"
             self._append_text(f"[Hata detayı: {traceback.format_exc()}]")
         
         if yanit:
             self._append_text(f"Asistan: {yanit}")
-        self.status_var.set("Hazır")
+        self._set_status("Hazır")
+
+    def _grab_clipboard(self):
+        """Panodaki görseli döndürür, yoksa None. Tk iş parçacığında çağrılmalıdır."""
+        from PIL import ImageGrab, Image
+        image = ImageGrab.grabclipboard()
+        return image if isinstance(image, Image.Image) else None
 
-    """Panodan resmi işler ve sonucu ekrana yazdırır"""
-    async def _process_clipboard_image(self):
+    def _submit_clipboard_image(self):
+        """Panodaki görseli Tk iş parçacığında alır, işlenmesi için döngüye gönderir"""
         try:
-            image = ImageGrab.grabclipboard()
-            if isinstance(image, Image.Image):
-                self.status_var.set("Panodaki görsel işleniyor...")
-                buffer = io.BytesIO()
-                image.save(buffer, format="PNG")
-                base64_image = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                image_url = f"data:image/png;base64,{base64_image}"
-
-                # Doğrudan LLM'e gönder
-                yanit = await self.client.process_image_query(image_url, "Bu görseli açıkla.")
+            image = self._grab_clipboard()
+        except Exception as e:
+            self._append_text(f"Sistem: [Pano görsel işleme hatası: {str(e)}]")
+            self._set_status("Hazır")
+            return
+        self._submit(self._process_clipboard_image(image))
+
+    async def _process_clipboard_image(self, image):
+        """Panodan alınan görseli işler ve sonucu ekrana yazdırır"""
+        try:
+            if image is not None:
+                self._set_status("Panodaki görsel işleniyor...")
+                # Görsel PNG'ye kodlanmadan doğrudan istemcinin görsel hattına verilir
+                yanit = await self.client.process_image_query(image, "Bu görseli açıkla.")
                 self._append_text(f"Asistan: {yanit}")
-                self.status_var.set("Hazır")
+                self._set_status("Hazır")
                 return yanit
             else:
                 error_msg = "Panoda görsel bulunamadı. Lütfen önce bir görsel kopyalayın."
                 self._append_text(f"Sistem: {error_msg}")
-                self.status_var.set("Hazır")
+                self._set_status("Hazır")
                 return error_msg
         except Exception as e:
             error_msg = f"[Pano görsel işleme hatası: {str(e)}]"
             self._append_text(f"Sistem: {error_msg}")
-            self.status_var.set("Hazır")
+            self._set_status("Hazır")
             return error_msg
 
 
-    def _append_text(self, text):
-        self.text_area.config(state=tk.NORMAL)
-        self.text_area.insert(tk.END, text + "\n")
-        self.text_area.config(state=tk.DISABLED)
-        self.text_area.see(tk.END)
+    def _append_text(self, text, record_key=None):
+        handle = self.view.new_handle()
+        self._call_ui(self.view.begin_message, handle)
+        self._insert_text(handle, text + "\n")
+        self._call_ui(self.view.end_message, handle, record_key)
 
-    def _integrate_asyncio(self, interval=100):
-        def poll():
-            self.loop.call_soon(self.loop.stop)
-            self.loop.run_forever()
-            self.root.after(interval, poll)
+    def _insert_text(self, handle, text):
+        self._call_ui(self.view.write, handle, text)
 
-        self.root.after(interval, poll)
+    def _set_status(self, text):
+        self._call_ui(self.status_var.set, text)
+
+    def _call_ui(self, func, *args):
+        """Tk iş parçacığındaysa hemen çalıştırır, değilse arayüz kuyruğuna ekler"""
+        # Kuyrukta bekleyen güncelleme varsa sırayı bozmamak için o da kuyruğa girer
+        if threading.get_ident() == self._ui_thread and self._ui_queue.empty():
+            func(*args)
+            self.view.flush()
+        else:
+            self._ui_queue.put((func, args))
+
+    def _drain_ui_queue(self):
+        """Kuyruktaki arayüz güncellemelerini toplu halde uygular"""
+        for _ in range(self.UI_BATCH_SIZE):
+            try:
+                func, args = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            func(*args)
+        # Karedeki tüm yazılar Text bileşenine tek ekleme olarak gider
+        self.view.flush()
+        self.root.after(self.UI_FRAME_MS, self._drain_ui_queue)
 
     def _handle_paste(self, event):
         """Panodan yapıştırma işlemini yönetir"""
         if self.entry.get().startswith("image:"):
             try:
-                image = ImageGrab.grabclipboard()
-                if isinstance(image, Image.Image):
-                    self.status_var.set("Görsel panodan yapıştırılıyor...")
-                    # Önce görsel işleme işini başlat
-                    asyncio.ensure_future(self._process_clipboard_image(), loop=self.loop)
+                image = self._grab_clipboard()
+                if image is not None:
+                    self._set_status("Görsel panodan yapıştırılıyor...")
+                    # Önce görsel işleme işini başlat; görsel burada, Tk iş parçacığında alındı
+                    self._submit(self._process_clipboard_image(image))
                     # Görsel işleme başladığını belirt
                     self._append_text("\nKullanıcı: [Panodan görsel yapıştırıldı]")
                     # Entry'i temizle
                     self.entry.delete(0, tk.END)
                     return "break"  # Tkinter'in kendi yapıştırma işlemini engelle
                 else:
-                    self.status_var.set("Panoda görsel bulunamadı! Lütfen bir görsel kopyalayın.")
+                    self._set_status("Panoda görsel bulunamadı! Lütfen bir görsel kopyalayın.")
             except Exception as e:
-                self.status_var.set(f"Yapıştırma hatası: {str(e)}")
+                self._set_status(f"Yapıştırma hatası: {str(e)}")
                 # Detaylı hata kaydı ekle
                 print(f"Yapıştırma hatası: {traceback.format_exc()}")
         return None  # Tkinter'in varsayılan yapıştırma davranışına izin ver
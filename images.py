@@ -0,0 +1,183 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+_DATA_URL_RE = re.compile(r"^data:image/[\w.+-]+;base64,", re.IGNORECASE)
+# Base64 geçerliliği için yalnızca baştaki bir parça kontrol edilir
+_BASE64_RE = re.compile(r"^[A-Za-z0-9+/\s]+={0,2}$")
+_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+class InvalidImage(ValueError):
+    """Girdi çözülebilir bir görsel değil"""
+
+
+class ImagePipeline:
+    """
+    Görselleri LLM'e gönderilmeden önce tek geçişte hazırlar.
+
+    Girdi (dosya yolu, base64, data URL ya da PIL görseli) bir kez çözülür,
+    uzun kenarı `max_edge` değerini aşıyorsa küçültülür ve `format`/`quality`
+    ile yeniden kodlanır. Sonuç ham içeriğin özetiyle anahtarlanan bir LRU
+    önbellekte tutulur; aynı görsel tekrar sorulduğunda yeniden kodlanmaz.
+    PIL görsellerinde kaynak baytlar biliniyorsa (henüz çözülmemiş, bellekten
+    ya da dosyadan açılmış görsel) anahtar onlardan, bilinmiyorsa piksellerden üretilir.
+
+    Args:
+        max_edge: Uzun kenar için piksel sınırı
+        format: Hedef biçim ("JPEG", "WEBP" ya da "PNG")
+        quality: JPEG/WEBP kalitesi
+        cache_size: Önbellekte tutulacak azami görsel sayısı
+    """
+
+    def __init__(self, max_edge: int = 1568, format: str = "JPEG", quality: int = 85,
+                 cache_size: int = 32):
+        self.max_edge = max_edge
+        self.format = format.upper()
+        self.quality = quality
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def to_data_url(self, image_input) -> str:
+        """
+        Girdiyi küçültülmüş ve yeniden kodlanmış bir data URL'e çevirir.
+
+        Raises:
+            InvalidImage: Girdi geçerli bir görsel değilse
+        """
+        # PIL yalnızca görsel sorgularında gerektiği için ilk kullanımda yüklenir
+        from PIL import Image
+
+        if isinstance(image_input, Image.Image):
+            source = self._source_bytes(image_input)
+            if source is None:
+                # Kaynağı bilinmeyen görselin tüm pikselleri özetlenmek zorunda
+                key = self._key(image_input.tobytes(), f"{image_input.mode}{image_input.size}".encode())
+                return self._cached(key, lambda: self._encode(image_input))
+            return self._cached(self._key(source), lambda: self._data_url(source, image_input.format)
+                                if self._fits(image_input) else self._encode(image_input))
+
+        raw = self._read(image_input)
+        key = self._key(raw)
+        return self._cached(key, lambda: self._process(raw))
+
+    def _read(self, image_input: str) -> bytes:
+        """Girdiyi ham bayt olarak tek seferde okur"""
+        if _DATA_URL_RE.match(image_input):
+            return self._b64decode(image_input.split(",", 1)[1])
+        if len(image_input) < 4096 and os.path.isfile(image_input):
+            with open(image_input, "rb") as image_file:
+                return image_file.read()
+        if not _BASE64_RE.match(image_input[:1024]):
+            raise InvalidImage(f"Geçersiz görsel verisi veya dosya yolu: {image_input[:30]}...")
+        return self._b64decode(image_input)
+
+    @staticmethod
+    def _source_bytes(image) -> Optional[bytes]:
+        """
+        PIL görselinin açıldığı baytlar; görsel çözülmüşse ya da kaynağı yoksa None.
+
+        Çözülen görselin pikselleri açıldıktan sonra değiştirilmiş olabilir,
+        bu yüzden yalnızca henüz yüklenmemiş görsellerin kaynağına güvenilir.
+        """
+        fp = getattr(image, "fp", None)
+        # Piksel verisi Pillow 11'den beri `_im`de; `im` özelliği yüklenmemiş görselde okunamaz
+        pixels = vars(image).get("_im", vars(image).get("im"))
+        if fp is None or pixels is not None:
+            return None
+        if isinstance(fp, io.BytesIO):
+            return fp.getvalue()
+        filename = getattr(image, "filename", None)
+        if not filename:
+            return None
+        try:
+            with open(filename, "rb") as image_file:
+                return image_file.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _b64decode(data: str) -> bytes:
+        try:
+            return base64.b64decode(data)
+        except (binascii.Error, ValueError) as e:
+            raise InvalidImage(f"Base64 verisi çözülemedi: {e}")
+
+    def _key(self, raw: bytes, extra: bytes = b"") -> str:
+        digest = hashlib.blake2b(raw, digest_size=16)
+        digest.update(extra)
+        digest.update(f"{self.max_edge}:{self.format}:{self.quality}".encode())
+        return digest.hexdigest()
+
+    def _cached(self, key: str, build) -> str:
+        # Dönüştürme iş parçacığı havuzunda çalıştığı için önbellek kilitle korunur
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        data_url = build()
+        with self._lock:
+            self._cache[key] = data_url
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return data_url
+
+    def _process(self, raw: bytes) -> str:
+        from PIL import Image
+
+        try:
+            image = Image.open(io.BytesIO(raw))
+        except Exception:
+            raise InvalidImage("Görsel biçimi tanınmadı")
+
+        if self._fits(image):
+            return self._data_url(raw, image.format)
+
+        # JPEG için çözme sırasında küçültme (tam çözünürlükte açmaktan çok daha ucuz)
+        if image.format == "JPEG":
+            image.draft("RGB", (self.max_edge, self.max_edge))
+        return self._encode(image)
+
+    def _fits(self, image) -> bool:
+        """Zaten küçük ve desteklenen biçimdeyse yeniden kodlamadan gönderilir"""
+        return max(image.size) <= self.max_edge and image.format in ("JPEG", "PNG", "WEBP")
+
+    def _encode(self, image) -> str:
+        from PIL import Image
+
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA")
+        if max(image.size) > self.max_edge:
+            # resize yeni bir görsel döndürür; çağıranın görseli değişmez
+            scale = self.max_edge / max(image.size)
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+        if self.format == "JPEG" and image.mode not in ("RGB", "L"):
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+            image = background
+
+        buffer = io.BytesIO()
+        options = {} if self.format == "PNG" else {"quality": self.quality}
+        image.save(buffer, format=self.format, optimize=True, **options)
+        return self._data_url(buffer.getvalue(), self.format)
+
+    @staticmethod
+    def _data_url(data: bytes, format: Optional[str]) -> str:
+        mime = _MIME_TYPES.get(format, "image/png")
+        return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache)}
@@ -0,0 +1,276 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional
+
+
+def _field(obj, name, default=None):
+    """Hem sözlük hem nesne biçimindeki alanları okur"""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+class StreamedMessage:
+    """
+    Akış parçalarından (chunk) asistan mesajını birleştirir.
+
+    Metin parçaları `content` içinde, parça parça gelen araç çağrıları
+    `tool_calls` içinde OpenAI biçiminde toplanır.
+    """
+
+    def __init__(self):
+        self.content = ""
+        self.chunks = 0
+        self.usage = None
+        self._tool_calls = {}
+
+    def add(self, chunk) -> str:
+        """Bir parçayı işler ve varsa yeni metni döndürür"""
+        self.chunks += 1
+        self.usage = _field(chunk, "usage") or self.usage
+        choices = _field(chunk, "choices") or []
+        if not choices:
+            return ""
+        delta = _field(choices[0], "delta")
+        text = _field(delta, "content") or ""
+        self.content += text
+
+        for i, call in enumerate(_field(delta, "tool_calls") or []):
+            index = _field(call, "index", i)
+            entry = self._tool_calls.setdefault(index, {
+                "id": None,
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if _field(call, "id"):
+                entry["id"] = _field(call, "id")
+            function = _field(call, "function")
+            if _field(function, "name"):
+                entry["function"]["name"] += _field(function, "name")
+            if _field(function, "arguments"):
+                entry["function"]["arguments"] += _field(function, "arguments")
+        return text
+
+    def restore(self, content: str, tool_calls: list):
+        """Önbellekten gelen tamamlanmış mesajı yükler"""
+        self.content = content or ""
+        self._tool_calls = dict(enumerate(tool_calls or []))
+
+    @property
+    def tool_calls(self) -> list:
+        return [self._tool_calls[index] for index in sorted(self._tool_calls)]
+
+    @property
+    def completion_tokens(self) -> int:
+        """Sunucunun bildirdiği, yoksa metinden tahmin edilen çıktı token sayısı"""
+        return _field(self.usage, "completion_tokens") or len(self.content) // 4
+
+
+class AsyncTogetherBackend:
+    """
+    Together'ın yerel async istemcisini kullanan LLM arka ucu.
+
+    together paketinin yüklenmesi uzun sürdüğü için istemci ilk kullanımda
+    (ya da `load` ile arka planda) oluşturulur.
+
+    AsyncTogether kendi HTTP oturumunu tutmaz; `together.aiosession`
+    verilmezse her istek için yeni bir aiohttp oturumu açar. Bu yüzden
+    istekler tek bir oturumu paylaşır ve oturum `aclose` ile kapatılır.
+    """
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._client = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client or self.load()
+
+    def load(self):
+        with self._lock:
+            if self._client is None:
+                from together import AsyncTogether
+                self._client = AsyncTogether(api_key=self.api_key)
+            return self._client
+
+    def _use_session(self):
+        """Paylaşılan aiohttp oturumunu bu görevin isteklerine bağlar"""
+        import aiohttp
+        import together
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return together.aiosession.set(self._session)
+
+    async def create(self, **kwargs):
+        client = self.client
+        import together
+
+        token = self._use_session()
+        try:
+            return await client.chat.completions.create(**kwargs)
+        finally:
+            together.aiosession.reset(token)
+
+    async def stream(self, **kwargs) -> AsyncIterator:
+        client = self.client
+        import together
+
+        # Oturum istek başında alınır; akışın geri kalanı bağlamdan bağımsızdır
+        token = self._use_session()
+        try:
+            response = await client.chat.completions.create(stream=True, **kwargs)
+        finally:
+            together.aiosession.reset(token)
+        async for chunk in response:
+            yield chunk
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class ThreadPoolBackend:
+    """
+    Senkron Together istemcisini sınırlı bir iş parçacığı havuzunda çalıştıran arka uç.
+
+    Çağrılar olay döngüsünü bloklamaz; akış parçaları kuyruk üzerinden
+    döngüye aktarılır.
+
+    Args:
+        client: Senkron istemci. Verilmezse ilk kullanımda Together oluşturulur.
+        max_workers: Aynı anda çalışabilecek istek sayısı
+    """
+
+    def __init__(self, client=None, api_key: Optional[str] = None, max_workers: int = 4):
+        self.api_key = api_key
+        self._client = client
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+
+    @property
+    def client(self):
+        return self._client or self.load()
+
+    def load(self):
+        """Senkron istemciyi oluşturur (ilk kullanımda ya da ön yüklemede)"""
+        with self._lock:
+            if self._client is None:
+                from together import Together
+                self._client = Together(api_key=self.api_key)
+            return self._client
+
+    async def create(self, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, lambda: self.client.chat.completions.create(**kwargs))
+
+    async def stream(self, **kwargs) -> AsyncIterator:
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self.client.chat.completions.create(stream=True, **kwargs):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        future = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Tüketici akışı erken bırakırsa üretici iş parçacığını durdur
+            stop.set()
+            if future.done():
+                await future
+
+    async def aclose(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RateLimiter:
+    """
+    Dakikadaki istek sayısını sınırlayan token kovası.
+
+    Args:
+        rpm: Dakikada izin verilen istek sayısı
+        burst: Art arda gönderilebilecek azami istek sayısı
+    """
+
+    def __init__(self, rpm: float, burst: Optional[int] = None):
+        self.rate = rpm / 60.0
+        self.capacity = burst or max(1, int(rpm // 60) or 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RateLimitedBackend:
+    """Her LLM isteğinden önce hız sınırlayıcıyı bekleyen arka uç sarmalayıcısı"""
+
+    def __init__(self, backend, limiter: RateLimiter):
+        self.backend = backend
+        self.limiter = limiter
+
+    async def create(self, **kwargs):
+        await self.limiter.acquire()
+        return await self.backend.create(**kwargs)
+
+    async def stream(self, **kwargs) -> AsyncIterator:
+        await self.limiter.acquire()
+        async for chunk in self.backend.stream(**kwargs):
+            yield chunk
+
+    def load(self):
+        load = getattr(self.backend, "load", None)
+        return load() if load else None
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+def create_backend(kind: str = "async", api_key: Optional[str] = None, max_workers: int = 4):
+    """
+    Adına göre LLM arka ucu oluşturur.
+
+    Args:
+        kind: "async" (yerel async istemci) ya da "thread" (iş parçacığı havuzu)
+        api_key: Together API anahtarı
+        max_workers: "thread" arka ucu için havuz boyutu
+    """
+    if kind == "async":
+        return AsyncTogetherBackend(api_key=api_key)
+    if kind == "thread":
+        return ThreadPoolBackend(api_key=api_key, max_workers=max_workers)
+    raise ValueError(f"Bilinmeyen LLM arka ucu: {kind}")
@@ -1,26 +1,128 @@
+import time
+
+# Başlangıç raporundaki süreler bu andan itibaren ölçülür
+STARTED = time.perf_counter()
+
+import argparse
 import asyncio
+import json
+import os
 import sys
-from gui import GUI
+import threading
+
+import_started = time.perf_counter()
 from d1 import MCPClient
+import_finished = time.perf_counter()
+
+
+class StartupReport:
+    """
+    Başlangıç aşamalarının zaman çizelgesi (`python -X importtime` çıktısına benzer).
+
+    Aşamalar çakışabilir (sunucu başlatma arka planda sürerken pencere açılır);
+    her satırda aşamanın başlangıç anı ve süresi milisaniye olarak verilir.
+    """
+
+    def __init__(self, origin: float):
+        self.origin = origin
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, end=None):
+        with self._lock:
+            self.phases.append((name, start, end))
+
+    def mark(self, name: str):
+        self.record(name, time.perf_counter())
+
+    def render(self) -> str:
+        lines = ["startup: başlangıç [ms] |   süre [ms] | aşama"]
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        for name, start, end in phases:
+            duration = f"{(end - start) * 1000:11.1f}" if end is not None else f"{'-':>11}"
+            lines.append(f"startup: {(start - self.origin) * 1000:14.1f} | {duration} | {name}")
+        return "\n".join(lines)
+
+
+async def run_batch(args, servers):
+    """Arayüz olmadan JSONL girdisindeki sohbetleri eşzamanlı çalıştırır"""
+    from batch import BatchRunner
+
+    client = MCPClient()
+    try:
+        await client.connect_to_servers(servers, lazy=args.lazy)
+        runner = BatchRunner(client, concurrency=args.concurrency, rpm=args.rpm)
+        summary = await runner.run(args.batch, args.output)
+        print(json.dumps(summary, ensure_ascii=False))
+    finally:
+        await client.cleanup()
+
+
+async def timed(report: StartupReport, name: str, coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        report.record(name, start, time.perf_counter())
+
 
 def main():
-    if len(sys.argv) < 2:
-        print("Kullanım: python main.py <sunucu_script_yolu>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="MCP Chat GUI")
+    parser.add_argument("servers", nargs="*", help="MCP sunucu scriptleri (.py ya da .js)")
+    parser.add_argument("--lazy", action="append", default=[], metavar="SCRIPT",
+                        help="İlk araç çağrısına kadar başlatılmayacak sunucu (birden çok kez verilebilir)")
+    parser.add_argument("--batch", metavar="INPUT.jsonl",
+                        help="Arayüz açmadan JSONL dosyasındaki istemleri toplu çalıştır")
+    parser.add_argument("--output", default="batch_output.jsonl", help="Toplu çalıştırma çıktı dosyası")
+    parser.add_argument("--concurrency", type=int, default=8, help="Eşzamanlı sohbet sayısı")
+    parser.add_argument("--rpm", type=float, default=None, help="Dakikadaki LLM isteği sınırı")
+    parser.add_argument("--resume", metavar="ID",
+                        help="Kayıtlı sohbete devam et (MCP_STORE ile sohbet günlüğü açık olmalı)")
+    parser.add_argument("--startup-report", action="store_true",
+                        default=os.getenv("MCP_STARTUP_REPORT", "") not in ("", "0"),
+                        help="Başlangıç aşamalarının sürelerini çıkışta yazdır")
+    args = parser.parse_args()
+    if not args.servers and not args.lazy:
+        parser.error("en az bir sunucu scripti verilmeli")
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    servers = args.servers + [path for path in args.lazy if path not in args.servers]
+    if args.batch:
+        asyncio.run(run_batch(args, servers))
+        return
 
+    report = StartupReport(STARTED)
+    report.record("import d1", import_started, import_finished)
+
+    start = time.perf_counter()
+    from gui import GUI, AsyncioThread
+    report.record("import gui", start, time.perf_counter())
+
+    # asyncio döngüsü kendi iş parçacığında çalışır, Tk ana iş parçacığında kalır
+    runner = AsyncioThread()
+
+    start = time.perf_counter()
     client = MCPClient()
-    
+    report.record("MCPClient", start, time.perf_counter())
+
+    ready = None
     try:
-        # Sunucuya bağlan
-        print(f"Sunucuya bağlanılıyor: {sys.argv[1]}")
-        loop.run_until_complete(client.connect_to_server(sys.argv[1]))
-        print("Sunucu bağlantısı başarılı")
-        
-        # GUI'yi başlat
-        gui = GUI(client, loop)
+        if args.resume:
+            client.resume_conversation(args.resume)
+        if client.conversation_id:
+            print(f"Sohbet kimliği: {client.conversation_id}")
+
+        # Sunucular ve LLM istemcisi arka planda hazırlanırken pencere hemen açılır
+        print(f"Sunuculara bağlanılıyor: {', '.join(servers)}")
+        runner.submit(timed(report, "LLM istemcisi yükleme", client.preload()))
+        ready = runner.submit(timed(report, "sunucu başlatma + initialize",
+                                    client.connect_to_servers(servers, lazy=args.lazy)))
+
+        start = time.perf_counter()
+        gui = GUI(client, runner.loop, ready=ready)
+        report.record("pencere oluşturma", start, time.perf_counter())
+        gui.root.after_idle(report.mark, "pencere görünür")
+        ready.add_done_callback(lambda future: report.mark("sunucular hazır"))
         gui.start()
     except Exception as e:
         print(f"Hata: {e}")
@@ -28,8 +130,13 @@ def main():
         traceback.print_exc()
     finally:
         print("Kaynaklar temizleniyor...")
-        loop.run_until_complete(client.cleanup())
+        if ready is not None and not ready.done():
+            ready.cancel()
+        runner.run(client.cleanup(), timeout=15)
+        runner.stop()
+        if args.startup_report:
+            print(report.render(), file=sys.stderr)
         print("Program sonlandı")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
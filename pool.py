@@ -0,0 +1,506 @@
+import asyncio
+import itertools
+import json
+import os
+import re
+from contextlib import AsyncExitStack, aclosing
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from catalog import ToolCatalog, is_read_only, tool_to_spec
+
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+# Birleşik araç dizininde sunucu adı ile araç adını ayıran ek
+NAMESPACE_SEPARATOR = "__"
+
+
+class ToolProgress:
+    """
+    Araç çalışırken sunucudan gelen ilerleme bildirimi.
+
+    Args:
+        progress: Şu ana kadarki ilerleme (ör. işlenen segment sayısı)
+        total: Toplam (biliniyorsa)
+        message: Durum metni
+        chunk: Sonucun bu bildirimle gelen parçası
+    """
+
+    def __init__(self, progress: float, total: Optional[float] = None,
+                 message: Optional[str] = None, chunk: Optional[str] = None):
+        self.progress = progress
+        self.total = total
+        self.message = message
+        self.chunk = chunk
+
+    def describe(self) -> str:
+        text = f"{self.progress:g}/{self.total:g}" if self.total else f"{self.progress:g}"
+        return f"{self.message} ({text})" if self.message else text
+
+
+class _RequestTap:
+    """
+    Oturumun yazma akışını sarar ve ilerleme belirteci kayıtlı isteklerin
+    JSON-RPC kimliklerini yakalar.
+
+    mcp istek kimliğini dışarı vermez; iptal bildirimi için kimlik, sunucuya
+    giden mesajın kendisinden okunur. Kayıtlar belirtece göre tutulduğu için
+    araya giren başka istekler (ping, araç listesi) karışmaz.
+
+    Args:
+        stream: ClientSession'a verilecek yazma akışı
+        sent: İlerleme belirtecinden istek kimliğine eşleme; yalnızca anahtarı
+            önceden eklenmiş belirteçler doldurulur
+    """
+
+    def __init__(self, stream, sent: dict):
+        self._stream = stream
+        self._sent = sent
+
+    async def send(self, message):
+        # mcp 1.6 JSONRPCMessage gönderir; sonraki sürümler bunu SessionMessage içine sarar
+        root = getattr(getattr(message, "message", message), "root", None)
+        params = getattr(root, "params", None)
+        if getattr(root, "method", None) and isinstance(params, dict):
+            token = (params.get("_meta") or {}).get("progressToken")
+            if token is not None and token in self._sent:
+                self._sent[token] = root.id
+        await self._stream.send(message)
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class ServerConnection:
+    """
+    Tek bir MCP sunucu alt sürecini ve oturumunu yönetir.
+
+    stdio bağlamları aynı görev içinde açılıp kapanmak zorunda olduğu için
+    bağlantı, ömrü boyunca yaşayan ayrı bir sahip görevde tutulur.
+
+    Args:
+        name: Araç adlarına ön ek olarak kullanılan sunucu adı
+        script_path: .py ya da .js sunucu scripti
+        lazy: True ise sunucu ilk araç çağrısına kadar başlatılmaz
+        tool_cache_ttl: Araç listesi önbelleği için TTL
+        max_concurrent_tools: Bu sunucuya aynı anda gönderilecek çağrı sınırı
+        notify_cancel: Yarıda bırakılan çağrılar için sunucuya iptal bildirimi gönderilsin mi
+    """
+
+    def __init__(self, name: str, script_path: str, lazy: bool = False,
+                 tool_cache_ttl: Optional[float] = None, max_concurrent_tools: int = 4,
+                 startup_timeout: float = 30, notify_cancel: bool = False):
+        if not (script_path.endswith('.py') or script_path.endswith('.js')):
+            raise ValueError("Sunucu scripti .py ya da .js dosyası olmalı")
+        self.name = name
+        self.script_path = script_path
+        self.lazy = lazy
+        self.catalog = ToolCatalog(ttl=tool_cache_ttl)
+        self.semaphore = asyncio.Semaphore(max_concurrent_tools)
+        self.startup_timeout = startup_timeout
+        self.notify_cancel = notify_cancel
+        self.session: Optional["ClientSession"] = None
+        self.restarts = 0
+        self.on_crash = None
+        self._task: Optional[asyncio.Task] = None
+        self._started: Optional[asyncio.Future] = None
+        self._closing = asyncio.Event()
+        self._lock = asyncio.Lock()
+        # İlerleme belirteçlerinden çağrıların bildirim kuyruklarına ve
+        # sunucuya giden isteklerin kimliklerine eşleme (bkz. _RequestTap)
+        self._progress: dict[str, asyncio.Queue] = {}
+        self._request_ids: dict[str, Optional[int]] = {}
+        self._tokens = itertools.count(1)
+
+    @property
+    def running(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Sunucuyu başlatır; zaten çalışıyorsa hiçbir şey yapmaz"""
+        async with self._lock:
+            if self.running:
+                return
+            loop = asyncio.get_running_loop()
+            self._started = loop.create_future()
+            self._closing = asyncio.Event()
+            self._task = asyncio.create_task(self._run(self._started, self._closing))
+            self._task.add_done_callback(self._on_task_done)
+            try:
+                await asyncio.wait_for(asyncio.shield(self._started), timeout=self.startup_timeout)
+            except Exception:
+                await self._stop()
+                raise
+
+    async def _run(self, started: asyncio.Future, closing: asyncio.Event):
+        # mcp paketinin yüklenmesi uzun sürdüğü için burada (ve bu modüldeki diğer
+        # metotlarda) içe aktarılır; böylece arayüz sunucu başlatılmadan önce açılabilir
+        from mcp import ClientSession
+
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await self._open_streams(stack)
+                session = await stack.enter_async_context(
+                    ClientSession(read, _RequestTap(write, self._request_ids),
+                                  message_handler=self._handle_server_message))
+                await session.initialize()
+                await self.catalog.refresh(session)
+                self.session = session
+                started.set_result(None)
+                await closing.wait()
+        except Exception as e:
+            if not started.done():
+                started.set_exception(e)
+            elif not closing.is_set():
+                raise
+        finally:
+            self.session = None
+
+    async def _open_streams(self, stack: AsyncExitStack) -> tuple:
+        """Sunucu alt sürecini başlatır; okuma ve yazma akışlarını döndürür"""
+        from mcp import StdioServerParameters, stdio_client
+
+        command = "python" if self.script_path.endswith('.py') else "node"
+        server_params = StdioServerParameters(command=command, args=[self.script_path], env=None)
+        return await stack.enter_async_context(stdio_client(server_params))
+
+    def _on_task_done(self, task: asyncio.Task):
+        if not task.cancelled():
+            task.exception()
+        if task is not self._task or self._closing.is_set():
+            return
+        # Kapatma istenmeden biten görev sunucunun çöktüğü anlamına gelir
+        started = self._started
+        if started.done() and not started.cancelled() and started.exception() is None \
+                and self.on_crash:
+            self.on_crash(self)
+
+    async def _handle_server_message(self, message):
+        """Sunucudan gelen bildirimleri işler"""
+        from mcp import types
+
+        if not isinstance(message, types.ServerNotification):
+            return
+        if isinstance(message.root, types.ToolListChangedNotification):
+            self.catalog.invalidate()
+        elif isinstance(message.root, types.ProgressNotification):
+            params = message.root.params
+            events = self._progress.get(params.progressToken)
+            if events is not None:
+                # Durum metni ve sonuç parçası şemada olmayan ek alanlar olarak gelir
+                extra = params.model_extra or {}
+                events.put_nowait(ToolProgress(params.progress, params.total,
+                                               extra.get("message"), extra.get("chunk")))
+
+    async def call_tool(self, tool_name: str, arguments: dict, timeout: Optional[float] = None):
+        """Aracı çağırır, sunucu henüz başlamadıysa önce başlatır"""
+        if not self.running:
+            await self.start()
+        async with self.semaphore:
+            return await asyncio.wait_for(self.session.call_tool(tool_name, arguments), timeout=timeout)
+
+    async def stream_tool(self, tool_name: str, arguments: dict, timeout: Optional[float] = None,
+                          chunks: bool = False):
+        """
+        Aracı ilerleme belirteciyle çağırır; bildirimleri geldikçe döndürür.
+
+        `chunks` açıksa sunucudan sonucu bildirimlerde parça parça göndermesi
+        istenir (`_meta.streamChunks`); destekleyen sunucular bu durumda
+        sonuçta metni tekrar göndermez, yalnızca özetler.
+
+        Yields:
+            ToolProgress nesneleri, en son CallToolResult
+
+        Döngüden sonuç gelmeden çıkılırsa (aclose) çağrı bırakılır; geç gelen
+        bildirimler ve yanıt yok sayılır. `notify_cancel` açıksa sunucuya
+        notifications/cancelled da gönderilir.
+        """
+        from mcp import types
+
+        if not self.running:
+            await self.start()
+        async with self.semaphore:
+            token = f"{self.name}-{next(self._tokens)}"
+            events = asyncio.Queue()
+            self._progress[token] = events
+            self._request_ids[token] = None
+            request = types.ClientRequest(types.CallToolRequest(
+                method="tools/call",
+                params=types.CallToolRequestParams(
+                    name=tool_name, arguments=arguments,
+                    _meta=types.RequestParams.Meta(progressToken=token, streamChunks=True)
+                    if chunks else types.RequestParams.Meta(progressToken=token))))
+            call = asyncio.ensure_future(self.session.send_request(request, types.CallToolResult))
+            deadline = asyncio.get_running_loop().time() + timeout if timeout else None
+            try:
+                while True:
+                    remaining = deadline - asyncio.get_running_loop().time() if deadline else None
+                    if remaining is not None and remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    event = asyncio.ensure_future(events.get())
+                    done, _ = await asyncio.wait({event, call}, timeout=remaining,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                    if event in done:
+                        yield event.result()
+                        continue
+                    event.cancel()
+                    if call in done:
+                        # Yanıttan önce okunan bildirimler kuyrukta kalmış olabilir
+                        while not events.empty():
+                            yield events.get_nowait()
+                        yield call.result()
+                        return
+            finally:
+                self._progress.pop(token, None)
+                request_id = self._request_ids.pop(token, None)
+                if not call.done():
+                    call.cancel()
+                    await self._cancel_request(request_id)
+
+    async def _cancel_request(self, request_id):
+        from mcp import types
+
+        # mcp 1.6 sunucuları iptal bildirimi alınca çöküyor; bu yüzden varsayılan olarak kapalı
+        if not self.notify_cancel or request_id is None or not self.running:
+            return
+        try:
+            await self.session.send_notification(types.ClientNotification(types.CancelledNotification(
+                method="notifications/cancelled",
+                params=types.CancelledNotificationParams(requestId=request_id, reason="istemci iptal etti"))))
+        except Exception as e:
+            print(f"{self.name}: iptal bildirimi gönderilemedi: {e}")
+
+    async def ping(self, timeout: float) -> bool:
+        if not self.running:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    async def restart(self):
+        await self._stop()
+        self.restarts += 1
+        await self.start()
+
+    async def _stop(self):
+        self._closing.set()
+        task, self._task = self._task, None
+        if task is None:
+            return
+        try:
+            await asyncio.wait_for(task, timeout=5)
+        except Exception:
+            task.cancel()
+        self.session = None
+
+    async def close(self):
+        async with self._lock:
+            await self._stop()
+
+
+class ServerPool:
+    """
+    Birden çok MCP sunucusunu tek bir havuzda toplar.
+
+    Sunucular eşzamanlı başlatılır, araçları `sunucu__araç` biçiminde ad
+    alanlarına ayrılmış tek bir dizinde birleştirilir ve her çağrı sahibi
+    olan oturuma yönlendirilir. Çöken sunucular arka planda yeniden başlatılır.
+
+    Args:
+        manifest_path: Tembel sunucuların araç listelerinin saklandığı JSON dosyası
+        health_interval: Sağlık kontrolü (ping) aralığı, saniye. None ise kapalı.
+        max_restart_attempts: Çöken bir sunucu için deneme sayısı
+        notify_cancel: Yarıda bırakılan araç çağrıları sunuculara bildirilsin mi
+    """
+
+    def __init__(self, tool_cache_ttl: Optional[float] = None, max_concurrent_tools: int = 4,
+                 manifest_path: Optional[str] = ".mcp_tools.json",
+                 health_interval: Optional[float] = 15, max_restart_attempts: int = 5,
+                 notify_cancel: bool = False):
+        self.tool_cache_ttl = tool_cache_ttl
+        self.max_concurrent_tools = max_concurrent_tools
+        self.manifest_path = manifest_path
+        self.health_interval = health_interval
+        self.max_restart_attempts = max_restart_attempts
+        self.notify_cancel = notify_cancel
+        self.connections: dict[str, ServerConnection] = {}
+        self._index: dict[str, tuple] = {}
+        # Birleşik şemalar; bağlantılar ve katalog sürümleri değişmedikçe yeniden kullanılır
+        self._specs: list = []
+        self._specs_key = None
+        self._read_only: set = set()
+        self._restarting: dict[str, asyncio.Task] = {}
+        self._monitor: Optional[asyncio.Task] = None
+
+    def add_server(self, script_path: str, lazy: bool = False) -> ServerConnection:
+        """Havuza sunucu ekler (başlatmaz)"""
+        name = re.sub(r"[^a-zA-Z0-9_-]", "_", Path(script_path).stem)
+        base, i = name, 2
+        while name in self.connections:
+            name = f"{base}_{i}"
+            i += 1
+        connection = ServerConnection(name, script_path, lazy=lazy,
+                                      tool_cache_ttl=self.tool_cache_ttl,
+                                      max_concurrent_tools=self.max_concurrent_tools,
+                                      notify_cancel=self.notify_cancel)
+        connection.on_crash = self._schedule_restart
+        self.connections[name] = connection
+        return connection
+
+    async def start(self):
+        """
+        Sunucuları eşzamanlı başlatır.
+
+        Araç listesi manifestte kayıtlı tembel sunucular başlatılmaz; kaydı
+        olmayanlar araçlarını öğrenmek için bir kez başlatılır.
+        """
+        manifest = self._load_manifest()
+        pending = []
+        for connection in self.connections.values():
+            entry = manifest.get(self._manifest_key(connection))
+            if connection.lazy and entry:
+                from mcp import types
+                connection.catalog.load([types.Tool.model_validate(tool) for tool in entry["tools"]])
+            else:
+                pending.append(connection)
+
+        results = await asyncio.gather(*(c.start() for c in pending), return_exceptions=True)
+        errors = [f"{c.name}: {r}" for c, r in zip(pending, results) if isinstance(r, Exception)]
+        if errors:
+            raise RuntimeError("; ".join(errors))
+
+        self._save_manifest(manifest)
+        if self.health_interval and self._monitor is None:
+            self._monitor = asyncio.create_task(self._monitor_health())
+
+    def _manifest_key(self, connection: ServerConnection) -> str:
+        path = os.path.abspath(connection.script_path)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = 0
+        return f"{path}:{mtime}"
+
+    def _load_manifest(self) -> dict:
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest: dict):
+        if not self.manifest_path or not any(c.lazy for c in self.connections.values()):
+            return
+        for connection in self.connections.values():
+            if connection.lazy and connection.catalog.tools:
+                manifest[self._manifest_key(connection)] = {
+                    "tools": [tool.model_dump(mode="json") for tool in connection.catalog.tools]
+                }
+        try:
+            with open(self.manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+        except OSError as e:
+            print(f"Araç manifesti yazılamadı: {e}")
+
+    async def get_specs(self) -> list:
+        """
+        Tüm sunucuların araç şemalarını ad alanlarıyla birleştirip döndürür.
+
+        Birleşik liste, bir katalog yenilenene ya da bağlantı eklenip
+        çıkarılana kadar önbellekten döner; dönen liste değiştirilmemelidir.
+        """
+        for connection in list(self.connections.values()):
+            if connection.running:
+                await connection.catalog.get_specs(connection.session)
+        key = tuple((name, id(connection), connection.catalog.version)
+                    for name, connection in self.connections.items())
+        if key == self._specs_key:
+            return self._specs
+
+        specs = []
+        index = {}
+        read_only = set()
+        for connection in self.connections.values():
+            for tool in connection.catalog.tools:
+                qualified = f"{connection.name}{NAMESPACE_SEPARATOR}{tool.name}"
+                index[qualified] = (connection, tool.name)
+                specs.append(tool_to_spec(tool, name=qualified))
+                if is_read_only(tool):
+                    read_only.add(qualified)
+        self._index = index
+        self._read_only = read_only
+        self._specs, self._specs_key = specs, key
+        return specs
+
+    def resolve(self, qualified_name: str) -> tuple:
+        """Ad alanlı araç adını (bağlantı, araç adı) çiftine çözer"""
+        if qualified_name in self._index:
+            return self._index[qualified_name]
+        server, sep, tool_name = qualified_name.partition(NAMESPACE_SEPARATOR)
+        if sep and server in self.connections:
+            return self.connections[server], tool_name
+        raise KeyError(f"Bilinmeyen araç: {qualified_name}")
+
+    def is_read_only(self, qualified_name: str) -> bool:
+        """Sunucu aracı yan etkisiz olarak işaretlemiş mi (bkz. catalog.is_read_only)"""
+        return qualified_name in self._read_only
+
+    async def call_tool(self, qualified_name: str, arguments: dict, timeout: Optional[float] = None):
+        connection, tool_name = self.resolve(qualified_name)
+        return await connection.call_tool(tool_name, arguments, timeout=timeout)
+
+    async def stream_tool(self, qualified_name: str, arguments: dict, timeout: Optional[float] = None,
+                          chunks: bool = False):
+        """Aracı ilerleme bildirimleriyle çağırır (bkz. ServerConnection.stream_tool)"""
+        connection, tool_name = self.resolve(qualified_name)
+        async with aclosing(connection.stream_tool(tool_name, arguments, timeout=timeout,
+                                                   chunks=chunks)) as events:
+            async for event in events:
+                yield event
+
+    def _schedule_restart(self, connection: ServerConnection):
+        task = self._restarting.get(connection.name)
+        if task and not task.done():
+            return
+        self._restarting[connection.name] = asyncio.ensure_future(self._restart(connection))
+
+    async def _restart(self, connection: ServerConnection):
+        """Çöken sunucuyu üstel bekleme ile yeniden başlatmayı dener"""
+        for attempt in range(self.max_restart_attempts):
+            try:
+                await connection.restart()
+                return
+            except Exception as e:
+                print(f"{connection.name} yeniden başlatılamadı ({attempt + 1}. deneme): {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+    async def _monitor_health(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for connection in list(self.connections.values()):
+                if connection.running and not await connection.ping(timeout=self.health_interval):
+                    self._schedule_restart(connection)
+
+    async def close(self):
+        if self._monitor:
+            self._monitor.cancel()
+            self._monitor = None
+        restarting = list(self._restarting.values())
+        self._restarting.clear()
+        for task in restarting:
+            task.cancel()
+        # Yeniden başlatma görevleri bağlantılar kapatılmadan önce bitmeli
+        await asyncio.gather(*restarting, return_exceptions=True)
+        await asyncio.gather(*(c.close() for c in self.connections.values()), return_exceptions=True)
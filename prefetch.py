@@ -0,0 +1,118 @@
+import asyncio
+import json
+import re
+from typing import Optional
+
+from cache import canonical_json
+from pool import NAMESPACE_SEPARATOR
+
+YOUTUBE_URL = re.compile(
+    r"(?:https?://)?(?:www\.|m\.)?(?:youtube\.com/(?:watch\?\S*?v=|shorts/|embed/)|youtu\.be/)([\w-]{11})\S*")
+
+# Kullanıcı mesajından tahmin edilen çağrılar: (desen, araç adı, argüman adı).
+# Yalnızca yan etkisi olmayan, okuma amaçlı araçlar eklenmelidir.
+PREFETCH_RULES = [
+    (YOUTUBE_URL, "get_transcript", "video_id"),
+]
+# Kurallardaki araçlar; akış sırasında da önden başlatılabilir
+PREFETCH_TOOLS = frozenset(tool for _, tool, _ in PREFETCH_RULES)
+
+
+def is_prefetch_tool(name: str) -> bool:
+    return name.rpartition(NAMESPACE_SEPARATOR)[2] in PREFETCH_TOOLS
+
+
+def call_key(name: str, arguments: dict) -> str:
+    return f"{name}:{canonical_json(arguments)}"
+
+
+class SpeculativeCalls:
+    """
+    Bir tur boyunca önden başlatılan araç çağrıları.
+
+    İki durumda çağrı, model araç çağrısını tamamlamadan başlatılır:
+    kullanıcı mesajında kurallardan biri eşleşince (ör. YouTube bağlantısı
+    görülünce transkript istenir) ve akış sürerken bir araç çağrısının
+    argümanları geçerli JSON olarak tamamlanınca; ikincisi yalnızca `allowed`
+    ile izin verilen (yan etkisiz) araçlar için yapılır, çünkü akış hata ya da
+    bütçe nedeniyle yarıda kalabilir. Model aynı araç ve
+    argümanlarla çağrı yaptığında hazır (ya da sürmekte olan) sonuç kullanılır;
+    kullanılmayan çağrılar tur sonunda iptal edilir.
+
+    Args:
+        call: Araç çağrısı sözlüğünü alıp sonuç metnini döndüren coroutine fonksiyonu
+        max_predictions: Kullanıcı mesajından başlatılacak azami çağrı sayısı
+        allowed: Araç adı alıp önden başlatılabilir mi döndüren fonksiyon
+            (verilmezse yalnızca kurallardaki araçlar)
+    """
+
+    def __init__(self, call, max_predictions: int = 3, allowed=None):
+        self._call = call
+        self.max_predictions = max_predictions
+        self.allowed = allowed or is_prefetch_tool
+        self.tasks = {}
+        self.hits = 0
+        self._observed = set()
+
+    def start(self, name: str, arguments: dict, aliases=()):
+        """Çağrıyı başlatır; `aliases` aynı sonucu veren diğer argüman biçimleridir"""
+        key = call_key(name, arguments)
+        if key in self.tasks:
+            return
+        task = asyncio.ensure_future(self._call({
+            "id": None,
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)}
+        }))
+        for alias in (key, *(call_key(name, args) for args in aliases)):
+            self.tasks.setdefault(alias, task)
+
+    def predict(self, text: str, specs: list):
+        """Kullanıcı mesajındaki kalıplara göre muhtemel araç çağrılarını başlatır"""
+        names = [spec["function"]["name"] for spec in specs]
+        started = 0
+        for pattern, tool, argument in PREFETCH_RULES:
+            name = next((n for n in names if n.rpartition(NAMESPACE_SEPARATOR)[2] == tool), None)
+            if name is None:
+                continue
+            for match in pattern.finditer(text):
+                if started >= self.max_predictions:
+                    return
+                value = match.group(1) if pattern.groups else match.group(0)
+                self.start(name, {argument: value}, aliases=[{argument: match.group(0)}])
+                started += 1
+
+    def observe(self, tool_calls: list):
+        """Akış sırasında argümanları tamamlanan araç çağrılarını başlatır"""
+        for tool_call in tool_calls:
+            name = tool_call["function"]["name"]
+            arguments = tool_call["function"]["arguments"]
+            if not arguments.rstrip().endswith("}") or (name, arguments) in self._observed:
+                continue
+            if not self.allowed(name):
+                continue
+            try:
+                parsed = json.loads(arguments)
+            except ValueError:
+                continue
+            self._observed.add((name, arguments))
+            if isinstance(parsed, dict):
+                self.start(name, parsed)
+
+    def take(self, tool_call: dict) -> Optional[asyncio.Future]:
+        """Çağrıya karşılık gelen önden başlatılmış görevi döndürür, yoksa None"""
+        try:
+            arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+        except ValueError:
+            return None
+        if not isinstance(arguments, dict):
+            return None
+        task = self.tasks.get(call_key(tool_call["function"]["name"], arguments))
+        if task is not None:
+            self.hits += 1
+        return task
+
+    def cancel(self):
+        for task in set(self.tasks.values()):
+            if not task.done():
+                task.cancel()
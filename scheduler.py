@@ -0,0 +1,382 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Optional
+
+# Kod taşımayan ama yeniden denenebilecek SDK hataları (together.error)
+RETRYABLE_ERRORS = ("RateLimitError", "ServiceUnavailableError", "APIConnectionError", "Timeout")
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    return getattr(error, "http_status", None) or getattr(error, "status_code", None)
+
+
+def is_throttled(error: BaseException) -> bool:
+    return error_status(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429, 5xx ve bağlantı hataları yeniden denenir; istek hataları (4xx) denenmez"""
+    status = error_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in RETRYABLE_ERRORS or isinstance(error, ConnectionError)
+
+
+def parse_mapping(text: str) -> dict:
+    """"model_a=model_b,model_c=model_d" biçimindeki metni sözlüğe çevirir"""
+    mapping = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        key, _, value = item.partition("=")
+        mapping[key.strip()] = value.strip()
+    return mapping
+
+
+class LatencyTracker:
+    """
+    Model başına son gecikmeleri tutar ve yüzdelik değer hesaplar.
+
+    Args:
+        window: Model başına saklanacak ölçüm sayısı
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = {}
+
+    def observe(self, model: str, latency: float):
+        self._samples.setdefault(model, deque(maxlen=self.window)).append(latency)
+
+    def count(self, model: str) -> int:
+        return len(self._samples.get(model, ()))
+
+    def percentile(self, model: str, p: float) -> Optional[float]:
+        samples = self._samples.get(model)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class AdaptiveLimiter:
+    """
+    Gözlenen gecikmeye göre kendini ayarlayan eşzamanlılık sınırı (AIMD).
+
+    Gecikme en düşük gözlenen değerin `tolerance` katının altında kaldıkça
+    sınır yavaşça artar; gecikme büyüdükçe birer azalır, sağlayıcı 429
+    döndürdüğünde ise `backoff` oranıyla hızla düşer. Böylece kısıtlama
+    altında kuyruk sağlayıcıda değil istemcide birikir.
+
+    Args:
+        initial: Başlangıç sınırı
+        min_limit: En düşük sınır
+        max_limit: En yüksek sınır
+        tolerance: Gecikmenin en düşük gecikmeye göre kabul edilen katı
+        backoff: 429 sonrası sınırın çarpılacağı oran
+    """
+
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 tolerance: float = 2.0, backoff: float = 0.5):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.inflight = 0
+        # Modellerin gecikmeleri farklı olduğu için en düşük gecikme model başına tutulur
+        self.min_latency = {}
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.inflight < int(self.limit))
+            self.inflight += 1
+
+    async def release(self, latency: Optional[float] = None, throttled: bool = False, key: str = ""):
+        async with self._condition:
+            self.inflight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            elif latency is not None:
+                self._adjust(latency, key)
+            self._condition.notify_all()
+
+    def _adjust(self, latency: float, key: str):
+        baseline = min(self.min_latency.get(key, latency), latency)
+        if latency > baseline * self.tolerance:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+        elif self.inflight + 1 >= int(self.limit):
+            # Yalnızca sınır gerçekten doluyken artır; boşta büyümesin
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        # En düşük gecikme zamanla unutulur; ağ koşulları değişebilir
+        self.min_latency[key] = baseline * 1.01
+
+
+class SchedulingBackend:
+    """
+    LLM isteklerini süre sınırı, yeniden deneme, yedek istek ve uyarlanır
+    eşzamanlılıkla çalıştıran arka uç sarmalayıcısı.
+
+    - Her model için toplam süre sınırı (`deadlines`, yoksa `default_deadline`)
+    - 429/5xx hatalarında jitter'lı üstel bekleme ile yeniden deneme
+      (akışta yalnızca ilk parça gelmeden önce)
+    - İlk parça, modelin `hedge_percentile` gecikmesini aşarsa yedek modele
+      (ya da aynı modele) ikinci istek; önce yanıt veren kazanır, diğeri iptal edilir
+    - Tüm istekler `AdaptiveLimiter` ile sınırlandırılır
+
+    Args:
+        backend: Sarılan LLM arka ucu
+        deadlines: Model adından saniye cinsinden süre sınırına eşleme
+        default_deadline: Listede olmayan modeller için süre sınırı
+        max_retries: Yeniden deneme sayısı
+        base_delay: İlk bekleme süresi, saniye
+        max_delay: En uzun bekleme süresi, saniye
+        hedge_models: Model adından yedek model adına eşleme; yalnızca buradaki modeller için yedek istek atılır
+        hedge_percentile: Yedek isteğin atılacağı gecikme yüzdeliği
+        hedge_min_samples: Yüzdelik hesaplanmadan önce gereken ölçüm sayısı
+        limiter: Eşzamanlılık sınırlayıcısı
+    """
+
+    def __init__(self, backend, deadlines: Optional[dict] = None, default_deadline: Optional[float] = 120,
+                 max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 hedge_models: Optional[dict] = None, hedge_percentile: float = 95,
+                 hedge_min_samples: int = 20, limiter: Optional[AdaptiveLimiter] = None):
+        self.backend = backend
+        self.deadlines = deadlines or {}
+        self.default_deadline = default_deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_models = hedge_models or {}
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.limiter = limiter or AdaptiveLimiter()
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def deadline_for(self, model: str) -> Optional[float]:
+        return self.deadlines.get(model, self.default_deadline)
+
+    def _backoff(self, attempt: int) -> float:
+        # Tam jitter: [0, base * 2^attempt] aralığında rastgele
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _hedge_after(self, model: str) -> Optional[float]:
+        if model not in self.hedge_models or self.latency.count(model) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(model, self.hedge_percentile)
+
+    def _remaining(self, expires: Optional[float]) -> Optional[float]:
+        if expires is None:
+            return None
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        return remaining
+
+    async def _limited(self, coro_factory, key: str):
+        """Sınırlayıcıdan yer alır, isteği çalıştırır ve gecikmeyi bildirir"""
+        await self.limiter.acquire()
+        started = time.monotonic()
+        try:
+            result = await coro_factory()
+        except BaseException as e:
+            await self.limiter.release(throttled=isinstance(e, Exception) and is_throttled(e), key=key)
+            raise
+        await self.limiter.release(time.monotonic() - started, key=key)
+        return result
+
+    async def create(self, **kwargs):
+        model = kwargs["model"]
+        deadline = self.deadline_for(model)
+        expires = time.monotonic() + deadline if deadline else None
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self._limited(lambda: self.backend.create(**kwargs), model), self._remaining(expires))
+                self.latency.observe(model, time.monotonic() - started)
+                return response
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(min(self._backoff(attempt), self._remaining(expires) or self.max_delay))
+
+    async def stream(self, **kwargs) -> AsyncIterator:
+        model = kwargs["model"]
+        deadline = self.deadline_for(model)
+        expires = time.monotonic() + deadline if deadline else None
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                stream, first = await self._first_chunk(kwargs, expires)
+                break
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(min(self._backoff(attempt), self._remaining(expires) or self.max_delay))
+
+        try:
+            if first is not None:
+                yield first
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), self._remaining(expires))
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+        finally:
+            await stream.aclose()
+
+    async def _first_chunk(self, kwargs: dict, expires: Optional[float]):
+        """
+        Akışı başlatır ve ilk parçayı bekler.
+
+        Gecikme eşiği aşılırsa yedek akış başlatılır; ilk parçası önce gelen
+        akış döndürülür, diğeri kapatılır.
+
+        Returns:
+            (akış, ilk parça) - akış boşsa ilk parça None
+        """
+        model = kwargs["model"]
+        started = time.monotonic()
+        attempts = {}
+
+        def launch(attempt_kwargs):
+            stream = self._open_stream(attempt_kwargs)
+            task = asyncio.ensure_future(self._next_or_none(stream))
+            attempts[task] = stream
+            return task
+
+        launch(kwargs)
+        hedge_after = self._hedge_after(model)
+        hedge_task = None
+        hedged = False
+        winner = None
+        errors = []
+        try:
+            while attempts and winner is None:
+                timeout = self._remaining(expires)
+                if not hedged and hedge_after is not None:
+                    wait_for = max(0.0, hedge_after - (time.monotonic() - started))
+                    timeout = wait_for if timeout is None else min(timeout, wait_for)
+                done, _ = await asyncio.wait(list(attempts), timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if not hedged and hedge_after is not None:
+                        hedged = True
+                        # Sınırlayıcı doluysa yedek istek yükü artırmaktan başka işe yaramaz
+                        if self.limiter.inflight < int(self.limiter.limit):
+                            self.hedges += 1
+                            hedge_task = launch({**kwargs, "model": self.hedge_models[model] or model})
+                        continue
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    stream = attempts.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        await stream.aclose()
+                        continue
+                    if winner is None:
+                        winner = (stream, task.result(), task)
+                    else:
+                        await stream.aclose()
+                # Tüm denemeler hata verdiyse ilk hata yükseltilir (yeniden deneme kararı çağırana kalır)
+                if winner is None and not attempts and errors:
+                    raise errors[0]
+        finally:
+            # Kaybeden (ya da iptal edilen) denemeleri kapat
+            for task, stream in attempts.items():
+                task.cancel()
+                try:
+                    await task
+                except BaseException:
+                    pass
+                await stream.aclose()
+
+        stream, first, task = winner
+        if task is hedge_task:
+            self.hedge_wins += 1
+        self.latency.observe(model, time.monotonic() - started)
+        return stream, first
+
+    def _open_stream(self, kwargs: dict):
+        return _LimitedStream(self, kwargs)
+
+    @staticmethod
+    async def _next_or_none(stream):
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def stats(self) -> dict:
+        return {"limit": round(self.limiter.limit, 2), "inflight": self.limiter.inflight,
+                "retries": self.retries, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+
+    def load(self):
+        load = getattr(self.backend, "load", None)
+        return load() if load else None
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+class _LimitedStream:
+    """
+    Sınırlayıcıda yer tutan tek bir akış denemesi.
+
+    Yer akış bitene ya da kapatılana kadar tutulur; sınırlayıcıya yanıt
+    uzunluğundan bağımsız olan ilk parça gecikmesi bildirilir.
+    """
+
+    def __init__(self, scheduler: SchedulingBackend, kwargs: dict):
+        self.scheduler = scheduler
+        self.model = kwargs["model"]
+        self._kwargs = kwargs
+        self._iterator = None
+        self._acquired = False
+        self._started = None
+        self._first_latency = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._iterator is None:
+            await self.scheduler.limiter.acquire()
+            self._acquired = True
+            self._started = time.monotonic()
+            self._iterator = self.scheduler.backend.stream(**self._kwargs).__aiter__()
+        try:
+            chunk = await self._iterator.__anext__()
+        except StopAsyncIteration:
+            await self._release()
+            raise
+        except Exception as e:
+            await self._release(throttled=is_throttled(e))
+            raise
+        if self._first_latency is None:
+            self._first_latency = time.monotonic() - self._started
+        return chunk
+
+    async def _release(self, throttled: bool = False):
+        if self._acquired:
+            self._acquired = False
+            await self.scheduler.limiter.release(self._first_latency, throttled=throttled, key=self.model)
+
+    async def aclose(self):
+        if self._iterator is not None:
+            close = getattr(self._iterator, "aclose", None)
+            if close:
+                try:
+                    await close()
+                except Exception:
+                    pass
+        # İlk parçadan önce iptal edilen denemenin gecikmesi bildirilmez (None)
+        await self._release()
@@ -0,0 +1,415 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import time
+import uuid
+from contextlib import aclosing, asynccontextmanager
+from typing import Optional
+
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from d1 import MCPClient
+
+
+class Overloaded(Exception):
+    """Kuyruk sınırı aşıldı; istemci `retry_after` saniye sonra yeniden denemeli"""
+
+    def __init__(self, message: str, status: int = 429, retry_after: float = 1.0):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FairScheduler:
+    """
+    Sohbet turlarını kullanıcılar arasında sırayla dağıtan eşzamanlılık sınırı.
+
+    Aynı anda en fazla `max_active` tur çalışır. Boş yer yoksa tur, kendi
+    kullanıcısının kuyruğuna girer; yer açıldığında kuyruğu olan kullanıcılar
+    arasında sırayla (round-robin) seçim yapılır. Böylece çok sayıda paralel
+    istek gönderen bir kullanıcı diğerlerinin önüne geçemez. Kuyruklar
+    sınırlıdır: kullanıcı başına bekleyen ve çalışan tur sayısı
+    `max_per_user`, toplam bekleyen tur sayısı `max_queued` ile sınırlanır;
+    aşıldığında istek beklemeden reddedilir.
+
+    Args:
+        max_active: Aynı anda çalışan azami tur sayısı
+        max_queued: Tüm kullanıcılar için bekleyebilecek azami tur sayısı
+        max_per_user: Bir kullanıcının çalışan ve bekleyen azami tur sayısı
+    """
+
+    def __init__(self, max_active: int = 16, max_queued: int = 64, max_per_user: int = 4):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_per_user = max_per_user
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self._waiting = collections.OrderedDict()
+        self._per_user = collections.Counter()
+
+    def enqueue(self, user: str) -> asyncio.Future:
+        """
+        Tur için yer ister; yer verildiğinde tamamlanan bir future döndürür.
+
+        Döndürülen future her durumda `release` ile bırakılmalıdır.
+
+        Raises:
+            Overloaded: Kullanıcının ya da sunucunun kuyruğu dolu
+        """
+        if self._per_user[user] >= self.max_per_user:
+            self.rejected += 1
+            raise Overloaded(f"Kullanıcı başına {self.max_per_user} eşzamanlı tur sınırı aşıldı")
+        ticket = asyncio.get_running_loop().create_future()
+        ticket.user = user
+        if self.active < self.max_active and not self._waiting:
+            self.active += 1
+            ticket.set_result(None)
+        elif self.queued >= self.max_queued:
+            self.rejected += 1
+            raise Overloaded("Sunucu kuyruğu dolu", status=503, retry_after=2.0)
+        else:
+            self._waiting.setdefault(user, collections.deque()).append(ticket)
+            self.queued += 1
+        self._per_user[user] += 1
+        return ticket
+
+    def position(self, ticket: asyncio.Future) -> int:
+        """Bekleyen turun kuyruktaki yaklaşık sırası (her kullanıcıdan birer tur sayılarak)"""
+        queue = self._waiting.get(ticket.user)
+        if ticket.done() or queue is None:
+            return 0
+        rounds = queue.index(ticket)
+        users = list(self._waiting)
+        mine = users.index(ticket.user)
+        # Önde sıradaki kullanıcılar bu turdan önce bir tur daha alır
+        ahead = sum(min(len(self._waiting[other]), rounds + (i < mine))
+                    for i, other in enumerate(users) if i != mine)
+        return ahead + rounds + 1
+
+    def release(self, ticket: asyncio.Future):
+        """Çalışan turun yerini bırakır ya da bekleyen turu kuyruktan çıkarır"""
+        self._per_user[ticket.user] -= 1
+        if self._per_user[ticket.user] <= 0:
+            del self._per_user[ticket.user]
+        if ticket.done() and not ticket.cancelled():
+            self.active -= 1
+        else:
+            ticket.cancel()
+            queue = self._waiting.get(ticket.user)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                self.queued -= 1
+                if not queue:
+                    del self._waiting[ticket.user]
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.active < self.max_active and self._waiting:
+            user, queue = self._waiting.popitem(last=False)
+            ticket = queue.popleft()
+            self.queued -= 1
+            # Kullanıcının başka bekleyen turu varsa sıranın sonuna geçer
+            if queue:
+                self._waiting[user] = queue
+            if ticket.cancelled():
+                continue
+            self.active += 1
+            ticket.set_result(None)
+
+    def stats(self) -> dict:
+        return {"active": self.active, "queued": self.queued, "waiting_users": len(self._waiting),
+                "rejected": self.rejected}
+
+
+class ClosingResponse:
+    """ASGI yanıtını sarar; yanıt bittiğinde ya da bağlantı koptuğunda `on_close` beklenir"""
+
+    def __init__(self, response, on_close):
+        self.response = response
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            await self.on_close()
+
+
+class Session:
+    """Bir HTTP oturumu: kullanıcı ve kendi geçmişi olan sohbet; aynı anda tek tur çalışır"""
+
+    def __init__(self, session_id: str, user: str, conversation: MCPClient):
+        self.id = session_id
+        self.user = user
+        self.conversation = conversation
+        self.busy = False
+        self.last_used = time.monotonic()
+
+    def describe(self) -> dict:
+        return {
+            "session": self.id,
+            "conversation": self.conversation.conversation_id,
+            "messages": len(self.conversation.messages),
+            "busy": self.busy
+        }
+
+
+class ChatServer:
+    """
+    MCPClient'ı HTTP üzerinden çok kullanıcılı sunan ön yüz.
+
+    Sunucu havuzu, araç kataloğu, önbellekler ve LLM bağlantısı tek bir
+    MCPClient'ta paylaşılır; her oturum `new_conversation` ile kendi
+    geçmişine sahip bir sohbet alır. Yanıtlar Server-Sent Events olarak
+    akıtılır (`token`, `progress`, `queued`, `done`, `error` olayları).
+
+    Turlar FairScheduler üzerinden çalışır. Her turun çıktısı sınırlı bir
+    tamponla istemciye taşınır; yavaş okuyan istemci kendi turunu yavaşlatır,
+    `send_timeout` içinde okumayan istemcinin bağlantısı kesilir ve turu iptal
+    edilir. Uzun süre kullanılmayan oturumlar bellekten atılır (günlük açıksa
+    sohbete `resume` ile devam edilebilir).
+
+    Args:
+        client: Paylaşılan MCPClient (sunuculara lifespan içinde bağlanır)
+        servers: Başlatılacak MCP sunucu scriptleri
+        lazy: İlk araç çağrısına kadar başlatılmayacak sunucular
+        scheduler: Tur zamanlayıcısı
+        max_sessions: Bellekte tutulacak azami oturum sayısı
+        session_ttl: Bu kadar saniye kullanılmayan oturumlar atılır
+        stream_buffer: Tur başına istemciye gönderilmeyi bekleyen azami olay sayısı
+        send_timeout: Bir olayın istemciye yazılması için beklenecek azami süre, saniye
+    """
+
+    def __init__(self, client: MCPClient, servers=(), lazy=(), scheduler: Optional[FairScheduler] = None,
+                 max_sessions: int = 1000, session_ttl: float = 1800, stream_buffer: int = 64,
+                 send_timeout: Optional[float] = 30):
+        self.client = client
+        self.servers = list(servers)
+        self.lazy = list(lazy)
+        self.scheduler = scheduler or FairScheduler()
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.stream_buffer = stream_buffer
+        self.send_timeout = send_timeout
+        self.sessions = {}
+        self.turns = 0
+        self._reaper = None
+
+    def create_app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/health", self.health, methods=["GET"]),
+            Route("/sessions", self.create_session, methods=["POST"]),
+            Route("/sessions/{session_id}", self.get_session, methods=["GET"]),
+            Route("/sessions/{session_id}", self.delete_session, methods=["DELETE"]),
+            Route("/sessions/{session_id}/messages", self.send_message, methods=["POST"]),
+        ], lifespan=self.lifespan)
+
+    @asynccontextmanager
+    async def lifespan(self, app):
+        if self.servers:
+            await self.client.connect_to_servers(self.servers, lazy=self.lazy)
+        self._reaper = asyncio.create_task(self._reap_sessions())
+        try:
+            yield
+        finally:
+            self._reaper.cancel()
+            await self.client.cleanup()
+
+    async def health(self, request):
+        stats = {"sessions": len(self.sessions), "turns": self.turns, **self.scheduler.stats()}
+        llm_stats = getattr(self.client.llm, "stats", None)
+        if llm_stats:
+            stats["llm"] = llm_stats()
+        return JSONResponse(stats)
+
+    async def create_session(self, request):
+        body = await self._json(request)
+        user = self._user(request)
+        if len(self.sessions) >= self.max_sessions and not self._evict_idle():
+            return self._error("Oturum sınırına ulaşıldı", 503, retry_after=5)
+
+        conversation = self.client.new_conversation()
+        if body.get("resume"):
+            # İki oturum aynı sohbete yazarsa kayıtları tek zincirde karışır
+            if any(session.conversation.conversation_id == str(body["resume"])
+                   for session in self.sessions.values()):
+                return self._error("Sohbet başka bir oturumda açık", 409)
+            try:
+                conversation.resume_conversation(str(body["resume"]))
+            except RuntimeError as e:
+                return self._error(str(e), 400)
+            except ValueError as e:
+                return self._error(str(e), 404)
+        session = Session(uuid.uuid4().hex, user, conversation)
+        self.sessions[session.id] = session
+        return JSONResponse(session.describe(), status_code=201)
+
+    async def get_session(self, request):
+        session = self._session(request)
+        if session is None:
+            return self._error("Oturum bulunamadı", 404)
+        return JSONResponse(session.describe())
+
+    async def delete_session(self, request):
+        session = self.sessions.pop(request.path_params["session_id"], None)
+        if session is None:
+            return self._error("Oturum bulunamadı", 404)
+        return Response(status_code=204)
+
+    async def send_message(self, request):
+        session = self._session(request)
+        if session is None:
+            return self._error("Oturum bulunamadı", 404)
+        body = await self._json(request)
+        query = body.get("message")
+        if not isinstance(query, str) or not query.strip():
+            return self._error("'message' alanı boş olamaz", 400)
+        if session.busy:
+            return self._error("Bu oturumda süren bir tur var", 409)
+        try:
+            ticket = self.scheduler.enqueue(session.user)
+        except Overloaded as e:
+            return self._error(str(e), e.status, retry_after=e.retry_after)
+        session.busy = True
+        stream = self._stream_turn(session, query, ticket)
+
+        async def finish():
+            # Üreteç askıdayken bağlantı koparsa kendiliğinden kapanmaz
+            await stream.aclose()
+            self.scheduler.release(ticket)
+            session.busy = False
+            session.last_used = time.monotonic()
+
+        return ClosingResponse(EventSourceResponse(stream, ping=15, send_timeout=self.send_timeout), finish)
+
+    async def _stream_turn(self, session: Session, query: str, ticket: asyncio.Future):
+        """Turu sırası gelince çalıştırır ve olaylarını SSE olarak üretir"""
+        if not ticket.done():
+            yield ServerSentEvent(json.dumps({"position": self.scheduler.position(ticket)}), event="queued")
+            await asyncio.shield(ticket)
+        events = asyncio.Queue(maxsize=self.stream_buffer)
+        task = asyncio.create_task(self._run_turn(session, query, events))
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            if not task.done():
+                # İstemci bağlantıyı kesti ya da zamanında okumadı
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    async def _run_turn(self, session: Session, query: str, events: asyncio.Queue):
+        conversation = session.conversation
+
+        def on_progress(tool_name, progress):
+            # İlerleme bildirimleri kayıplı olabilir: tampon doluysa atlanır
+            if not events.full():
+                events.put_nowait(ServerSentEvent(json.dumps({
+                    "tool": tool_name, "progress": progress.progress, "total": progress.total,
+                    "message": progress.message
+                }, ensure_ascii=False), event="progress"))
+
+        conversation.on_tool_progress = on_progress
+        self.turns += 1
+        try:
+            async with aclosing(conversation.stream_query(query)) as stream:
+                async for token in stream:
+                    await events.put(ServerSentEvent(json.dumps({"text": token}, ensure_ascii=False),
+                                                     event="token"))
+            if conversation.last_error:
+                await events.put(ServerSentEvent(json.dumps({"error": str(conversation.last_error)},
+                                                            ensure_ascii=False), event="error"))
+            else:
+                await events.put(ServerSentEvent(json.dumps({
+                    "conversation": conversation.conversation_id,
+                    "message_id": conversation.last_message_id
+                }), event="done"))
+        except Exception as e:
+            await events.put(ServerSentEvent(json.dumps({"error": str(e)}, ensure_ascii=False), event="error"))
+        finally:
+            conversation.on_tool_progress = None
+            await events.put(None)
+
+    def _evict_idle(self) -> bool:
+        """En uzun süredir kullanılmayan boştaki oturumu atar"""
+        idle = [session for session in self.sessions.values() if not session.busy]
+        if not idle:
+            return False
+        oldest = min(idle, key=lambda session: session.last_used)
+        del self.sessions[oldest.id]
+        return True
+
+    async def _reap_sessions(self):
+        while True:
+            await asyncio.sleep(min(60, self.session_ttl))
+            expires = time.monotonic() - self.session_ttl
+            for session in list(self.sessions.values()):
+                if session.last_used < expires and not session.busy:
+                    del self.sessions[session.id]
+
+    def _session(self, request) -> Optional[Session]:
+        session = self.sessions.get(request.path_params["session_id"])
+        if session is not None:
+            session.last_used = time.monotonic()
+        return session
+
+    @staticmethod
+    def _user(request) -> str:
+        """Adil sıralama için kullanıcı: `X-User` başlığı, yoksa istemci adresi"""
+        return request.headers.get("x-user") or (request.client.host if request.client else "anonymous")
+
+    @staticmethod
+    async def _json(request) -> dict:
+        try:
+            body = await request.json()
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+
+    @staticmethod
+    def _error(message: str, status: int, retry_after: Optional[float] = None):
+        headers = {"Retry-After": str(max(1, round(retry_after)))} if retry_after else None
+        return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP sohbet HTTP/SSE sunucusu")
+    parser.add_argument("servers", nargs="*", help="MCP sunucu scriptleri (.py ya da .js)")
+    parser.add_argument("--lazy", action="append", default=[], metavar="SCRIPT",
+                        help="İlk araç çağrısına kadar başlatılmayacak sunucu (birden çok kez verilebilir)")
+    parser.add_argument("--host", default=os.getenv("MCP_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_SERVER_PORT", "8000")))
+    parser.add_argument("--max-active", type=int, default=int(os.getenv("MCP_SERVER_MAX_ACTIVE", "16")),
+                        help="Aynı anda çalışan azami tur sayısı")
+    parser.add_argument("--max-queued", type=int, default=int(os.getenv("MCP_SERVER_MAX_QUEUED", "64")),
+                        help="Bekleyebilecek azami tur sayısı")
+    parser.add_argument("--max-per-user", type=int, default=int(os.getenv("MCP_SERVER_MAX_PER_USER", "4")),
+                        help="Kullanıcı başına çalışan ve bekleyen azami tur sayısı")
+    parser.add_argument("--max-sessions", type=int, default=int(os.getenv("MCP_SERVER_MAX_SESSIONS", "1000")),
+                        help="Bellekte tutulacak azami oturum sayısı")
+    parser.add_argument("--session-ttl", type=float, default=float(os.getenv("MCP_SERVER_SESSION_TTL", "1800")),
+                        help="Kullanılmayan oturumların atılacağı süre, saniye")
+    args = parser.parse_args()
+    if not args.servers and not args.lazy:
+        parser.error("en az bir sunucu scripti verilmeli")
+
+    import uvicorn
+
+    servers = args.servers + [path for path in args.lazy if path not in args.servers]
+    server = ChatServer(MCPClient(), servers=servers, lazy=args.lazy,
+                        scheduler=FairScheduler(args.max_active, args.max_queued, args.max_per_user),
+                        max_sessions=args.max_sessions, session_ttl=args.session_ttl)
+    uvicorn.run(server.create_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
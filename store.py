@@ -0,0 +1,280 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Optional
+
+
+class ConversationStore:
+    """
+    Sohbetleri SQLite içinde yalnızca eklenen bir kayıt günlüğü olarak saklar.
+
+    Her mesaj, bir önceki kayda (`parent`) bağlı tek bir satırdır; sohbet
+    tablosu yalnızca son kaydı (`head`) gösterir. Bu sayede bir sohbet,
+    geçmiş kopyalanmadan herhangi bir kayıttan çatallanabilir. Büyük metinler
+    (ör. transkript çıktıları) içerik özetiyle ayrı tabloda, sıkıştırılmış ve
+    tekilleştirilmiş olarak tutulur.
+
+    Bağlam eski turları özetlediğinde bir kontrol noktası yazılır; sohbete
+    devam ederken yalnızca son kontrol noktasından itibaren geriye yürünür,
+    yani yükleme süresi tüm geçmişe değil canlı bağlamın boyutuna bağlıdır.
+
+    Args:
+        path: Veritabanı dosyası (":memory:" testler için kullanılabilir)
+        inline_limit: Bu boyuttan (bayt) büyük mesaj içerikleri ayrı saklanır
+    """
+
+    def __init__(self, path: str = "conversations.db", inline_limit: int = 4096):
+        self.path = path
+        self.inline_limit = inline_limit
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                head INTEGER,
+                forked_from TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation TEXT NOT NULL,
+                parent INTEGER,
+                kind TEXT NOT NULL,
+                body TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def create(self, forked_from: Optional[str] = None, head: Optional[int] = None) -> "ConversationLog":
+        """
+        Yeni (boş ya da `head` kaydından devam eden) bir sohbet açar.
+
+        Boş sohbetler ilk mesaj yazılana kadar tabloya eklenmez.
+        """
+        conversation_id = uuid.uuid4().hex
+        if forked_from is None:
+            return ConversationLog(self, conversation_id)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO conversations (id, head, forked_from, created, updated) VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, head, forked_from, now, now))
+            self._db.commit()
+        return ConversationLog(self, conversation_id, started=True)
+
+    def fork(self, conversation_id: str, at: Optional[int] = None) -> "ConversationLog":
+        """
+        Sohbeti kayıtları kopyalamadan çatallar.
+
+        Args:
+            conversation_id: Kaynak sohbet
+            at: Çatallanacak kayıt (verilmezse sohbetin son kaydı)
+        """
+        head = self._head(conversation_id)
+        if at is not None:
+            # Yalnızca kaynak sohbetin zincirindeki (son kayıttan ulaşılabilen) kayıtlar kabul edilir
+            with self._lock:
+                found = head is not None and self._db.execute("""
+                    WITH RECURSIVE chain(id, parent) AS (
+                        SELECT id, parent FROM records WHERE id = ?
+                        UNION
+                        SELECT r.id, r.parent FROM records r JOIN chain ON r.id = chain.parent
+                    )
+                    SELECT 1 FROM chain WHERE id = ?
+                """, (head, at)).fetchone() is not None
+            if not found:
+                raise ValueError(f"Kayıt bu sohbette bulunamadı: {at}")
+            head = at
+        return self.create(forked_from=conversation_id, head=head)
+
+    def load(self, conversation_id: str):
+        """
+        Sohbetin canlı bağlamını yükler.
+
+        Returns:
+            (log, messages, ids, summary_lines, evicted_turns); `ids` her
+            mesajın kayıt kimliği (kontrol noktasına gömülü mesajlar için None)
+        """
+        head = self._head(conversation_id)
+        messages, ids, summary_lines, evicted_turns = [], [], [], 0
+        if head is not None:
+            with self._lock:
+                chain = self._db.execute("""
+                    WITH RECURSIVE chain(id, parent, kind, body, depth) AS (
+                        SELECT id, parent, kind, body, 0 FROM records WHERE id = ?
+                        UNION ALL
+                        SELECT r.id, r.parent, r.kind, r.body, chain.depth + 1
+                        FROM records r JOIN chain ON r.id = chain.parent
+                        WHERE chain.kind != 'checkpoint'
+                    )
+                    SELECT id, kind, body FROM chain ORDER BY depth DESC
+                """, (head,)).fetchall()
+
+            for record_id, kind, body in chain:
+                if kind == "checkpoint":
+                    state = json.loads(body)
+                    refs = self._messages([entry for entry in state["live"] if isinstance(entry, int)])
+                    for entry in state["live"]:
+                        if isinstance(entry, int):
+                            messages.append(refs[entry])
+                            ids.append(entry)
+                        else:
+                            messages.append(self._decode(entry))
+                            ids.append(None)
+                    summary_lines = state["summary_lines"]
+                    evicted_turns = state["evicted_turns"]
+                else:
+                    messages.append(self._decode(json.loads(body)))
+                    ids.append(record_id)
+        return ConversationLog(self, conversation_id, started=True), messages, ids, summary_lines, evicted_turns
+
+    def messages_between(self, first: int, last: int) -> list:
+        """
+        `first` ile `last` kayıtları (ikisi dahil) arasındaki mesajları sırayla döndürür.
+
+        Aralık `last` kaydından ebeveynlere doğru yürünerek bulunur; böylece
+        aynı veritabanına yazan diğer sohbetlerin araya giren kayıtları
+        karışmaz. Kontrol noktaları atlanır.
+        """
+        with self._lock:
+            # Ebeveyn her zaman daha küçük kimliklidir; yürüyüş `first` altına inmez
+            chain = self._db.execute("""
+                WITH RECURSIVE chain(id, parent, kind, body) AS (
+                    SELECT id, parent, kind, body FROM records WHERE id = ?
+                    UNION ALL
+                    SELECT r.id, r.parent, r.kind, r.body FROM records r JOIN chain ON r.id = chain.parent
+                    WHERE chain.id > ?
+                )
+                SELECT id, kind, body FROM chain ORDER BY id
+            """, (last, first)).fetchall()
+        if not chain or chain[0][0] != first:
+            raise ValueError(f"Kayıt aralığı bulunamadı: {first}-{last}")
+        return [self._decode(json.loads(body)) for _, kind, body in chain if kind == "message"]
+
+    def conversations(self, limit: int = 20) -> list:
+        """Son güncellenen sohbetler (yeniden eskiye)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, forked_from, created, updated FROM conversations ORDER BY updated DESC LIMIT ?",
+                (limit,)).fetchall()
+        return [{"id": row[0], "forked_from": row[1], "created": row[2], "updated": row[3]} for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _head(self, conversation_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute("SELECT head FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Sohbet bulunamadı: {conversation_id}")
+        return row[0]
+
+    def _append(self, conversation_id: str, kind: str, body: dict) -> int:
+        """Kaydı sohbetin son kaydına bağlayarak ekler ve sohbetin başını ilerletir"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO conversations (id, head, forked_from, created, updated) VALUES (?, NULL, NULL, ?, ?)",
+                (conversation_id, now, now))
+            cursor = self._db.execute("""
+                INSERT INTO records (conversation, parent, kind, body, created)
+                VALUES (?, (SELECT head FROM conversations WHERE id = ?), ?, ?, ?)
+            """, (conversation_id, conversation_id, kind, json.dumps(body, ensure_ascii=False), now))
+            record_id = cursor.lastrowid
+            self._db.execute("UPDATE conversations SET head = ?, updated = ? WHERE id = ?",
+                             (record_id, now, conversation_id))
+            self._db.commit()
+        return record_id
+
+    def _encode(self, message: dict) -> dict:
+        content = message.get("content")
+        if not isinstance(content, str):
+            return message
+        data = content.encode("utf-8")
+        if len(data) <= self.inline_limit:
+            return message
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        payload = zlib.compress(data)
+        with self._lock:
+            # Aynı içerik (ör. aynı transkript) yalnızca bir kez saklanır
+            self._db.execute("INSERT OR IGNORE INTO blobs (hash, payload, size) VALUES (?, ?, ?)",
+                             (digest, payload, len(payload)))
+        return {**message, "content": {"$blob": digest}}
+
+    def _decode(self, message: dict) -> dict:
+        content = message.get("content")
+        if isinstance(content, dict) and "$blob" in content:
+            with self._lock:
+                row = self._db.execute("SELECT payload FROM blobs WHERE hash = ?", (content["$blob"],)).fetchone()
+            text = zlib.decompress(row[0]).decode("utf-8") if row else "[İçerik bulunamadı]"
+            message = {**message, "content": text}
+        return message
+
+    def _messages(self, record_ids: list) -> dict:
+        if not record_ids:
+            return {}
+        placeholders = ",".join("?" * len(record_ids))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, body FROM records WHERE kind = 'message' AND id IN ({placeholders})",
+                record_ids).fetchall()
+        return {record_id: self._decode(json.loads(body)) for record_id, body in rows}
+
+
+class ConversationLog:
+    """
+    Tek bir sohbetin günlüğü; ContextManager'a `journal` olarak verilir.
+
+    Yeni bir sohbetin başındaki sistem mesajı ilk gerçek mesajla birlikte
+    yazılır; böylece hiç kullanılmayan sohbetler günlüğe eklenmez.
+
+    Args:
+        store: Kayıtların yazılacağı ConversationStore
+        conversation_id: Sohbet kimliği
+        started: Sohbetin günlükte kaydı var mı (devam edilen ya da çatallanan sohbetler)
+    """
+
+    def __init__(self, store: ConversationStore, conversation_id: str, started: bool = False):
+        self.store = store
+        self.id = conversation_id
+        self.started = started
+        self._deferred = []
+
+    def append(self, message: dict) -> Optional[int]:
+        """Mesajı günlüğe ekler ve kayıt kimliğini döndürür (ertelenen sistem mesajı için None)"""
+        if not self.started:
+            if message.get("role") == "system":
+                self._deferred.append(message)
+                return None
+            self.started = True
+            for deferred in self._deferred:
+                self.store._append(self.id, "message", self.store._encode(deferred))
+            self._deferred.clear()
+        return self.store._append(self.id, "message", self.store._encode(message))
+
+    def checkpoint(self, messages: list, ids: list, summary_lines: list, evicted_turns: int) -> int:
+        """
+        Canlı bağlamı kaydeder: günlükte olan mesajlar kimlikleriyle, diğerleri
+        (özet, kısaltılmış araç çıktıları) doğrudan yazılır.
+        """
+        live = [record_id if record_id is not None else self.store._encode(message)
+                for message, record_id in zip(messages, ids)]
+        return self.store._append(self.id, "checkpoint", {
+            "live": live,
+            "summary_lines": summary_lines,
+            "evicted_turns": evicted_turns
+        })
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modüller depo kökünde düz olarak durur
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+from batch import BatchRunner
+from d1 import MCPClient
+
+
+class APIError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.http_status = status
+
+
+class FlakyBackend:
+    """İlk `failures` isteği 503 ile reddeden, sağlayıcıya giden istekleri sayan sahte LLM"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.requests = 0
+
+    async def create(self, **kwargs):
+        raise NotImplementedError
+
+    async def stream(self, **kwargs):
+        self.requests += 1
+        if self.failures:
+            self.failures -= 1
+            raise APIError(503)
+        yield {"choices": [{"delta": {"content": "yanıt"}}]}
+
+    async def aclose(self):
+        pass
+
+
+class FakePool:
+    def __init__(self):
+        self.connections = {"fake": object()}
+
+    async def get_specs(self):
+        return []
+
+    def is_read_only(self, name):
+        return False
+
+
+def make_client(monkeypatch, backend, scheduler=True):
+    monkeypatch.setenv("LLM_SCHEDULER", "1" if scheduler else "0")
+    monkeypatch.setenv("MCP_PREFETCH", "0")
+    for name in ("MCP_STORE", "MCP_CACHE", "MCP_TRACE", "MCP_TRACE_FILE", "MCP_METRICS_FILE"):
+        monkeypatch.delenv(name, raising=False)
+    client = MCPClient(llm_backend=backend, caches=(None, None))
+    client.pool = FakePool()
+    return client
+
+
+def run_batch(runner, tmp_path, lines):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    source.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    stats = asyncio.run(runner.run(str(source), str(output)))
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    return stats, records
+
+
+def count_acquires(limiter):
+    acquired = []
+    acquire = limiter.acquire
+
+    async def counted():
+        acquired.append(None)
+        await acquire()
+
+    limiter.acquire = counted
+    return acquired
+
+
+def test_rate_limit_applies_to_every_retry(monkeypatch, tmp_path):
+    backend = FlakyBackend(failures=3)
+    client = make_client(monkeypatch, backend)
+    client.llm.base_delay = 0
+    runner = BatchRunner(client, concurrency=1, rpm=6000)
+    acquired = count_acquires(runner.limiter)
+
+    stats, records = run_batch(runner, tmp_path, ['{"id": "a", "prompt": "soru"}'])
+
+    assert [(record["id"], record["response"]) for record in records] == [("a", "yanıt")]
+    assert "error" not in records[0]
+    assert client.llm.retries == 3
+    # Sağlayıcıya giden her istek (yeniden denemeler dahil) bir token harcar
+    assert backend.requests == 4
+    assert len(acquired) == backend.requests
+
+
+def test_rate_limit_without_scheduler(monkeypatch, tmp_path):
+    backend = FlakyBackend()
+    client = make_client(monkeypatch, backend, scheduler=False)
+    runner = BatchRunner(client, concurrency=2, rpm=6000)
+    acquired = count_acquires(runner.limiter)
+
+    stats, _ = run_batch(runner, tmp_path, ['"bir"', '"iki"'])
+
+    assert stats["completed"] == 2
+    assert len(acquired) == backend.requests == 2
+
+
+def test_invalid_lines_are_reported_and_skipped(monkeypatch, tmp_path):
+    backend = FlakyBackend()
+    runner = BatchRunner(make_client(monkeypatch, backend, scheduler=False), concurrency=2)
+
+    stats, records = run_batch(runner, tmp_path, [
+        '{"id": "a", "prompt": "soru"}',
+        '{bozuk',
+        '42',
+        '{"id": "b", "turns": "merhaba"}',
+        '{"turns": [{"x": 1}]}',
+        '{"turns": []}',
+        '{"id": "c"}',
+        '{"id": "d", "turns": ["bir", "iki"]}',
+    ])
+
+    errors = {record["line"]: record for record in records if "line" in record}
+    assert sorted(errors) == [2, 3, 4, 5, 6, 7]
+    assert all("error" in record for record in errors.values())
+    assert errors[2]["id"] is None and errors[3]["id"] is None
+    assert errors[4]["id"] == "b" and errors[7]["id"] == "c"
+    assert stats["errors"] == 6
+    assert stats["completed"] == 2
+    # Çok turlu kayıt metin başına bir tur çalıştırır
+    assert backend.requests == 3
+    assert {record["id"]: record.get("responses") for record in records if "line" not in record} == {
+        "a": None, "d": ["yanıt", "yanıt"]}
+
+
+def test_resume_reports_invalid_line_even_if_its_number_is_a_done_id(monkeypatch, tmp_path):
+    (tmp_path / "out.jsonl").write_text('{"id": 2, "response": "eski"}\n', encoding="utf-8")
+    backend = FlakyBackend()
+    runner = BatchRunner(make_client(monkeypatch, backend, scheduler=False), concurrency=1)
+
+    stats, records = run_batch(runner, tmp_path, ['{"id": 2, "prompt": "soru"}', '{bozuk'])
+
+    assert stats["skipped"] == 1
+    assert records[1:] == [{"id": None, "line": 2, "error": records[1]["error"]}]
+    assert records[1]["error"].startswith("Geçersiz JSON")
+    assert BatchRunner.completed_ids(str(tmp_path / "out.jsonl")) == {"2"}
@@ -0,0 +1,143 @@
+import random
+
+import pytest
+from mcp import types
+
+import cache
+from cache import DiskStore, MemoryStore, ResponseCache, ToolCache, normalize_messages, parse_policies
+from catalog import is_read_only
+
+
+class Clock:
+    """Her okumada biraz ilerleyen sahte saat; erişim sırası kesin olsun diye"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "disk"])
+def make_store(request):
+    stores = []
+
+    def make(max_bytes):
+        store = MemoryStore(max_bytes) if request.param == "memory" else DiskStore(":memory:", max_bytes)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def noise(seed, size=400):
+    """Sıkıştırılamayan, tohuma göre sabit metin"""
+    rng = random.Random(seed)
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(size))
+
+
+def tool_turn(call_id, query):
+    return [
+        {"role": "user", "content": f"  {query} "},
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "ara", "arguments": "{}"}}]},
+        {"role": "tool", "tool_call_id": call_id, "content": "sonuç"},
+    ]
+
+
+def test_tool_call_ids_are_renumbered():
+    first = normalize_messages(tool_turn("call_abc", "soru") + tool_turn("call_xyz", "iki"))
+    second = normalize_messages(tool_turn("call_123", "soru") + tool_turn("call_456", "iki"))
+
+    assert first == second
+    assert [m.get("tool_call_id") for m in first if m["role"] == "tool"] == ["call_0", "call_1"]
+    assert first[1]["tool_calls"][0]["id"] == "call_0"
+    # Boş alanlar atılır, metinler kırpılır
+    assert first[0] == {"role": "user", "content": "soru"}
+    assert "content" not in first[1]
+    assert ResponseCache.key("m", tool_turn("a", "soru")) == ResponseCache.key("m", tool_turn("b", "soru"))
+    assert ResponseCache.key("m", tool_turn("a", "soru")) != ResponseCache.key("m", tool_turn("a", "başka"))
+
+
+def test_least_recently_used_entries_are_evicted_by_size(clock, make_store):
+    probe = make_store(10 ** 6)
+    probe.put("x", noise(0))
+    entry = probe.total_bytes
+    store = make_store(int(entry * 3.5))
+
+    for name in "abc":
+        store.put(name, noise(ord(name)))
+    store.get("a")
+    store.put("d", noise(ord("d")))
+
+    assert store.get("b") is None
+    assert [store.get(name) for name in "acd"] == [noise(ord(name)) for name in "acd"]
+    assert store.total_bytes <= store.max_bytes
+
+
+def test_oversized_value_is_not_stored(clock, make_store):
+    store = make_store(100)
+    store.put("büyük", noise(1, size=1000))
+
+    assert store.get("büyük") is None
+    assert store.total_bytes == 0
+
+
+def test_entries_expire_after_ttl(clock, make_store):
+    store = make_store(10 ** 6)
+    store.put("kısa", "değer", ttl=10)
+    store.put("süresiz", "değer")
+
+    clock.now += 9
+    assert store.get("kısa") == "değer"
+    clock.now += 2
+    assert store.get("kısa") is None
+    assert store.get("süresiz") == "değer"
+    # Süresi dolan kayıt silinir ve boyutu düşülür
+    assert store.stats() == {"hits": 2, "misses": 1, "bytes": store.total_bytes}
+    store.put("kısa", "yeni")
+    assert store.get("kısa") == "yeni"
+
+
+def test_policy_of_zero_disables_caching():
+    policies = parse_policies(" yt__get_transcript, yt__search=3600 ,yt__live=0,,")
+    tools = ToolCache(MemoryStore(), ttl=300, policies=policies)
+
+    assert policies == {"yt__get_transcript": None, "yt__search": 3600.0, "yt__live": 0.0}
+    assert tools.ttl_for("yt__get_transcript") == 300
+    assert tools.ttl_for("yt__search") == 3600
+    # 0, sunucu aracı salt okunur işaretlese de önbelleği kapatır
+    assert not tools.cacheable("yt__live", read_only=True)
+    assert tools.cacheable("yt__get_transcript")
+
+
+def test_read_only_hint_opts_a_tool_in():
+    tools = ToolCache(MemoryStore(), ttl=300)
+    marked = types.Tool.model_validate({"name": "ara", "inputSchema": {}, "annotations": {"readOnlyHint": True}})
+    plain = types.Tool(name="sil", inputSchema={})
+
+    assert is_read_only(marked) and not is_read_only(plain)
+    assert tools.cacheable("yt__ara", read_only=is_read_only(marked))
+    assert not tools.cacheable("yt__sil", read_only=is_read_only(plain))
+
+
+def test_tool_results_round_trip_with_their_ttl(clock):
+    tools = ToolCache(MemoryStore(), ttl=300, policies={"yt__kisa": 5})
+    key = ToolCache.key("yt", "kisa", {"b": 1, "a": [1, 2]})
+
+    tools.put(key, "yt__kisa", "sonuç")
+
+    assert ToolCache.key("yt", "kisa", {"a": [1, 2], "b": 1}) == key
+    assert tools.get(key) == "sonuç"
+    clock.now += 6
+    assert tools.get(key) is None
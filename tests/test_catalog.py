@@ -0,0 +1,124 @@
+import asyncio
+
+from mcp import types
+
+import catalog
+from catalog import ToolCatalog, tool_to_spec
+from pool import ServerConnection
+
+
+class FakeSession:
+    """Araç listesini döndüren ve çağrıları sayan sahte oturum"""
+
+    def __init__(self, *names, delay=0.0):
+        self.names = list(names)
+        self.delay = delay
+        self.calls = 0
+        self.during_call = None
+
+    async def list_tools(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.during_call:
+            self.during_call()
+        return types.ListToolsResult(tools=[types.Tool(name=name, inputSchema={}) for name in self.names])
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+def names(specs):
+    return [spec["function"]["name"] for spec in specs]
+
+
+def test_specs_are_served_from_cache_until_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(catalog, "time", clock)
+    session = FakeSession("ara")
+    tools = ToolCatalog(ttl=60)
+
+    async def scenario():
+        first = await tools.get_specs(session)
+        clock.now += 59
+        cached = await tools.get_specs(session)
+        session.names.append("yaz")
+        clock.now += 2
+        return first, cached, await tools.get_specs(session)
+
+    first, cached, refreshed = asyncio.run(scenario())
+
+    assert cached is first
+    assert names(refreshed) == ["ara", "yaz"]
+    assert session.calls == 2
+    assert tools.stats() == {"hits": 1, "misses": 2, "tools": 2}
+
+
+def test_version_changes_only_when_the_list_is_reloaded():
+    session = FakeSession("ara")
+    tools = ToolCatalog()
+
+    async def scenario():
+        versions = [tools.version]
+        await tools.get_specs(session)
+        versions.append(tools.version)
+        await tools.get_specs(session)
+        versions.append(tools.version)
+        tools.invalidate()
+        await tools.get_specs(session)
+        versions.append(tools.version)
+        tools.load([types.Tool(name="yerel", inputSchema={})])
+        versions.append(tools.version)
+        return versions
+
+    assert asyncio.run(scenario()) == [0, 1, 1, 2, 3]
+    assert names(tools.specs) == ["yerel"] and tools.is_fresh()
+
+
+def test_concurrent_misses_refresh_once():
+    session = FakeSession("ara", delay=0.01)
+    tools = ToolCatalog()
+
+    async def scenario():
+        return await asyncio.gather(*(tools.get_specs(session) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert session.calls == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_list_changed_during_refresh_is_not_lost():
+    session = FakeSession("ara")
+    tools = ToolCatalog()
+    session.during_call = tools.invalidate
+
+    asyncio.run(tools.refresh(session))
+
+    assert not tools.is_fresh()
+
+
+def test_list_changed_notification_invalidates_the_catalog():
+    connection = ServerConnection("yt", "yt.py")
+    session = FakeSession("ara")
+
+    async def scenario():
+        await connection.catalog.get_specs(session)
+        session.names = ["ara", "yeni"]
+        await connection._handle_server_message(types.ServerNotification(
+            types.ToolListChangedNotification(method="notifications/tools/list_changed")))
+        return await connection.catalog.get_specs(session)
+
+    assert names(asyncio.run(scenario())) == ["ara", "yeni"]
+    assert session.calls == 2
+
+
+def test_tool_to_spec_uses_the_qualified_name():
+    tool = types.Tool(name="ara", description="Arar", inputSchema={"type": "object"})
+
+    assert tool_to_spec(tool, name="yt__ara") == {"type": "function", "function": {
+        "name": "yt__ara", "description": "Arar", "parameters": {"type": "object"}}}
@@ -0,0 +1,129 @@
+from context import ContextManager, estimate_tokens
+
+
+def tool_turn(n, output_chars=4000):
+    """Kullanıcı mesajı, araç çağrısı, büyük araç çıktısı ve yanıttan oluşan bir tur"""
+    call_id = f"call_{n}"
+    return [
+        {"role": "user", "content": f"soru {n}"},
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "get_transcript", "arguments": "{}"}}]},
+        {"role": "tool", "tool_call_id": call_id, "content": f"çıktı {n} " + "x" * output_chars},
+        {"role": "assistant", "content": f"yanıt {n}"}
+    ]
+
+
+def chat_turn(n, chars=400):
+    return [
+        {"role": "user", "content": f"soru {n} " + "y" * chars},
+        {"role": "assistant", "content": f"yanıt {n} " + "z" * chars}
+    ]
+
+
+class FakeJournal:
+    def __init__(self):
+        self.messages = []
+        self.checkpoints = []
+
+    def append(self, message):
+        self.messages.append(message)
+        return len(self.messages)
+
+    def checkpoint(self, messages, ids, summary_lines, evicted_turns):
+        self.checkpoints.append((list(messages), list(ids), list(summary_lines), evicted_turns))
+
+
+def test_under_budget_is_untouched():
+    context = ContextManager("sistem", budget=100000)
+    context.extend(tool_turn(1) + tool_turn(2))
+    messages = list(context.messages)
+
+    assert context.window() == messages
+    assert context.stats()["stubbed_outputs"] == 0
+    assert context.stats()["evicted_turns"] == 0
+
+
+def test_old_tool_outputs_are_stubbed_first():
+    context = ContextManager("sistem", budget=1500, stub_threshold=200)
+    context.extend(tool_turn(1) + tool_turn(2))
+
+    window = context.window()
+
+    assert context.total_tokens <= context.budget
+    assert context.stats()["evicted_turns"] == 0
+    assert context.stats()["stubbed_outputs"] == 1
+    old, latest = [m for m in window if m["role"] == "tool"]
+    assert old["content"].startswith("[Eski araç çıktısı kısaltıldı")
+    assert old["tool_call_id"] == "call_1"
+    # Son araç alışverişi korunur
+    assert latest["content"].startswith("çıktı 2 ")
+    assert context.total_tokens == sum(estimate_tokens(m) for m in window)
+
+
+def test_oldest_turns_are_evicted_into_summary():
+    context = ContextManager("sistem", budget=500, summary_max_chars=300)
+    for n in range(5):
+        context.extend(chat_turn(n))
+    before = context.total_tokens
+
+    window = context.window()
+
+    # Özet mesajı bütçeye dahil değildir; boyutu summary_max_chars ile sınırlıdır
+    assert context.total_tokens - estimate_tokens(window[1]) <= context.budget < before
+    assert len(window[1]["content"]) <= context.summary_max_chars
+    assert window[0] == {"role": "system", "content": "sistem"}
+    assert window[1]["role"] == "system"
+    assert window[1]["content"].startswith("Önceki konuşmanın özeti:")
+    # Son tur her zaman korunur
+    assert window[-2]["content"].startswith("soru 4 ")
+    assert window[-1]["content"].startswith("yanıt 4 ")
+    assert context.stats()["evicted_turns"] == 5 - sum(1 for m in window if m["role"] == "user")
+    assert context.total_tokens == sum(estimate_tokens(m) for m in window)
+
+
+def test_latest_turn_is_kept_even_over_budget():
+    context = ContextManager("sistem", budget=10)
+    context.extend(chat_turn(0))
+
+    window = context.window()
+
+    assert [m["role"] for m in window] == ["system", "user", "assistant"]
+    assert context.stats()["evicted_turns"] == 0
+
+
+def test_eviction_writes_checkpoint_with_record_ids():
+    journal = FakeJournal()
+    context = ContextManager("sistem", budget=400, journal=journal)
+    for n in range(5):
+        context.extend(chat_turn(n))
+
+    context.window()
+
+    assert len(journal.checkpoints) == 1
+    messages, ids, summary_lines, evicted_turns = journal.checkpoints[0]
+    assert messages == context.messages
+    # Özet mesajı günlükte yok; korunan mesajlar kayıt kimliklerini taşır
+    assert ids[0] == 1 and ids[1] is None
+    assert all(journal.messages[record_id - 1] is message
+               for record_id, message in zip(ids[2:], messages[2:]))
+    assert evicted_turns == context.evicted_turns
+    assert summary_lines == context._summary_lines
+
+
+def test_restore_keeps_summary_for_further_eviction():
+    context = ContextManager("sistem", budget=400)
+    for n in range(5):
+        context.extend(chat_turn(n))
+    context.window()
+
+    restored = ContextManager("sistem", budget=400)
+    restored.restore(context.messages, [None] * len(context.messages),
+                     context._summary_lines, context.evicted_turns)
+    for n in range(5, 8):
+        restored.extend(chat_turn(n))
+    window = restored.window()
+
+    assert sum(1 for m in window if m["role"] == "system") == 2
+    assert len(window[1]["content"]) <= restored.summary_max_chars
+    assert "soru 5" in window[1]["content"]
+    assert window[-2]["content"].startswith("soru 7 ")
@@ -0,0 +1,99 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from images import ImagePipeline, InvalidImage
+
+
+def encode(format, size=(64, 48), color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def decode(data_url):
+    header, data = data_url.split(",", 1)
+    return header, base64.b64decode(data)
+
+
+@pytest.mark.parametrize("format, mime", [("JPEG", "image/jpeg"), ("PNG", "image/png"), ("WEBP", "image/webp")])
+def test_small_supported_images_pass_through(format, mime):
+    raw = encode(format)
+    pipeline = ImagePipeline(max_edge=100)
+
+    header, data = decode(pipeline.to_data_url(base64.b64encode(raw).decode()))
+
+    assert header == f"data:{mime};base64"
+    assert data == raw
+
+
+def test_small_unsupported_format_is_reencoded():
+    header, data = decode(ImagePipeline(max_edge=100).to_data_url(base64.b64encode(encode("GIF")).decode()))
+
+    assert header == "data:image/jpeg;base64"
+    assert Image.open(io.BytesIO(data)).format == "JPEG"
+
+
+@pytest.mark.parametrize("format", ["PNG", "JPEG"])
+def test_large_images_are_resized_to_the_bound(format):
+    raw = encode(format, size=(1200, 400))
+    pipeline = ImagePipeline(max_edge=300, format="WEBP")
+
+    header, data = decode(pipeline.to_data_url("data:image/x;base64," + base64.b64encode(raw).decode()))
+    image = Image.open(io.BytesIO(data))
+
+    assert header == "data:image/webp;base64"
+    assert max(image.size) == 300
+    assert image.size[0] / image.size[1] == pytest.approx(3, rel=0.02)
+
+
+def test_pil_input_is_resized_without_changing_it():
+    image = Image.new("RGBA", (800, 200), (0, 0, 255, 128))
+
+    _, data = decode(ImagePipeline(max_edge=400).to_data_url(image))
+
+    assert Image.open(io.BytesIO(data)).size == (400, 100)
+    assert image.size == (800, 200)
+
+
+def test_same_source_is_encoded_once(tmp_path):
+    raw = encode("PNG", size=(500, 500))
+    path = tmp_path / "gorsel.png"
+    path.write_bytes(raw)
+    pipeline = ImagePipeline(max_edge=100)
+
+    first = pipeline.to_data_url(str(path))
+    # Aynı baytlar base64, dosyadan ya da bellekten açılmış PIL görseli olarak gelse de önbellekten döner
+    assert pipeline.to_data_url(base64.b64encode(raw).decode()) == first
+    assert pipeline.to_data_url(Image.open(io.BytesIO(raw))) == first
+    assert pipeline.to_data_url(Image.open(path)) == first
+    assert pipeline.stats() == {"hits": 3, "misses": 1, "entries": 1}
+
+
+def test_loaded_pil_images_are_keyed_by_their_pixels():
+    pipeline = ImagePipeline(max_edge=100)
+    image = Image.open(io.BytesIO(encode("PNG")))
+    image.load()
+
+    first = pipeline.to_data_url(image)
+    assert pipeline.to_data_url(image) == first
+    image.paste((0, 0, 0), (0, 0, 10, 10))
+
+    assert pipeline.to_data_url(image) != first
+    assert pipeline.stats()["hits"] == 1
+
+
+def test_cache_is_bounded():
+    pipeline = ImagePipeline(cache_size=2)
+    for color in range(4):
+        pipeline.to_data_url(base64.b64encode(encode("PNG", color=(color, 0, 0))).decode())
+
+    assert pipeline.stats() == {"hits": 0, "misses": 4, "entries": 2}
+
+
+@pytest.mark.parametrize("value", ["bu bir görsel değil!", base64.b64encode(b"metin").decode()])
+def test_invalid_input_is_rejected(value):
+    with pytest.raises(InvalidImage):
+        ImagePipeline().to_data_url(value)
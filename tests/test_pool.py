@@ -0,0 +1,386 @@
+import asyncio
+import json
+from contextlib import aclosing
+from pathlib import Path
+
+import anyio
+import pytest
+from mcp import types
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.shared.memory import create_client_server_memory_streams
+
+import yt
+from d1 import MCPClient
+from pool import ServerConnection, ServerPool, ToolProgress
+
+FAKE_SERVER = str(Path(__file__).resolve().parent.parent / "bench" / "fake_mcp.py")
+
+server = FastMCP("bellek", log_level="WARNING")
+
+
+@server.tool()
+async def slow(steps: int, ctx: Context) -> str:
+    """İlerleme bildirdikten sonra iptal edilene kadar bekler"""
+    for step in range(steps):
+        await ctx.report_progress(step + 1, steps)
+    await asyncio.sleep(60)
+    return "bitmedi"
+
+
+class WireStream:
+    """Sunucuya giden JSON-RPC mesajlarını kaydeden yazma akışı"""
+
+    def __init__(self, stream, wire):
+        self._stream = stream
+        self._wire = wire
+
+    async def send(self, message):
+        self._wire.append(message.root)
+        await self._stream.send(message)
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class MemoryConnection(ServerConnection):
+    """Alt süreç yerine aynı döngüde çalışan bellek içi sunucuya bağlanır"""
+
+    def __init__(self, mcp_server=server, **kwargs):
+        super().__init__("bellek", "bellek.py", **kwargs)
+        self.mcp_server = mcp_server._mcp_server
+        self.wire = []
+        self.cancelled_ids = []
+
+    async def _open_streams(self, stack):
+        client_streams, server_streams = await stack.enter_async_context(create_client_server_memory_streams())
+        tasks = await stack.enter_async_context(anyio.create_task_group())
+        tasks.start_soon(lambda: self.mcp_server.run(
+            *server_streams, self.mcp_server.create_initialization_options()))
+        stack.callback(tasks.cancel_scope.cancel)
+        read, write = client_streams
+        return read, WireStream(write, self.wire)
+
+    async def _cancel_request(self, request_id):
+        self.cancelled_ids.append(request_id)
+
+
+def transcript_server(monkeypatch, count=250):
+    """Segmentleri sahte kaynaktan gelen yt.py sunucusu"""
+    async def fetch_segments(video_id):
+        return [{"text": f"{video_id}-{i}", "start": float(i), "duration": 1.0} for i in range(count)]
+
+    monkeypatch.setattr(yt, "fetch_segments", fetch_segments)
+    monkeypatch.setattr(yt, "CHUNK_SEGMENTS", 100)
+    return yt.mcp
+
+
+def full_text(video_id, count=250):
+    return " ".join(f"{video_id}-{i}" for i in range(count))
+
+
+def tool_calls(wire):
+    return {message.params["_meta"]["progressToken"]: message.id
+            for message in wire if isinstance(message, types.JSONRPCRequest) and message.method == "tools/call"}
+
+
+def test_cancelled_call_reports_the_id_sent_over_the_wire():
+    async def scenario():
+        connection = MemoryConnection()
+        await connection.start()
+        try:
+            # Araya giren istekler sıradaki kimliği kaydırır
+            await connection.session.send_ping()
+
+            async def first_progress(steps):
+                async with aclosing(connection.stream_tool("slow", {"steps": steps})) as events:
+                    event = await anext(events)
+                    await connection.session.send_ping()
+                    return event
+
+            events = await asyncio.gather(first_progress(1), first_progress(2))
+            return events, tool_calls(connection.wire), connection
+        finally:
+            await connection.close()
+
+    events, calls, connection = asyncio.run(scenario())
+
+    assert all(isinstance(event, ToolProgress) for event in events)
+    assert len(calls) == 2
+    assert sorted(connection.cancelled_ids) == sorted(calls.values())
+    # Kimlikler belirtece göre tutulur; çağrı bitince kayıt silinir
+    assert connection._request_ids == {}
+
+
+def make_pool(count=1, lazy=False, **kwargs):
+    kwargs.setdefault("manifest_path", None)
+    pool = ServerPool(health_interval=None, **kwargs)
+    for _ in range(count):
+        pool.add_server(FAKE_SERVER, lazy=lazy)
+    return pool
+
+
+def result_text(result):
+    return result.content[0].text
+
+
+def test_namespaced_tools_are_routed_to_their_server():
+    async def scenario():
+        pool = make_pool(count=2)
+        await pool.start()
+        try:
+            names = [spec["function"]["name"] for spec in await pool.get_specs()]
+            second = await pool.call_tool("fake_mcp_2__work", {"query": "iki"})
+            owner = pool.resolve("fake_mcp_2__work")[0]
+            with pytest.raises(KeyError):
+                pool.resolve("yok__work")
+            return names, result_text(second), owner, pool.connections["fake_mcp_2"]
+        finally:
+            await pool.close()
+
+    names, text, owner, expected = asyncio.run(scenario())
+    assert names == ["fake_mcp__work", "fake_mcp_2__work"]
+    assert text.startswith("result for 'iki'")
+    assert owner is expected
+
+
+def test_lazy_server_is_described_by_the_manifest(tmp_path):
+    manifest = tmp_path / "tools.json"
+
+    async def first_run():
+        pool = make_pool(lazy=True, manifest_path=str(manifest))
+        await pool.start()
+        # Manifest kaydı yokken araçları öğrenmek için bir kez başlatılır
+        running = pool.connections["fake_mcp"].running
+        await pool.close()
+        return running
+
+    async def second_run():
+        pool = make_pool(lazy=True, manifest_path=str(manifest))
+        await pool.start()
+        try:
+            connection = pool.connections["fake_mcp"]
+            before = connection.running
+            names = [spec["function"]["name"] for spec in await pool.get_specs()]
+            result = await pool.call_tool("fake_mcp__work", {"query": "x"})
+            return before, names, connection.running, result_text(result)
+        finally:
+            await pool.close()
+
+    assert asyncio.run(first_run())
+    [entry] = json.loads(manifest.read_text(encoding="utf-8")).values()
+    assert [tool["name"] for tool in entry["tools"]] == ["work"]
+
+    before, names, after, text = asyncio.run(second_run())
+    assert not before
+    assert names == ["fake_mcp__work"]
+    assert after and text.startswith("result for 'x'")
+
+
+def test_specs_are_rebuilt_only_when_a_catalog_changes():
+    async def scenario():
+        pool = make_pool()
+        await pool.start()
+        try:
+            catalog = pool.connections["fake_mcp"].catalog
+            first = await pool.get_specs()
+            cached = await pool.get_specs()
+            version = catalog.version
+            catalog.invalidate()
+            rebuilt = await pool.get_specs()
+            return first, cached, rebuilt, catalog.version - version
+        finally:
+            await pool.close()
+
+    first, cached, rebuilt, bumps = asyncio.run(scenario())
+    assert cached is first
+    assert rebuilt is not first and rebuilt == first
+    assert bumps == 1
+
+
+def test_crashed_server_is_restarted(tmp_path):
+    script = tmp_path / "crashy.py"
+    script.write_text(
+        "import os, runpy\n"
+        f"mcp = runpy.run_path({FAKE_SERVER!r})['mcp']\n"
+        "mcp.tool(name='crash', description='Exits the process')(lambda: os._exit(1))\n"
+        "mcp.run(transport='stdio')\n", encoding="utf-8")
+
+    async def scenario():
+        pool = ServerPool(health_interval=0.2, manifest_path=None)
+        connection = pool.add_server(str(script))
+        await pool.start()
+        try:
+            with pytest.raises(Exception):
+                await pool.call_tool("crashy__crash", {}, timeout=1)
+            # Yanıt vermeyen sunucu sağlık kontrolünde yeniden başlatılır
+            while not (connection.restarts and connection.running):
+                await asyncio.sleep(0.05)
+            result = await pool.call_tool("crashy__work", {"query": "yeniden"})
+            return connection.restarts, result_text(result)
+        finally:
+            await pool.close()
+
+    restarts, text = asyncio.run(asyncio.wait_for(scenario(), timeout=60))
+    assert restarts == 1
+    assert text.startswith("result for 'yeniden'")
+
+
+class FailingConnection:
+    def __init__(self, failures, hang=False):
+        self.name = "bozuk"
+        self.failures = failures
+        self.hang = hang
+        self.attempts = 0
+
+    async def restart(self):
+        self.attempts += 1
+        if self.hang:
+            await asyncio.sleep(60)
+        if self.attempts <= self.failures:
+            raise RuntimeError("başlatılamadı")
+
+
+def test_restart_backs_off_between_failed_attempts(monkeypatch):
+    delays = []
+    sleep = asyncio.sleep
+
+    async def record(delay):
+        delays.append(delay)
+        await sleep(0)
+
+    async def scenario(connection):
+        pool = make_pool(count=0, max_restart_attempts=4)
+        pool._schedule_restart(connection)
+        # Çalışan bir deneme varken ikinci bir görev başlatılmaz
+        pool._schedule_restart(connection)
+        await pool._restarting["bozuk"]
+
+    monkeypatch.setattr(asyncio, "sleep", record)
+    recovering = FailingConnection(failures=2)
+    asyncio.run(scenario(recovering))
+    assert recovering.attempts == 3
+    assert delays == [1, 2]
+
+    delays.clear()
+    broken = FailingConnection(failures=10)
+    asyncio.run(scenario(broken))
+    assert broken.attempts == 4
+    assert delays == [1, 2, 4, 8]
+
+
+def test_close_waits_for_restart_tasks():
+    async def scenario():
+        pool = make_pool(count=0)
+        pool._schedule_restart(FailingConnection(failures=0, hang=True))
+        task = pool._restarting["bozuk"]
+        await asyncio.sleep(0)
+        await pool.close()
+        return task.cancelled(), pool._restarting
+
+    # Görev close() dönmeden bitmiş olmalı; yalnızca iptal istenmiş olması yetmez
+    cancelled, restarting = asyncio.run(scenario())
+    assert cancelled
+    assert restarting == {}
+
+
+def collect(connection, chunks):
+    async def scenario():
+        await connection.start()
+        try:
+            async with aclosing(connection.stream_tool("get_transcript", {"video_id": "vid"},
+                                                       chunks=chunks)) as events:
+                return [event async for event in events]
+        finally:
+            await connection.close()
+
+    return asyncio.run(scenario())
+
+
+def test_stream_tool_yields_progress_in_order_then_the_result(monkeypatch):
+    events = collect(MemoryConnection(transcript_server(monkeypatch)), chunks=False)
+
+    *progress, result = events
+    assert all(isinstance(event, ToolProgress) for event in progress)
+    assert [(e.progress, e.total, e.message) for e in progress] == [
+        (0, None, "Fetching transcript vid"), (100, 250, "Segments"), (200, 250, "Segments"),
+        (250, 250, "Segments")]
+    # Parça istenmediyse metin yalnızca sonuçta gelir
+    assert all(event.chunk is None for event in progress)
+    assert isinstance(result, types.CallToolResult)
+    assert result.content[0].text == full_text("vid")
+
+
+def test_chunked_stream_sends_the_text_in_progress_events(monkeypatch):
+    events = collect(MemoryConnection(transcript_server(monkeypatch)), chunks=True)
+
+    *progress, result = events
+    chunks = [event.chunk for event in progress if event.chunk]
+    assert len(chunks) == 3
+    assert " ".join(chunks) == full_text("vid")
+    assert result.content[0].text == f"[Transcript sent as progress chunks: 250 segments, {sum(map(len, chunks))} characters]"
+
+
+class IdleBackend:
+    async def aclose(self):
+        pass
+
+
+def client_with(monkeypatch, connection, tool_max_chars):
+    monkeypatch.setenv("LLM_SCHEDULER", "0")
+    for name in ("MCP_STORE", "MCP_CACHE", "MCP_TRACE", "MCP_TRACE_FILE", "MCP_METRICS_FILE"):
+        monkeypatch.delenv(name, raising=False)
+    client = MCPClient(llm_backend=IdleBackend(), caches=(None, None))
+    client.pool = ServerPool(health_interval=None, manifest_path=None)
+    client.pool.connections[connection.name] = connection
+    client.tool_max_chars = tool_max_chars
+    progress = []
+    client.on_tool_progress = lambda name, event: progress.append(name)
+    return client, progress
+
+
+def call_transcript(client, connection):
+    async def scenario():
+        await connection.start()
+        try:
+            return await client._call_tool({"id": "c1", "function": {
+                "name": "bellek__get_transcript", "arguments": '{"video_id": "vid"}'}})
+        finally:
+            await connection.close()
+
+    return asyncio.run(scenario())
+
+
+def test_tool_output_is_truncated_at_tool_max_chars(monkeypatch):
+    connection = MemoryConnection(transcript_server(monkeypatch, count=1000))
+    client, progress = client_with(monkeypatch, connection, tool_max_chars=500)
+
+    content = call_transcript(client, connection)
+
+    assert content == full_text("vid", 1000)[:500] + "\n[Araç çıktısı 500 karakterde kesildi]"
+    # Sınıra ilk parçada ulaşıldı; kalan parçalar beklenmeden çağrı bırakılır
+    assert progress == ["bellek__get_transcript"] * 2
+    assert list(tool_calls(connection.wire).values()) == connection.cancelled_ids
+
+
+def test_chunks_replace_the_summary_result_under_the_limit(monkeypatch):
+    connection = MemoryConnection(transcript_server(monkeypatch))
+    client, _ = client_with(monkeypatch, connection, tool_max_chars=10 ** 6)
+
+    assert call_transcript(client, connection) == full_text("vid")
+    assert connection.cancelled_ids == []
+
+
+def test_unlimited_output_is_not_requested_in_chunks(monkeypatch):
+    connection = MemoryConnection(transcript_server(monkeypatch))
+    client, _ = client_with(monkeypatch, connection, tool_max_chars=0)
+
+    assert call_transcript(client, connection) == full_text("vid")
+    [request] = [m for m in connection.wire if isinstance(m, types.JSONRPCRequest) and m.method == "tools/call"]
+    assert "streamChunks" not in request.params["_meta"]
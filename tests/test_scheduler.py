@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from scheduler import AdaptiveLimiter, SchedulingBackend
+
+
+class APIError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.http_status = status
+
+
+class FakeBackend:
+    """
+    Model başına senaryo çalıştıran sahte LLM arka ucu.
+
+    `failures` ilk N çağrıda yükseltilecek hatalar, `delays` model başına
+    ilk yanıttan önceki bekleme, `gap` akış parçaları arasındaki beklemedir.
+    """
+
+    def __init__(self, failures=(), delays=None, gap=0.0, chunks=("a", "b", "c")):
+        self.failures = list(failures)
+        self.delays = delays or {}
+        self.gap = gap
+        self.chunks = chunks
+        self.calls = []
+        self.closed = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs["model"])
+        if self.failures:
+            raise self.failures.pop(0)
+        await asyncio.sleep(self.delays.get(kwargs["model"], 0))
+        return kwargs["model"]
+
+    async def stream(self, **kwargs):
+        model = kwargs["model"]
+        self.calls.append(model)
+        try:
+            if self.failures:
+                raise self.failures.pop(0)
+            await asyncio.sleep(self.delays.get(model, 0))
+            for chunk in self.chunks:
+                yield f"{model}:{chunk}"
+                await asyncio.sleep(self.gap)
+        finally:
+            self.closed.append(model)
+
+    async def aclose(self):
+        pass
+
+
+def make_scheduler(backend, **kwargs):
+    kwargs.setdefault("base_delay", 0)
+    return SchedulingBackend(backend, limiter=AdaptiveLimiter(initial=4), **kwargs)
+
+
+async def collect(scheduler, **kwargs):
+    return [chunk async for chunk in scheduler.stream(**kwargs)]
+
+
+def test_create_retries_retryable_errors():
+    backend = FakeBackend(failures=[APIError(503), APIError(429)])
+    scheduler = make_scheduler(backend)
+
+    assert asyncio.run(scheduler.create(model="m")) == "m"
+    assert backend.calls == ["m", "m", "m"]
+    assert scheduler.retries == 2
+    assert scheduler.limiter.inflight == 0
+
+
+def test_create_does_not_retry_client_errors():
+    backend = FakeBackend(failures=[APIError(400)])
+    scheduler = make_scheduler(backend)
+
+    with pytest.raises(APIError):
+        asyncio.run(scheduler.create(model="m"))
+    assert backend.calls == ["m"]
+    assert scheduler.retries == 0
+
+
+def test_create_gives_up_after_max_retries():
+    backend = FakeBackend(failures=[APIError(500)] * 5)
+    scheduler = make_scheduler(backend, max_retries=2)
+
+    with pytest.raises(APIError):
+        asyncio.run(scheduler.create(model="m"))
+    assert len(backend.calls) == 3
+
+
+def test_create_deadline():
+    backend = FakeBackend(delays={"m": 1.0})
+    scheduler = make_scheduler(backend, deadlines={"m": 0.05})
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scheduler.create(model="m"))
+    assert scheduler.limiter.inflight == 0
+
+
+def test_stream_retries_before_first_chunk():
+    backend = FakeBackend(failures=[APIError(503)])
+    scheduler = make_scheduler(backend)
+
+    assert asyncio.run(collect(scheduler, model="m")) == ["m:a", "m:b", "m:c"]
+    assert scheduler.retries == 1
+    assert scheduler.limiter.inflight == 0
+
+
+def test_stream_deadline_applies_after_first_chunk():
+    backend = FakeBackend(gap=1.0)
+    scheduler = make_scheduler(backend, deadlines={"m": 0.1})
+    received = []
+
+    async def run():
+        async for chunk in scheduler.stream(model="m"):
+            received.append(chunk)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert received == ["m:a"]
+    assert backend.closed == ["m"]
+    assert scheduler.limiter.inflight == 0
+
+
+def test_hedge_wins_and_loser_is_closed():
+    backend = FakeBackend(delays={"slow": 1.0, "fast": 0.0})
+    scheduler = make_scheduler(backend, hedge_models={"slow": "fast"}, hedge_min_samples=3)
+    for _ in range(3):
+        scheduler.latency.observe("slow", 0.02)
+
+    assert asyncio.run(collect(scheduler, model="slow")) == ["fast:a", "fast:b", "fast:c"]
+    assert backend.calls == ["slow", "fast"]
+    assert scheduler.hedges == 1
+    assert scheduler.hedge_wins == 1
+    assert sorted(backend.closed) == ["fast", "slow"]
+    assert scheduler.limiter.inflight == 0
+
+
+def test_no_hedge_without_enough_samples():
+    backend = FakeBackend(delays={"slow": 0.05})
+    scheduler = make_scheduler(backend, hedge_models={"slow": "fast"}, hedge_min_samples=3)
+    scheduler.latency.observe("slow", 0.001)
+
+    assert asyncio.run(collect(scheduler, model="slow")) == ["slow:a", "slow:b", "slow:c"]
+    assert scheduler.hedges == 0
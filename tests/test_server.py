@@ -0,0 +1,386 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from sse_starlette.sse import AppStatus
+from starlette.testclient import TestClient
+
+from d1 import MCPClient
+from server import ChatServer, FairScheduler, Overloaded, Session
+from store import ConversationStore
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def granted(tickets):
+    return [ticket.user for ticket in tickets if ticket.done() and not ticket.cancelled()]
+
+
+def test_grants_immediately_while_slots_are_free():
+    async def scenario():
+        scheduler = FairScheduler(max_active=2)
+        first, second, third = (scheduler.enqueue("a") for _ in range(3))
+        assert first.done() and second.done() and not third.done()
+        assert scheduler.stats() == {"active": 2, "queued": 1, "waiting_users": 1, "rejected": 0}
+
+    run(scenario())
+
+
+def test_round_robin_between_users():
+    async def scenario():
+        scheduler = FairScheduler(max_active=1, max_per_user=10)
+        running = scheduler.enqueue("heavy")
+        waiting = [scheduler.enqueue(user) for user in ["heavy", "heavy", "heavy", "light", "other"]]
+        order = []
+        current = running
+        for _ in waiting:
+            scheduler.release(current)
+            current = next(t for t in waiting if t.done() and t not in order)
+            order.append(current)
+        return [ticket.user for ticket in order]
+
+    # Ağır kullanıcının önceden kuyruğa giren turları diğerlerinin önüne geçmez
+    assert run(scenario()) == ["heavy", "light", "other", "heavy", "heavy"]
+
+
+def test_position_counts_one_turn_per_user_ahead():
+    async def scenario():
+        scheduler = FairScheduler(max_active=1, max_per_user=10)
+        running = scheduler.enqueue("x")
+        a1, a2 = scheduler.enqueue("a"), scheduler.enqueue("a")
+        b1 = scheduler.enqueue("b")
+        c1, c2, c3 = (scheduler.enqueue("c") for _ in range(3))
+        positions = {name: scheduler.position(ticket) for name, ticket in
+                     [("a1", a1), ("b1", b1), ("c1", c1), ("a2", a2), ("c2", c2), ("c3", c3)]}
+
+        # Tahmin edilen sıra gerçek dağıtım sırasıyla aynı olmalı
+        order = []
+        current = running
+        for _ in range(6):
+            scheduler.release(current)
+            current = next(t for t in (a1, a2, b1, c1, c2, c3) if t.done() and t not in order)
+            order.append(current)
+        return positions, [scheduler.position(t) for t in order], order, (a1, b1, c1, a2, c2, c3)
+
+    positions, after, order, expected = run(scenario())
+    assert positions == {"a1": 1, "b1": 2, "c1": 3, "a2": 4, "c2": 5, "c3": 6}
+    assert order == list(expected)
+    assert after == [0] * 6
+
+
+def test_per_user_limit_counts_running_and_waiting():
+    async def scenario():
+        scheduler = FairScheduler(max_active=1, max_per_user=2)
+        first = scheduler.enqueue("a")
+        scheduler.enqueue("a")
+        with pytest.raises(Overloaded) as error:
+            scheduler.enqueue("a")
+        assert error.value.status == 429
+        # Başka kullanıcı etkilenmez
+        scheduler.enqueue("b")
+        scheduler.release(first)
+        scheduler.enqueue("a")
+        return scheduler.stats()
+
+    assert run(scenario())["rejected"] == 1
+
+
+def test_queue_limit_rejects_with_503():
+    async def scenario():
+        scheduler = FairScheduler(max_active=1, max_queued=1, max_per_user=10)
+        scheduler.enqueue("a")
+        scheduler.enqueue("b")
+        with pytest.raises(Overloaded) as error:
+            scheduler.enqueue("c")
+        return error.value
+
+    error = run(scenario())
+    assert error.status == 503
+    assert error.retry_after
+
+
+def test_release_of_waiting_ticket_frees_its_place():
+    async def scenario():
+        scheduler = FairScheduler(max_active=1, max_per_user=10)
+        running = scheduler.enqueue("a")
+        b1, b2 = scheduler.enqueue("b"), scheduler.enqueue("b")
+        c1 = scheduler.enqueue("c")
+
+        # Bağlantısı kopan bekleyen tur bırakılır; kuyruktan çıkar ve iptal edilir
+        scheduler.release(b1)
+        assert b1.cancelled()
+        assert scheduler.stats()["queued"] == 2
+        assert scheduler.position(b2) == 1
+
+        scheduler.release(running)
+        assert granted([b1, b2, c1]) == ["b"]
+        assert b2.done()
+        scheduler.release(b2)
+        assert c1.done()
+        scheduler.release(c1)
+        return scheduler
+
+    scheduler = run(scenario())
+    assert scheduler.stats() == {"active": 0, "queued": 0, "waiting_users": 0, "rejected": 0}
+    assert not scheduler._per_user
+
+
+def test_cancelled_ticket_does_not_drop_the_rest_of_the_users_queue():
+    async def scenario():
+        scheduler = FairScheduler(max_active=1, max_per_user=10)
+        running = scheduler.enqueue("a")
+        b1, b2 = scheduler.enqueue("b"), scheduler.enqueue("b")
+        # İptal edilip henüz bırakılmamış tur dağıtımda atlanır
+        b1.cancel()
+        scheduler.release(running)
+        return b2.done(), scheduler.stats()
+
+    done, stats = run(scenario())
+    assert done
+    assert stats["active"] == 1 and stats["queued"] == 0
+
+
+class GatedBackend:
+    """Yanıtı `gate` açılana kadar bekleten sahte LLM; iptal edilen akışları sayar"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.cancelled = 0
+
+    async def create(self, **kwargs):
+        raise NotImplementedError
+
+    async def stream(self, **kwargs):
+        try:
+            while not self.gate.is_set():
+                await asyncio.sleep(0.005)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        yield {"choices": [{"delta": {"content": "yanıt"}}]}
+
+    async def aclose(self):
+        pass
+
+
+class FakePool:
+    connections = {"fake": object()}
+
+    async def get_specs(self):
+        return []
+
+    def is_read_only(self, name):
+        return False
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setenv("LLM_SCHEDULER", "0")
+    monkeypatch.setenv("MCP_PREFETCH", "0")
+    for name in ("MCP_STORE", "MCP_CACHE", "MCP_TRACE", "MCP_TRACE_FILE", "MCP_METRICS_FILE"):
+        monkeypatch.delenv(name, raising=False)
+    # sse-starlette kapanma olayını ilk döngüye bağlar; her test kendi döngüsünde çalışır
+    monkeypatch.setattr(AppStatus, "should_exit_event", None)
+    return GatedBackend()
+
+
+def make_server(backend, store=None, **kwargs):
+    client = MCPClient(llm_backend=backend, caches=(None, None), store=store)
+    client.pool = FakePool()
+    return ChatServer(client, **kwargs)
+
+
+def events(response):
+    """SSE gövdesini (olay, veri) çiftlerine ayırır"""
+    parsed, event = [], None
+    for line in response.text.splitlines():
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            parsed.append((event, json.loads(line[5:])))
+    return parsed
+
+
+def new_session(http, user="a", **body):
+    response = http.post("/sessions", json=body, headers={"X-User": user})
+    assert response.status_code == 201
+    return response.json()["session"]
+
+
+def send(http, session_id, user="a", message="merhaba"):
+    return http.post(f"/sessions/{session_id}/messages", json={"message": message}, headers={"X-User": user})
+
+
+def in_background(call):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("response", call()))
+    thread.start()
+    return thread, result
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "koşul zamanında sağlanmadı"
+        time.sleep(0.005)
+
+
+def test_turn_streams_tokens_and_done(backend):
+    server = make_server(backend)
+    with TestClient(server.create_app()) as http:
+        session_id = new_session(http)
+        response = send(http, session_id)
+        described = http.get(f"/sessions/{session_id}").json()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [event for event, _ in events(response)] == ["token", "done"]
+    assert events(response)[0][1] == {"text": "yanıt"}
+    assert described["messages"] == 3 and not described["busy"]
+
+
+def test_overload_is_rejected_with_retry_after(backend):
+    server = make_server(backend, scheduler=FairScheduler(max_active=1, max_queued=1, max_per_user=1))
+    backend.gate.clear()
+    with TestClient(server.create_app()) as http:
+        running, queued, other, late = (new_session(http, user) for user in "abac")
+        first, first_result = in_background(lambda: send(http, running, "a"))
+        wait_until(lambda: server.scheduler.active == 1)
+        second, second_result = in_background(lambda: send(http, queued, "b"))
+        wait_until(lambda: server.scheduler.queued == 1)
+
+        per_user = send(http, other, "a")
+        full = send(http, late, "c")
+        backend.gate.set()
+        first.join(5)
+        second.join(5)
+        stats = http.get("/health").json()
+
+    assert per_user.status_code == 429 and per_user.headers["retry-after"] == "1"
+    assert full.status_code == 503 and full.headers["retry-after"] == "2"
+    assert [event for event, _ in events(first_result["response"])] == ["token", "done"]
+    assert [event for event, _ in events(second_result["response"])] == ["queued", "token", "done"]
+    assert events(second_result["response"])[0][1] == {"position": 1}
+    assert (stats["active"], stats["queued"], stats["rejected"]) == (0, 0, 2)
+
+
+def test_second_turn_in_a_busy_session_is_rejected(backend):
+    server = make_server(backend)
+    backend.gate.clear()
+    with TestClient(server.create_app()) as http:
+        session_id = new_session(http)
+        thread, result = in_background(lambda: send(http, session_id))
+        wait_until(lambda: server.sessions[session_id].busy)
+        conflict = send(http, session_id)
+        backend.gate.set()
+        thread.join(5)
+        after = send(http, session_id)
+
+    assert conflict.status_code == 409
+    assert result["response"].status_code == 200
+    assert [event for event, _ in events(after)] == ["token", "done"]
+
+
+def test_conversation_open_in_another_session_cannot_be_resumed(backend):
+    store = ConversationStore(":memory:")
+    server = make_server(backend, store=store)
+    with TestClient(server.create_app()) as http:
+        session_id = new_session(http)
+        conversation = events(send(http, session_id))[-1][1]["conversation"]
+
+        conflict = http.post("/sessions", json={"resume": conversation})
+        missing = http.post("/sessions", json={"resume": "yok"})
+        assert http.delete(f"/sessions/{session_id}").status_code == 204
+        resumed = http.post("/sessions", json={"resume": conversation})
+
+    assert conflict.status_code == 409
+    assert missing.status_code == 404
+    assert resumed.status_code == 201
+    assert resumed.json()["conversation"] == conversation and resumed.json()["messages"] == 3
+    store.close()
+
+
+class StallingBackend(GatedBackend):
+    """İlk parçadan sonra ikincisini uzun süre bekleten sahte LLM"""
+
+    async def stream(self, **kwargs):
+        yield {"choices": [{"delta": {"content": "ilk"}}]}
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        yield {"choices": [{"delta": {"content": "son"}}]}
+
+
+def test_turn_is_cancelled_when_the_client_stops_reading(backend):
+    backend = StallingBackend()
+    server = make_server(backend, send_timeout=0.05)
+    app = server.create_app()
+
+    async def stalled_request(session_id):
+        """Yanıt gövdesini okumayan ASGI istemcisi; ilk olayın yazılması hiç bitmez"""
+        body = json.dumps({"message": "merhaba"}).encode()
+        scope = {"type": "http", "method": "POST", "path": f"/sessions/{session_id}/messages",
+                 "headers": [(b"content-type", b"application/json")], "query_string": b"",
+                 "client": ("127.0.0.1", 1), "server": ("test", 80), "scheme": "http",
+                 "http_version": "1.1", "root_path": "", "asgi": {"version": "3.0"}}
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+        chunks = []
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                chunks.append(message["body"])
+                await asyncio.sleep(3600)
+
+        with pytest.raises(Exception):
+            await app(scope, receive, send)
+        return chunks
+
+    async def scenario():
+        session = server.sessions["s"] = Session("s", "a", server.client.new_conversation())
+        chunks = await asyncio.wait_for(stalled_request("s"), 5)
+        return chunks, session.busy, server.scheduler.stats()
+
+    chunks, busy, stats = asyncio.run(scenario())
+
+    # İlk olay send_timeout içinde okunmadı; bağlantı kesildi ve süren tur iptal edildi
+    assert b"event: token" in chunks[0]
+    assert backend.cancelled == 1
+    assert not busy
+    assert stats["active"] == 0
+
+
+def test_idle_sessions_are_reaped_and_evicted(backend):
+    server = make_server(backend, session_ttl=0.05, max_sessions=2)
+    backend.gate.clear()
+    with TestClient(server.create_app()) as http:
+        busy = new_session(http)
+        thread, _ = in_background(lambda: send(http, busy))
+        wait_until(lambda: server.sessions[busy].busy)
+        idle = new_session(http)
+        # Sınırda en uzun süredir boşta duran oturum atılır; çalışan tur atılmaz
+        newest = new_session(http)
+        evicted = http.get(f"/sessions/{idle}").status_code
+        time.sleep(0.2)
+        # Süresi dolan boştaki oturum toplanır, tur süren oturum kalır
+        reaped = http.get(f"/sessions/{newest}").status_code
+        kept = http.get(f"/sessions/{busy}").status_code
+        backend.gate.set()
+        thread.join(5)
+
+    assert evicted == 404
+    assert reaped == 404
+    assert kept == 200
@@ -0,0 +1,174 @@
+import pytest
+
+from context import ContextManager
+from store import ConversationStore
+
+
+def chat_turn(n, chars=400):
+    return [
+        {"role": "user", "content": f"soru {n} " + "y" * chars},
+        {"role": "assistant", "content": f"yanıt {n} " + "z" * chars}
+    ]
+
+
+@pytest.fixture
+def store():
+    store = ConversationStore(":memory:", inline_limit=256)
+    yield store
+    store.close()
+
+
+def resume(store, conversation_id, **kwargs):
+    """MCPClient._restore_context gibi: günlük, sistem mesajı yazıldıktan sonra bağlanır"""
+    log, messages, ids, summary_lines, evicted_turns = store.load(conversation_id)
+    context = ContextManager("sistem", **kwargs)
+    context.journal = log
+    context.restore(messages, ids, summary_lines, evicted_turns)
+    return context
+
+
+def test_empty_conversation_is_not_stored(store):
+    context = ContextManager("sistem", journal=store.create())
+
+    assert store.conversations() == []
+    context.append({"role": "user", "content": "merhaba"})
+    assert [c["id"] for c in store.conversations()] == [context.journal.id]
+
+
+def test_resume_round_trip(store):
+    context = ContextManager("sistem", journal=store.create())
+    context.extend(chat_turn(0) + chat_turn(1))
+
+    resumed = resume(store, context.journal.id)
+
+    assert resumed.messages == context.messages
+    # Ertelenen sistem mesajının kimliği yalnızca yüklenince bilinir
+    assert resumed.entries()[1:] == context.entries()[1:]
+    resumed.extend(chat_turn(2))
+    assert resume(store, context.journal.id).messages == context.messages + chat_turn(2)
+
+
+def test_large_contents_are_stored_once(store):
+    context = ContextManager("sistem", journal=store.create())
+    output = "transkript " * 100
+    context.append({"role": "user", "content": "soru"})
+    context.append({"role": "tool", "tool_call_id": "a", "content": output})
+    context.append({"role": "tool", "tool_call_id": "b", "content": output})
+
+    assert store._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+    assert [m["content"] for m in resume(store, context.journal.id).messages[2:]] == [output, output]
+
+
+def test_checkpoint_round_trip(store):
+    context = ContextManager("sistem", budget=500, journal=store.create())
+    for n in range(5):
+        context.extend(chat_turn(n))
+    context.window()
+    assert context.evicted_turns > 0
+
+    resumed = resume(store, context.journal.id, budget=500)
+
+    assert resumed.messages == context.messages
+    assert resumed.evicted_turns == context.evicted_turns
+    assert resumed._summary_lines == context._summary_lines
+    # Özet mesajı kontrol noktasına gömülüdür, diğerleri kayıt kimliklerini korur
+    assert resumed.entries() == context.entries()
+    assert resumed._has_summary()
+
+
+def test_messages_after_checkpoint_are_resumed(store):
+    context = ContextManager("sistem", budget=500, journal=store.create())
+    for n in range(5):
+        context.extend(chat_turn(n))
+    context.window()
+    context.extend(chat_turn(5))
+
+    resumed = resume(store, context.journal.id, budget=500)
+
+    assert resumed.messages == context.messages
+    assert resumed.messages[-2:] == chat_turn(5)
+
+
+def test_fork_at_record_shares_prefix(store):
+    context = ContextManager("sistem", journal=store.create())
+    context.extend(chat_turn(0))
+    at = context.last_id
+    context.extend(chat_turn(1))
+
+    fork = store.fork(context.journal.id, at=at)
+    forked = resume(store, fork.id)
+
+    assert forked.messages == context.messages[:3]
+    forked.extend(chat_turn(9))
+    # Çatal kaynak sohbeti değiştirmez
+    assert resume(store, context.journal.id).messages == context.messages
+    assert resume(store, fork.id).messages == context.messages[:3] + chat_turn(9)
+    assert {c["id"]: c["forked_from"] for c in store.conversations()}[fork.id] == context.journal.id
+
+
+def test_fork_without_record_continues_from_head(store):
+    context = ContextManager("sistem", journal=store.create())
+    context.extend(chat_turn(0))
+
+    assert resume(store, store.fork(context.journal.id).id).messages == context.messages
+
+
+def test_fork_of_fork_accepts_ancestor_records(store):
+    context = ContextManager("sistem", journal=store.create())
+    context.extend(chat_turn(0))
+    at = context.last_id
+    context.extend(chat_turn(1))
+    fork = store.fork(context.journal.id)
+
+    assert resume(store, store.fork(fork.id, at=at).id).messages == context.messages[:3]
+
+
+def test_fork_rejects_records_of_other_conversations(store):
+    first = ContextManager("sistem", journal=store.create())
+    first.extend(chat_turn(0))
+    second = ContextManager("sistem", journal=store.create())
+    second.extend(chat_turn(1))
+
+    with pytest.raises(ValueError):
+        store.fork(first.journal.id, at=second.last_id)
+    with pytest.raises(ValueError):
+        store.fork(first.journal.id, at=10 ** 6)
+
+
+def test_unknown_conversation(store):
+    with pytest.raises(ValueError):
+        store.load("yok")
+    with pytest.raises(ValueError):
+        store.fork("yok")
+
+
+def test_messages_between_follows_the_conversation_chain(store):
+    context = ContextManager("sistem", budget=500, journal=store.create())
+    other = ContextManager("sistem", journal=store.create())
+    for n in range(4):
+        context.extend(chat_turn(n))
+    context.append({"role": "user", "content": "soru"})
+    first = context.last_id
+    context.append({"role": "assistant", "content": "Bakıyorum",
+                    "tool_calls": [{"id": "c1", "type": "function", "function": {"name": "t", "arguments": "{}"}}]})
+    # Başka sohbetin kaydı ve bir kontrol noktası aralığa girer ama döndürülmez
+    other.extend(chat_turn(9))
+    context.append({"role": "tool", "tool_call_id": "c1", "content": "sonuç"})
+    context.window()
+    context.append({"role": "assistant", "content": "Bitti"})
+
+    messages = store.messages_between(first, context.last_id)
+
+    assert [m["role"] for m in messages] == ["user", "assistant", "tool", "assistant"]
+    assert [m["content"] for m in messages if m["role"] == "assistant"] == ["Bakıyorum", "Bitti"]
+    assert store.messages_between(first, first) == [{"role": "user", "content": "soru"}]
+
+
+def test_messages_between_rejects_foreign_ranges(store):
+    first = ContextManager("sistem", journal=store.create())
+    first.extend(chat_turn(0))
+    second = ContextManager("sistem", journal=store.create())
+    second.extend(chat_turn(1))
+
+    with pytest.raises(ValueError):
+        store.messages_between(first.last_id, second.last_id)
@@ -0,0 +1,199 @@
+import asyncio
+import json
+
+from mcp import types
+
+from d1 import MCPClient
+
+VIDEO_ID = "dQw4w9WgXcQ"
+URL = f"https://www.youtube.com/watch?v={VIDEO_ID}"
+
+
+def text(content):
+    return {"choices": [{"delta": {"content": content}}]}
+
+
+def tool_call(index, call_id, name, arguments):
+    return {"choices": [{"delta": {"tool_calls": [
+        {"index": index, "id": call_id, "function": {"name": name, "arguments": arguments}}]}}]}
+
+
+class FakeBackend:
+    """Her istekte sıradaki parça listesini akıtan sahte LLM; liste biterse düz yanıt verir"""
+
+    def __init__(self, script=(), fail_after=None):
+        self.script = list(script)
+        self.requests = []
+        self.fail_after = fail_after
+        self.streaming = False
+
+    async def create(self, **kwargs):
+        raise NotImplementedError
+
+    async def stream(self, **kwargs):
+        self.requests.append(kwargs)
+        chunks = self.script.pop(0) if self.script else [text("Bitti")]
+        self.streaming = True
+        try:
+            for n, chunk in enumerate(chunks):
+                if n == self.fail_after:
+                    raise ConnectionError("akış koptu")
+                await asyncio.sleep(0.001)
+                yield chunk
+        finally:
+            self.streaming = False
+
+    async def aclose(self):
+        pass
+
+
+class FakePool:
+    """Araç çağrılarını kaydeden sahte sunucu havuzu"""
+
+    def __init__(self, latency=0.0, read_only=()):
+        self.connections = {"fake": object()}
+        self.latency = latency
+        self.read_only = set(read_only)
+        self.calls = []
+        self.cancelled = []
+
+    async def get_specs(self):
+        return [{"type": "function", "function": {"name": name, "description": "", "parameters": {}}}
+                for name in ("fake__get_transcript", "fake__search", "fake__delete")]
+
+    def is_read_only(self, name):
+        return name in self.read_only
+
+    async def stream_tool(self, name, arguments, timeout=None, chunks=False):
+        self.calls.append((name, arguments))
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        yield types.CallToolResult(content=[types.TextContent(type="text", text=f"{name} sonucu")])
+
+
+def make_client(monkeypatch, backend, pool, prefetch=True, **budgets):
+    monkeypatch.setenv("LLM_SCHEDULER", "0")
+    monkeypatch.setenv("MCP_PREFETCH", "1" if prefetch else "0")
+    for name in ("MCP_STORE", "MCP_CACHE", "MCP_TRACE", "MCP_TRACE_FILE", "MCP_METRICS_FILE", "MCP_TOOL_MAX_CHARS"):
+        monkeypatch.delenv(name, raising=False)
+    client = MCPClient(llm_backend=backend, caches=(None, None))
+    client.pool = pool
+    for name, value in budgets.items():
+        setattr(client, name, value)
+    return client
+
+
+def search_round(n):
+    return [tool_call(0, f"c{n}", "fake__search", json.dumps({"q": str(n)}))]
+
+
+def test_stops_at_max_tool_rounds(monkeypatch):
+    backend = FakeBackend([search_round(n) for n in range(2)])
+    client = make_client(monkeypatch, backend, FakePool(), max_tool_rounds=2)
+
+    response = asyncio.run(client.process_query("ara"))
+
+    assert len(backend.requests) == 3
+    assert ["tools" in request for request in backend.requests] == [True, True, False]
+    assert backend.requests[-1]["model"] == client.followup_model
+    assert response == "Bitti"
+    assert len(client.pool.calls) == 2
+    assert client.messages[-1] == {"role": "assistant", "content": "Bitti"}
+
+
+def test_stops_when_token_budget_is_spent(monkeypatch):
+    backend = FakeBackend([search_round(n) for n in range(10)])
+    client = make_client(monkeypatch, backend, FakePool(), turn_token_budget=1)
+
+    asyncio.run(client.process_query("ara"))
+
+    assert ["tools" in request for request in backend.requests] == [True, False]
+    assert len(client.pool.calls) == 1
+
+
+def test_stops_when_time_budget_is_spent(monkeypatch):
+    backend = FakeBackend([search_round(n) for n in range(10)])
+    client = make_client(monkeypatch, backend, FakePool(latency=0.05), turn_time_budget=0.02)
+
+    asyncio.run(client.process_query("ara"))
+
+    assert ["tools" in request for request in backend.requests] == [True, False]
+
+
+def test_predicted_call_is_reused(monkeypatch):
+    backend = FakeBackend([[tool_call(0, "c1", "fake__get_transcript", json.dumps({"video_id": URL}))]])
+    pool = FakePool(latency=0.01)
+    client = make_client(monkeypatch, backend, pool)
+
+    asyncio.run(client.process_query(f"Bu videoyu özetle {URL}"))
+
+    # Kullanıcı mesajından başlatılan çağrı, model tam bağlantıyla istese de kullanılır
+    assert pool.calls == [("fake__get_transcript", {"video_id": VIDEO_ID})]
+    assert client.messages[-2] == {"role": "tool", "tool_call_id": "c1", "content": "fake__get_transcript sonucu"}
+
+
+def test_streamed_read_only_call_is_started_early_and_reused(monkeypatch):
+    backend = FakeBackend([[tool_call(0, "c1", "fake__search", '{"q": "x"}')] + [text("")] * 20])
+    pool = FakePool(latency=0.01, read_only={"fake__search"})
+    client = make_client(monkeypatch, backend, pool)
+    during_stream = []
+    stream_tool = pool.stream_tool
+
+    def record(name, arguments, **kwargs):
+        during_stream.append(backend.streaming)
+        return stream_tool(name, arguments, **kwargs)
+
+    pool.stream_tool = record
+    asyncio.run(client.process_query("ara"))
+
+    assert pool.calls == [("fake__search", {"q": "x"})]
+    assert during_stream == [True]
+
+
+def test_side_effecting_call_is_not_started_from_a_failed_stream(monkeypatch):
+    backend = FakeBackend([[tool_call(0, "c1", "fake__delete", '{"id": 1}'), text("")]], fail_after=1)
+    pool = FakePool()
+    client = make_client(monkeypatch, backend, pool)
+
+    response = asyncio.run(client.process_query("sil"))
+
+    assert response.startswith("[Hata:")
+    assert pool.calls == []
+
+
+def test_unused_prediction_is_cancelled(monkeypatch):
+    backend = FakeBackend()
+    pool = FakePool(latency=5)
+    client = make_client(monkeypatch, backend, pool)
+
+    async def run():
+        response = await client.process_query(f"Bu video nasıl? {URL}")
+        await asyncio.sleep(0.01)
+        return response
+
+    assert asyncio.run(run()) == "Bitti"
+    assert pool.calls == [("fake__get_transcript", {"video_id": VIDEO_ID})]
+    assert pool.cancelled == ["fake__get_transcript"]
+
+
+def test_prefetch_disabled(monkeypatch):
+    backend = FakeBackend()
+    pool = FakePool()
+    client = make_client(monkeypatch, backend, pool, prefetch=False)
+
+    asyncio.run(client.process_query(f"Bu video nasıl? {URL}"))
+
+    assert pool.calls == []
+
+
+def test_zero_rounds_never_offers_tools(monkeypatch):
+    backend = FakeBackend()
+    client = make_client(monkeypatch, backend, FakePool(), max_tool_rounds=0, prefetch=False)
+
+    asyncio.run(client.process_query("ara"))
+
+    assert ["tools" in request for request in backend.requests] == [False]
+    assert backend.requests[0]["model"] == client.primary_model
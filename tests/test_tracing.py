@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+import tracing
+from tracing import NOOP_SPAN, JsonlSink, MetricsSink, RingBufferSink, Tracer, create_tracer
+
+
+def run_turn(tracer, fail=False):
+    with tracer.span("turn", query_bytes=5) as turn:
+        with tracer.span("llm", parent=turn, model="m") as llm:
+            llm.set(prompt_tokens=100, completion_tokens=20)
+        with tracer.span("tool", parent=turn, tool="yt__ara") as tool:
+            tool.set(result_bytes=2048)
+        if fail:
+            raise ValueError("bozuldu")
+    return turn
+
+
+def test_root_span_is_emitted_with_its_tree():
+    ring = RingBufferSink()
+    tracer = Tracer([ring])
+
+    turn = run_turn(tracer)
+
+    assert list(ring.spans) == [turn]
+    assert [span.name for span in turn.walk()] == ["turn", "llm", "tool"]
+    assert all(span.duration is not None and span.duration >= 0 for span in turn.walk())
+    data = turn.to_dict()
+    assert data["attrs"] == {"query_bytes": 5}
+    assert [child["name"] for child in data["children"]] == ["llm", "tool"]
+    assert data["children"][0]["attrs"] == {"model": "m", "prompt_tokens": 100, "completion_tokens": 20}
+    assert "error" not in data
+    assert ring.summary().startswith(f"Son tur {turn.duration:.2f} sn (llm ")
+    assert "yt__ara" in ring.summary()
+
+
+def test_exception_is_recorded_on_the_span():
+    ring = RingBufferSink()
+
+    with pytest.raises(ValueError):
+        run_turn(Tracer([ring]), fail=True)
+
+    assert ring.last().error == "ValueError: bozuldu"
+    assert ring.summary().endswith("hata: ValueError: bozuldu")
+
+
+def test_disabled_tracer_returns_the_noop_span():
+    ring = RingBufferSink()
+    disabled = Tracer([ring], enabled=False)
+
+    assert run_turn(disabled) is NOOP_SPAN
+    assert Tracer().span("turn") is NOOP_SPAN
+    # Kaydedilmeyen bir üst aşamanın alt aşamaları da kaydedilmez
+    assert Tracer([ring]).span("llm", parent=NOOP_SPAN) is NOOP_SPAN
+    assert not NOOP_SPAN.recording and NOOP_SPAN.children == ()
+    assert list(ring.spans) == []
+    assert not create_tracer().enabled
+    assert ring.summary() is None
+
+
+def test_failing_sink_does_not_break_the_turn(capsys):
+    class Broken:
+        def emit(self, span):
+            raise OSError("disk dolu")
+
+    ring = RingBufferSink()
+    run_turn(Tracer([Broken(), ring]))
+
+    assert len(ring.spans) == 1
+    assert "disk dolu" in capsys.readouterr().out
+
+
+def test_jsonl_sink_writes_one_line_per_turn(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = create_tracer(trace_file=str(path))
+
+    turns = [run_turn(tracer) for _ in range(2)]
+    tracer.close()
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert lines == [turn.to_dict() for turn in turns]
+
+
+def test_metrics_are_aggregated():
+    metrics = MetricsSink(buckets=(0.1, 1))
+    tracer = Tracer([metrics])
+    run_turn(tracer)
+    with pytest.raises(ValueError):
+        run_turn(tracer, fail=True)
+
+    text = metrics.render()
+
+    assert 'mcp_span_duration_seconds_count{span="turn"} 2' in text
+    assert 'mcp_span_duration_seconds_bucket{span="llm",le="+Inf"} 2' in text
+    assert 'mcp_span_duration_seconds_bucket{span="tool",le="1"} 2' in text
+    assert 'mcp_span_errors_total{span="turn"} 1' in text
+    assert 'mcp_prompt_tokens_total{span="llm"} 200' in text
+    assert 'mcp_result_bytes_total{span="tool"} 4096' in text
+    assert 'mcp_query_bytes_total{span="turn"} 10' in text
+    assert "model" not in text
+
+
+def test_metrics_file_is_rewritten_while_running(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(tracing.time, "monotonic", lambda: now[0])
+    path = tmp_path / "metrics.prom"
+    metrics = MetricsSink(str(path), interval=10)
+    tracer = Tracer([metrics])
+
+    def turns():
+        text = path.read_text(encoding="utf-8")
+        return int(text.split('mcp_span_duration_seconds_count{span="turn"} ')[1].split()[0])
+
+    run_turn(tracer)
+    assert turns() == 1
+    # Aralık dolmadan gelen turlar dosyayı yeniden yazmaz
+    now[0] += 5
+    run_turn(tracer)
+    assert turns() == 1
+    now[0] += 5
+    run_turn(tracer)
+    assert turns() == 3
+    run_turn(tracer)
+    tracer.close()
+    assert turns() == 4
+    assert not (tmp_path / "metrics.prom.tmp").exists()
+
+
+def test_zero_interval_writes_every_turn(tmp_path):
+    path = tmp_path / "metrics.prom"
+    tracer = create_tracer(metrics_file=str(path), metrics_interval=0)
+
+    for expected in (1, 2):
+        run_turn(tracer)
+        assert f'mcp_span_duration_seconds_count{{span="turn"}} {expected}' in path.read_text(encoding="utf-8")
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import transcript_cache
+from transcript_cache import TranscriptCache, TranscriptFetcher, TranscriptUnavailable
+
+
+class Missing(Exception):
+    pass
+
+
+class FakeProvider:
+    """Çağrıları sayan sahte transkript kaynağı; `gate` verilirse açılana kadar bekler"""
+
+    def __init__(self, missing=(), gate=None):
+        self.calls = []
+        self.missing = set(missing)
+        self.gate = gate
+
+    def __call__(self, video_id, languages):
+        self.calls.append(video_id)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if video_id in self.missing:
+            raise Missing(f"{video_id} için transkript yok")
+        return [{"text": f"{video_id} {i}", "start": float(i), "duration": 1.0, "extra": i} for i in range(3)]
+
+
+def make_fetcher(provider, **cache_kwargs):
+    return TranscriptFetcher(TranscriptCache(":memory:", **cache_kwargs), provider, permanent_errors=(Missing,))
+
+
+def test_miss_then_hit():
+    provider = FakeProvider()
+    fetcher = make_fetcher(provider)
+
+    first = fetcher.fetch("abc", ["en"])
+    second = fetcher.fetch("abc", ["en"])
+
+    assert first == second == [{"text": f"abc {i}", "start": float(i), "duration": 1.0} for i in range(3)]
+    assert provider.calls == ["abc"]
+    assert fetcher.cache.stats()["hits"] == 1
+    assert fetcher.cache.stats()["misses"] == 1
+
+
+def test_languages_are_part_of_the_key():
+    provider = FakeProvider()
+    fetcher = make_fetcher(provider)
+
+    fetcher.fetch("abc", ["en"])
+    fetcher.fetch("abc", ["de"])
+
+    assert provider.calls == ["abc", "abc"]
+
+
+def test_negative_result_is_cached_until_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(transcript_cache.time, "time", lambda: now[0])
+    provider = FakeProvider(missing={"gone"})
+    fetcher = make_fetcher(provider, negative_ttl=60)
+
+    for _ in range(2):
+        with pytest.raises(TranscriptUnavailable):
+            fetcher.fetch("gone", ["en"])
+    assert provider.calls == ["gone"]
+
+    now[0] += 61
+    provider.missing.clear()
+    assert fetcher.fetch("gone", ["en"])[0]["text"] == "gone 0"
+    assert provider.calls == ["gone", "gone"]
+
+
+def test_eviction_keeps_total_size_bounded():
+    fetcher = make_fetcher(FakeProvider(), max_bytes=300)
+
+    for i in range(10):
+        fetcher.fetch(f"video{i}", ["en"])
+
+    stats = fetcher.cache.stats()
+    assert stats["bytes"] <= 300
+    assert stats["entries"] < 10
+
+
+def test_concurrent_requests_are_coalesced():
+    gate = threading.Event()
+    provider = FakeProvider(gate=gate)
+    fetcher = make_fetcher(provider)
+
+    async def run():
+        tasks = [asyncio.ensure_future(fetcher.fetch_async("same", ["en"])) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(run())
+
+    assert provider.calls == ["same"]
+    assert fetcher.coalesced == 4
+    assert all(result == results[0] for result in results)
+
+
+def test_cancelled_fetch_is_not_joined():
+    gate = threading.Event()
+    provider = FakeProvider(gate=gate)
+    fetcher = TranscriptFetcher(TranscriptCache(":memory:"), provider, max_workers=1)
+
+    async def run():
+        # Tek işçiyi meşgul et; sonraki getirme henüz başlamadan iptal edilsin
+        busy = asyncio.ensure_future(fetcher.fetch_async("busy", ["en"]))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(fetcher.fetch_async("late", ["en"]))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        joined = asyncio.ensure_future(fetcher.fetch_async("late", ["en"]))
+        gate.set()
+        return await joined, await busy
+
+    late, _ = asyncio.run(run())
+
+    assert late[0]["text"] == "late 0"
+
+
+def test_batch_timeout_starts_when_the_fetch_starts():
+    provider = FakeProvider(missing={"v2"})
+    delayed = provider.__call__
+
+    def slow(video_id, languages):
+        time.sleep(0.1)
+        return delayed(video_id, languages)
+
+    fetcher = TranscriptFetcher(TranscriptCache(":memory:"), slow, permanent_errors=(Missing,), max_workers=1)
+
+    # Tek işçiyle ardışık çalışan getirmelerin toplamı süreyi aşar, tek tek aşmaz
+    results = asyncio.run(fetcher.fetch_many_async(["v0", "v1", "v0", "v2", "v3"], ["en"], timeout=0.25))
+
+    assert list(results) == ["v0", "v1", "v2", "v3"]
+    assert [results[v][0]["text"] for v in ("v0", "v1", "v3")] == ["v0 0", "v1 0", "v3 0"]
+    assert isinstance(results["v2"], TranscriptUnavailable)
+    assert provider.calls == ["v0", "v1", "v2", "v3"]
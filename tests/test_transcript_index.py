@@ -0,0 +1,90 @@
+from transcript_index import IndexRegistry, TranscriptIndex, format_timestamp
+
+LINES = [
+    "intro to the talk", "welcome everyone", "today we cover python",
+    "python generators", "generators yield values", "lazy evaluation",
+    "asyncio event loop", "the loop runs tasks", "python tasks",
+    "questions", "thanks", "bye",
+]
+
+
+def segments(lines=LINES, step=10.0):
+    return [{"text": text, "start": i * step, "duration": step} for i, text in enumerate(lines)]
+
+
+def indices(results):
+    return [i for i, _ in results]
+
+
+def test_segments_are_grouped_into_passages():
+    index = TranscriptIndex(segments(), passage_seconds=30)
+
+    assert [(p["start"], p["end"]) for p in index.passages] == [(0, 30), (30, 60), (60, 90), (90, 120)]
+    assert index.passages[1]["text"] == "python generators generators yield values lazy evaluation"
+    assert index.duration == 120
+
+
+def test_pages_are_bounded():
+    index = TranscriptIndex(segments(), passage_seconds=30)
+
+    assert indices(index.page(1, 3)) == [0, 1, 2]
+    assert indices(index.page(2, 3)) == [3]
+    assert index.page(3, 3) == []
+    assert index.page(0, 3) == []
+    assert index.page_count(3) == 2
+    assert index.page_count(4) == 1
+
+
+def test_empty_transcript():
+    index = TranscriptIndex([])
+
+    assert index.duration == 0
+    assert index.page_count(10) == 1
+    assert index.page(1, 10) == []
+    assert index.search("python") == []
+
+
+def test_time_range_returns_overlapping_passages():
+    index = TranscriptIndex(segments(), passage_seconds=30)
+
+    # Sınıra değen pasajlar da aralığa girer
+    assert indices(index.time_range(30, 30)) == [0, 1]
+    assert indices(index.time_range(65, 70)) == [2]
+    assert indices(index.time_range(50, 95)) == [1, 2, 3]
+    assert index.time_range(200, 300) == []
+
+
+def test_search_ranks_by_bm25():
+    index = TranscriptIndex(segments(), passage_seconds=30)
+
+    results = index.search("python tasks")
+
+    # İki terimi de içeren pasaj önde; tek eşleşmelerde kısa pasaj öne geçer
+    assert [i for _, i, _ in results] == [2, 1, 0]
+    assert [score for score, _, _ in results] == sorted((score for score, _, _ in results), reverse=True)
+    assert [i for _, i, _ in index.search("Generators")] == [1]
+    assert len(index.search("python", top_k=2)) == 2
+    assert index.search("bilinmeyen") == []
+
+
+def test_search_prefers_shorter_passages_for_equal_matches():
+    index = TranscriptIndex(segments(["python " + "filler " * 20, "python filler"], step=60.0), passage_seconds=30)
+
+    assert [i for _, i, _ in index.search("python")] == [1, 0]
+
+
+def test_registry_evicts_least_recently_used():
+    registry = IndexRegistry(max_videos=2)
+    a, b, c = (TranscriptIndex(segments()) for _ in range(3))
+    registry.put("a", a)
+    registry.put("b", b)
+    registry.get("a")
+    registry.put("c", c)
+
+    assert registry.get("b") is None
+    assert registry.get("a") is a and registry.get("c") is c
+
+
+def test_format_timestamp():
+    assert format_timestamp(75.9) == "1:15"
+    assert format_timestamp(3725) == "1:02:05"
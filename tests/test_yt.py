@@ -0,0 +1,33 @@
+import asyncio
+
+import yt
+from transcript_cache import TranscriptCache, TranscriptFetcher
+from transcript_index import IndexRegistry
+
+
+def test_concurrent_index_builds_are_coalesced(monkeypatch):
+    fetches = []
+
+    async def fetch_segments(video_id):
+        fetches.append(video_id)
+        await asyncio.sleep(0.01)
+        return [{"text": f"{video_id} {i}", "start": i * 10.0, "duration": 10.0} for i in range(10)]
+
+    monkeypatch.setattr(yt, "fetch_segments", fetch_segments)
+    monkeypatch.setattr(yt, "indexes", IndexRegistry())
+    monkeypatch.setattr(yt, "_fetcher", TranscriptFetcher(TranscriptCache(":memory:"), None))
+
+    async def scenario():
+        first = [asyncio.ensure_future(yt.get_index("a")) for _ in range(5)]
+        await asyncio.sleep(0)
+        # Bekleyenlerden biri iptal edilse de kurulum diğerleri için sürer
+        first[0].cancel()
+        indexes = await asyncio.gather(*first[1:], yt.get_index("b"))
+        return indexes, await yt.get_index("a"), dict(yt._index_builds)
+
+    indexes, cached, builds = asyncio.run(scenario())
+
+    assert sorted(fetches) == ["a", "b"]
+    assert all(index is indexes[0] for index in indexes[:4])
+    assert cached is indexes[0]
+    assert builds == {}
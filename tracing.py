@@ -0,0 +1,289 @@
+import json
+import os
+import threading
+import time
+from collections import deque, defaultdict
+from typing import Optional
+
+# Prometheus çıktısında toplanan sayısal öznitelik ekleri
+COUNTED_SUFFIXES = ("_tokens", "_bytes")
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Span:
+    """
+    Bir turun ölçülen bir aşaması.
+
+    Süre `with` bloğuyla ölçülür; `set` ile token sayısı, bayt boyutu gibi
+    öznitelikler eklenir. Alt aşamalar `parent` üzerinden bağlanır, kök
+    span kapanınca tüm ağaç tracer'ın sink'lerine gönderilir.
+    """
+
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"] = None, **attrs):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.children = []
+        self.error = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def fail(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and self.error is None:
+            self.fail(exc)
+        self.duration = time.perf_counter() - self._started
+        if self.parent is None:
+            self.tracer.emit(self)
+        return False
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self) -> dict:
+        data = {"name": self.name, "start": round(self.start, 6),
+                "duration_ms": round((self.duration or 0) * 1000, 3)}
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+class _NoopSpan:
+    """İzleme kapalıyken kullanılan, hiçbir şey kaydetmeyen span"""
+
+    recording = False
+    name = ""
+    children = ()
+
+    def set(self, **attrs):
+        pass
+
+    def fail(self, error):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Tur aşamalarını span ağacı olarak kaydeder ve sink'lere iletir.
+
+    Kapalıyken `span` her seferinde aynı boş nesneyi döndürür; ölçüm
+    yapılmaz ve bellek ayrılmaz. Pahalı öznitelikler (ör. JSON boyutu)
+    `span.recording` kontrol edilerek yalnızca açıkken hesaplanmalıdır.
+
+    Args:
+        sinks: `emit(span)` metoduna sahip nesneler
+        enabled: False ise hiçbir şey kaydedilmez
+    """
+
+    def __init__(self, sinks=(), enabled: bool = True):
+        self.sinks = list(sinks)
+        self.enabled = enabled and bool(self.sinks)
+
+    def span(self, name: str, parent=None, **attrs):
+        if not self.enabled or (parent is not None and not parent.recording):
+            return NOOP_SPAN
+        return Span(self, name, parent=parent, **attrs)
+
+    def emit(self, span: Span):
+        for sink in self.sinks:
+            try:
+                sink.emit(span)
+            except Exception as e:
+                # Ölçüm hatası asıl işi bozmamalı
+                print(f"İzleme kaydı yazılamadı ({type(sink).__name__}): {e}")
+
+    def close(self):
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close:
+                close()
+
+
+class JsonlSink:
+    """Her kök span'ı (alt aşamalarıyla birlikte) JSONL dosyasına bir satır olarak ekler"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def emit(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class RingBufferSink:
+    """
+    Son kök span'ları bellekte tutar; GUI durum çubuğu için özet üretir.
+
+    Args:
+        size: Tutulacak azami span sayısı
+    """
+
+    def __init__(self, size: int = 100):
+        self.spans = deque(maxlen=size)
+
+    def emit(self, span: Span):
+        self.spans.append(span)
+
+    def last(self) -> Optional[Span]:
+        return self.spans[-1] if self.spans else None
+
+    def summary(self) -> Optional[str]:
+        """Son turun toplam süresini ve aşamalarını tek satırda özetler"""
+        span = self.last()
+        if span is None:
+            return None
+        phases = ", ".join(
+            f"{child.attrs.get('tool', child.name)} {child.duration:.2f}"
+            for child in span.children if child.duration is not None)
+        text = f"Son tur {span.duration:.2f} sn"
+        if phases:
+            text += f" ({phases})"
+        if span.error:
+            text += f" - hata: {span.error}"
+        return text
+
+
+class MetricsSink:
+    """
+    Span sürelerini ve sayısal öznitelikleri toplayıp Prometheus metin biçiminde sunar.
+
+    Dosya, çalışırken de okunabilsin diye (ör. node_exporter textfile
+    toplayıcısı) en çok `interval` saniyede bir ve `close` sırasında yeniden
+    yazılır. Yazma geçici dosya üzerinden yapılır; okuyan yarım dosya görmez.
+
+    Args:
+        path: Verilirse metrikler bu dosyaya yazılır
+        interval: Dosyanın yeniden yazılması için en kısa aralık, saniye (0: her turda)
+    """
+
+    def __init__(self, path: Optional[str] = None, buckets: tuple = DURATION_BUCKETS,
+                 interval: float = 10):
+        self.path = path
+        self.buckets = buckets
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._written_at = None
+        self._counts = defaultdict(int)
+        self._sums = defaultdict(float)
+        self._buckets = defaultdict(lambda: [0] * len(self.buckets))
+        self._errors = defaultdict(int)
+        self._attrs = defaultdict(float)
+
+    def emit(self, span: Span):
+        with self._lock:
+            for item in span.walk():
+                duration = item.duration or 0.0
+                self._counts[item.name] += 1
+                self._sums[item.name] += duration
+                counts = self._buckets[item.name]
+                for i, bound in enumerate(self.buckets):
+                    if duration <= bound:
+                        counts[i] += 1
+                if item.error:
+                    self._errors[item.name] += 1
+                for key, value in item.attrs.items():
+                    if key.endswith(COUNTED_SUFFIXES) and isinstance(value, (int, float)):
+                        self._attrs[(key, item.name)] += value
+            now = time.monotonic()
+            due = self.path and (self._written_at is None or now - self._written_at >= self.interval)
+            if due:
+                self._written_at = now
+        if due:
+            self.write()
+
+    def render(self) -> str:
+        lines = [
+            "# HELP mcp_span_duration_seconds Tur aşamalarının süresi",
+            "# TYPE mcp_span_duration_seconds histogram"
+        ]
+        with self._lock:
+            for name in sorted(self._counts):
+                for bound, count in zip(self.buckets, self._buckets[name]):
+                    lines.append(f'mcp_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'mcp_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {self._counts[name]}')
+                lines.append(f'mcp_span_duration_seconds_sum{{span="{name}"}} {self._sums[name]:.6f}')
+                lines.append(f'mcp_span_duration_seconds_count{{span="{name}"}} {self._counts[name]}')
+
+            lines += ["# HELP mcp_span_errors_total Hatayla biten aşama sayısı",
+                      "# TYPE mcp_span_errors_total counter"]
+            for name in sorted(self._errors):
+                lines.append(f'mcp_span_errors_total{{span="{name}"}} {self._errors[name]}')
+
+            for key in sorted({key for key, _ in self._attrs}):
+                lines += [f"# TYPE mcp_{key}_total counter"]
+                for (attr, name), value in sorted(self._attrs.items()):
+                    if attr == key:
+                        lines.append(f'mcp_{key}_total{{span="{name}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """Metrikleri dosyaya yazar"""
+        if not self.path:
+            return
+        with self._write_lock:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(temp_path, self.path)
+
+    def close(self):
+        self.write()
+
+
+def create_tracer(trace_file: Optional[str] = None, metrics_file: Optional[str] = None,
+                  enabled: bool = False, ring_size: int = 100, metrics_interval: float = 10) -> Tracer:
+    """
+    Ayarlara göre sink'leri kurar.
+
+    Dosyalardan biri verilirse ya da `enabled` True ise izleme açılır ve
+    GUI için bir halka tampon eklenir; hiçbiri yoksa tracer kapalıdır.
+    """
+    sinks = []
+    if enabled or trace_file or metrics_file:
+        sinks.append(RingBufferSink(ring_size))
+    if trace_file:
+        sinks.append(JsonlSink(trace_file))
+    if metrics_file:
+        sinks.append(MetricsSink(metrics_file, interval=metrics_interval))
+    return Tracer(sinks)
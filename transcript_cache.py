@@ -0,0 +1,238 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class TranscriptUnavailable(Exception):
+    """Video için transkript bulunmadığını (önbellekten ya da kaynaktan) bildirir"""
+
+
+class TranscriptCache:
+    """
+    Transkriptleri video kimliği ve dile göre SQLite içinde saklayan kalıcı önbellek.
+
+    Segmentler zlib ile sıkıştırılmış JSON olarak tutulur. Toplam boyut
+    `max_bytes` değerini aşınca en uzun süredir erişilmeyen kayıtlar silinir (LRU).
+    "Transkript yok" sonuçları da `negative_ttl` süresince saklanır.
+
+    Args:
+        path: Veritabanı dosyası (":memory:" testler için kullanılabilir)
+        max_bytes: Sıkıştırılmış verinin azami toplam boyutu
+        negative_ttl: Olumsuz sonuçların saklanma süresi, saniye
+    """
+
+    def __init__(self, path: str = "transcripts.db", max_bytes: int = 200 * 1024 * 1024,
+                 negative_ttl: float = 6 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS transcripts (
+                video_id TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload BLOB,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (video_id, lang)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON transcripts (accessed)")
+        self._db.commit()
+        self._total_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+
+    def get(self, video_id: str, lang: str) -> Optional[list]:
+        """
+        Önbellekteki segmentleri döndürür.
+
+        Returns:
+            Segment listesi ya da kayıt yoksa None
+
+        Raises:
+            TranscriptUnavailable: Süresi dolmamış olumsuz kayıt varsa
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, payload, created FROM transcripts WHERE video_id = ? AND lang = ?",
+                (video_id, lang)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            status, payload, created = row
+            now = time.time()
+            if status == "missing" and now - created > self.negative_ttl:
+                self._delete(video_id, lang)
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE transcripts SET accessed = ? WHERE video_id = ? AND lang = ?",
+                (now, video_id, lang))
+            self._db.commit()
+            self.hits += 1
+
+        if status == "missing":
+            raise TranscriptUnavailable(zlib.decompress(payload).decode("utf-8"))
+        return json.loads(zlib.decompress(payload))
+
+    def put(self, video_id: str, lang: str, segments: list):
+        payload = zlib.compress(json.dumps(segments, ensure_ascii=False).encode("utf-8"))
+        self._store(video_id, lang, "ok", payload)
+
+    def put_missing(self, video_id: str, lang: str, reason: str):
+        self._store(video_id, lang, "missing", zlib.compress(reason.encode("utf-8")))
+
+    def _store(self, video_id: str, lang: str, status: str, payload: bytes):
+        now = time.time()
+        with self._lock:
+            self._delete(video_id, lang)
+            self._db.execute(
+                "INSERT INTO transcripts (video_id, lang, status, payload, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (video_id, lang, status, payload, len(payload), now, now))
+            self._total_bytes += len(payload)
+            self._evict()
+            self._db.commit()
+
+    def _delete(self, video_id: str, lang: str):
+        row = self._db.execute(
+            "SELECT size FROM transcripts WHERE video_id = ? AND lang = ?", (video_id, lang)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM transcripts WHERE video_id = ? AND lang = ?", (video_id, lang))
+            self._total_bytes -= row[0]
+
+    def _evict(self):
+        """Boyut sınırı aşıldıysa en eski erişilen kayıtları siler"""
+        while self._total_bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT video_id, lang, size FROM transcripts ORDER BY accessed LIMIT 32").fetchall()
+            if not rows:
+                break
+            for video_id, lang, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM transcripts WHERE video_id = ? AND lang = ?", (video_id, lang))
+                self._total_bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+        return {"entries": count, "bytes": self._total_bytes, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class TranscriptFetcher:
+    """
+    Transkriptleri önbellek üzerinden getirir.
+
+    Kaynak (provider) dışarıdan verilebildiği için önbellek katmanı ağ
+    erişimi olmadan sahte bir kaynakla denenebilir.
+
+    Args:
+        cache: TranscriptCache örneği
+        provider: (video_id, languages) alıp segment listesi döndüren fonksiyon
+        permanent_errors: Olumsuz önbelleğe yazılacak (kalıcı) hata türleri
+        max_workers: Toplu getirmede aynı anda çalışacak istek sayısı
+    """
+
+    def __init__(self, cache: TranscriptCache, provider: Callable[[str, list], list],
+                 permanent_errors: tuple = (), max_workers: int = 4):
+        self.cache = cache
+        self.provider = provider
+        self.permanent_errors = permanent_errors
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="transcript")
+        self.coalesced = 0
+        self._inflight = {}
+
+    def fetch(self, video_id: str, languages: list) -> list:
+        """
+        Segmentleri önce önbellekten, yoksa kaynaktan getirir.
+
+        Raises:
+            TranscriptUnavailable: Video için transkript yoksa
+        """
+        lang = ",".join(languages)
+        segments = self.cache.get(video_id, lang)
+        if segments is not None:
+            return segments
+
+        try:
+            segments = self.provider(video_id, languages)
+        except self.permanent_errors as e:
+            self.cache.put_missing(video_id, lang, str(e))
+            raise TranscriptUnavailable(str(e))
+
+        segments = [{"text": s["text"], "start": s["start"], "duration": s["duration"]} for s in segments]
+        self.cache.put(video_id, lang, segments)
+        return segments
+
+    async def fetch_async(self, video_id: str, languages: list, timeout: Optional[float] = None) -> list:
+        """
+        `fetch` çağrısını iş parçacığı havuzunda çalıştırır, olay döngüsünü bloklamaz.
+
+        Aynı video için eşzamanlı gelen istekler tek bir uçuştaki getirmeye
+        bağlanır. Bekleyen kalmazsa henüz başlamamış getirme iptal edilir;
+        başlamış olan ise tamamlanıp önbelleğe yazılır.
+
+        Raises:
+            TranscriptUnavailable: Video için transkript yoksa
+            asyncio.TimeoutError: `timeout` aşılırsa
+        """
+        key = (video_id, ",".join(languages))
+        entry = self._inflight.get(key)
+        # Biten (ya da iptal edilen) getirmeye bağlanılmaz; kaydı geri çağırma ile silinmeyi bekliyor olabilir
+        if entry is None or entry["future"].done():
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, self.fetch, video_id, languages)
+            entry = self._inflight[key] = {"future": future, "waiters": 0}
+            future.add_done_callback(lambda f: self._inflight.pop(key, None)
+                                     if self._inflight.get(key) is entry else None)
+        else:
+            self.coalesced += 1
+
+        entry["waiters"] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(entry["future"]), timeout)
+        finally:
+            entry["waiters"] -= 1
+            if entry["waiters"] == 0 and not entry["future"].done():
+                # Kayıt iptalden önce silinir; arada gelen istek iptal edilmiş getirmeye bağlanmasın
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+                entry["future"].cancel()
+
+    async def fetch_many_async(self, video_ids: list, languages: list, timeout: Optional[float] = None) -> dict:
+        """
+        Birden çok videoyu eşzamanlı getirir; eşzamanlılık havuz boyutuyla sınırlıdır.
+
+        Getirmeler havuz boyutu kadar başlatılır, diğerleri sırasını bekler.
+        Böylece `timeout` her video için sırası geldiğinde başlar ve havuzda
+        bekleyen getirmelerin süresi iş başlamadan dolmaz.
+
+        Returns:
+            video_id -> segment listesi ya da hata nesnesi
+        """
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def fetch_one(video_id):
+            async with slots:
+                return await self.fetch_async(video_id, languages, timeout=timeout)
+
+        unique_ids = list(dict.fromkeys(video_ids))
+        results = await asyncio.gather(*(fetch_one(video_id) for video_id in unique_ids),
+                                       return_exceptions=True)
+        return dict(zip(unique_ids, results))
@@ -0,0 +1,118 @@
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Optional
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+class TranscriptIndex:
+    """
+    Bir videonun transkriptini zaman damgalı pasajlar halinde tutar.
+
+    Kısa altyazı satırları yaklaşık `passage_seconds` uzunluğunda pasajlarda
+    birleştirilir. Sayfalama, zaman aralığı sorgusu ve BM25 anahtar kelime
+    araması bu pasajlar üzerinde yapılır; dizin bir kez kurulup yeniden kullanılır.
+
+    Args:
+        segments: {"text", "start", "duration"} sözlüklerinden oluşan liste
+        passage_seconds: Bir pasajın hedef uzunluğu, saniye
+    """
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, segments: list, passage_seconds: float = 30):
+        self.passages = []
+        current = None
+        for segment in segments:
+            end = segment["start"] + segment["duration"]
+            if current is None or segment["start"] - current["start"] >= passage_seconds:
+                current = {"start": segment["start"], "end": end, "texts": []}
+                self.passages.append(current)
+            current["texts"].append(segment["text"])
+            current["end"] = max(current["end"], end)
+        for passage in self.passages:
+            passage["text"] = " ".join(passage.pop("texts"))
+
+        self._term_freqs = [Counter(tokenize(p["text"])) for p in self.passages]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0
+        doc_freq = Counter()
+        for tf in self._term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(self.passages)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    @property
+    def duration(self) -> float:
+        return self.passages[-1]["end"] if self.passages else 0
+
+    def page(self, page: int, page_size: int) -> list:
+        """1'den başlayan sayfa numarasına göre pasajları döndürür"""
+        start = (page - 1) * page_size
+        return [(i, self.passages[i]) for i in range(max(start, 0), min(start + page_size, len(self.passages)))]
+
+    def page_count(self, page_size: int) -> int:
+        return max(1, math.ceil(len(self.passages) / page_size))
+
+    def time_range(self, start: float, end: float) -> list:
+        """[start, end] saniye aralığıyla kesişen pasajları döndürür"""
+        return [(i, p) for i, p in enumerate(self.passages) if p["end"] >= start and p["start"] <= end]
+
+    def search(self, query: str, top_k: int = 5) -> list:
+        """
+        BM25 ile sorguya en uygun pasajları bulur.
+
+        Returns:
+            (skor, pasaj indeksi, pasaj) üçlüleri, skora göre azalan sırada
+        """
+        terms = [t for t in tokenize(query) if t in self._idf]
+        scored = []
+        for i, tf in enumerate(self._term_freqs):
+            score = 0.0
+            norm = self.K1 * (1 - self.B + self.B * self._lengths[i] / (self._avg_length or 1))
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self.K1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((score, i, self.passages[i]))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:top_k]
+
+
+class IndexRegistry:
+    """
+    Video başına kurulan dizinleri bellekte tutan küçük LRU deposu.
+
+    Args:
+        max_videos: Bellekte tutulacak azami dizin sayısı
+    """
+
+    def __init__(self, max_videos: int = 32):
+        self.max_videos = max_videos
+        self._indexes = OrderedDict()
+
+    def get(self, video_id: str) -> Optional[TranscriptIndex]:
+        index = self._indexes.get(video_id)
+        if index is not None:
+            self._indexes.move_to_end(video_id)
+        return index
+
+    def put(self, video_id: str, index: TranscriptIndex):
+        self._indexes[video_id] = index
+        self._indexes.move_to_end(video_id)
+        while len(self._indexes) > self.max_videos:
+            self._indexes.popitem(last=False)
@@ -1,18 +1,119 @@
-from youtube_transcript_api import YouTubeTranscriptApi
+import asyncio
+import os
+from pathlib import Path
+from youtube_transcript_api import (
+    YouTubeTranscriptApi, InvalidVideoId, NoTranscriptFound, TranscriptsDisabled, VideoUnavailable, VideoUnplayable
+)
 from urllib.parse import urlparse, parse_qs
-from mcp.server.fastmcp import FastMCP
+from mcp import types
+from mcp.server.fastmcp import Context, FastMCP
+from transcript_cache import TranscriptCache, TranscriptFetcher
+from transcript_index import IndexRegistry, TranscriptIndex, format_timestamp
+
+LANGUAGES = ['en', 'en-US', 'en-GB']
 
 def extract_video_id(url_or_id):
     """Extract video ID if a URL is given, otherwise return the ID as-is."""
     if "youtube.com" in url_or_id or "youtu.be" in url_or_id:
         query = urlparse(url_or_id).query
         return parse_qs(query).get('v', [None])[0]
-    return url_or_id 
+    return url_or_id
+
+def youtube_provider(video_id, languages):
+    return YouTubeTranscriptApi.get_transcript(video_id, languages=languages)
+
+_fetcher = None
+
+def get_fetcher():
+    """Return the transcript fetcher, opening the cache database on first use.
+
+    Built lazily so that importing this module has no side effects.
+    """
+    global _fetcher
+    if _fetcher is None:
+        cache = TranscriptCache(
+            path=os.getenv("YT_CACHE_PATH", str(Path(__file__).with_name("transcripts.db"))),
+            max_bytes=int(os.getenv("YT_CACHE_MAX_MB", "200")) * 1024 * 1024
+        )
+        _fetcher = TranscriptFetcher(
+            cache,
+            youtube_provider,
+            permanent_errors=(NoTranscriptFound, TranscriptsDisabled, VideoUnavailable, VideoUnplayable,
+                              InvalidVideoId),
+            max_workers=int(os.getenv("YT_MAX_WORKERS", "4"))
+        )
+    return _fetcher
+
+indexes = IndexRegistry(max_videos=int(os.getenv("YT_MAX_INDEXES", "32")))
+# Index builds in progress, by video id; concurrent calls for the same video share one
+_index_builds = {}
+
+# Per-call timeout for transcript fetches, in seconds
+TOOL_TIMEOUT = float(os.getenv("YT_TOOL_TIMEOUT", "60"))
+# Number of segments sent per partial-result progress notification
+CHUNK_SEGMENTS = int(os.getenv("YT_CHUNK_SEGMENTS", "100"))
+
+async def fetch_segments(video_id):
+    return await get_fetcher().fetch_async(video_id, LANGUAGES, timeout=TOOL_TIMEOUT)
+
+async def get_index(video_id):
+    """Return the passage index for a video, building it once from cached segments.
+
+    Concurrent calls for a video that is not indexed yet wait on the same build.
+    A caller that is cancelled does not cancel the build for the others.
+    """
+    index = indexes.get(video_id)
+    if index is not None:
+        return index
+    build = _index_builds.get(video_id)
+    if build is None:
+        build = _index_builds[video_id] = asyncio.ensure_future(build_index(video_id))
+        build.add_done_callback(lambda _: _index_builds.pop(video_id, None))
+    return await asyncio.shield(build)
+
+async def build_index(video_id):
+    segments = await fetch_segments(video_id)
+    loop = asyncio.get_running_loop()
+    index = await loop.run_in_executor(get_fetcher().executor, TranscriptIndex, segments)
+    indexes.put(video_id, index)
+    return index
+
+def format_passages(passages):
+    return "\n".join(
+        f"[#{i} {format_timestamp(p['start'])}-{format_timestamp(p['end'])}] {p['text']}" for i, p in passages)
+
+def wants_chunks(ctx: Context) -> bool:
+    """Whether the client asked for the result as `chunk` progress notifications.
+
+    The client sets `streamChunks` in the request `_meta`; in that case the
+    tool result only summarizes what was streamed, so the text crosses the
+    transport once.
+    """
+    meta = ctx.request_context.meta
+    return bool(meta and meta.progressToken is not None and (meta.model_extra or {}).get("streamChunks"))
+
+async def send_progress(ctx: Context, progress, total=None, message=None, chunk=None):
+    """Send a progress notification if the client asked for one.
+
+    `message` (status text) and `chunk` (the next piece of the result) are sent
+    as extra fields of the notification params; clients that don't know them
+    still see the plain progress/total values.
+    """
+    meta = ctx.request_context.meta
+    token = meta.progressToken if meta else None
+    if token is None:
+        return
+    if not wants_chunks(ctx):
+        chunk = None
+    params = types.ProgressNotificationParams(progressToken=token, progress=progress, total=total,
+                                              message=message, chunk=chunk)
+    await ctx.request_context.session.send_notification(
+        types.ServerNotification(types.ProgressNotification(method="notifications/progress", params=params)))
 
 mcp = FastMCP("yt")
 
 @mcp.tool()
-def get_transcript(video_id: str) -> str:
+async def get_transcript(video_id: str, ctx: Context) -> str:
     """Get transcript for a given YouTube video ID or URL show full transcript to user.
     Args:
         video_id: The video ID or full URL.
@@ -24,12 +125,135 @@ def get_transcript(video_id: str) -> str:
         return "Invalid YouTube URL or ID."
 
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['en', 'en-US', 'en-GB'])
-        transcript_text = " ".join([line['text'] for line in transcript_list])
-        return transcript_text
+        await send_progress(ctx, 0, message=f"Fetching transcript {video_id}")
+        transcript_list = await fetch_segments(video_id)
+        # Report progress per segment chunk; if asked, the text itself goes in the
+        # chunks so the client can stop early and the result only summarizes it
+        total = len(transcript_list)
+        streamed = 0
+        for start in range(0, total, CHUNK_SEGMENTS):
+            end = min(start + CHUNK_SEGMENTS, total)
+            chunk = " ".join(line['text'] for line in transcript_list[start:end]) if wants_chunks(ctx) else None
+            await send_progress(ctx, end, total, message="Segments", chunk=chunk)
+            streamed += len(chunk) if chunk else 0
+        if wants_chunks(ctx):
+            return f"[Transcript sent as progress chunks: {total} segments, {streamed} characters]"
+        return " ".join([line['text'] for line in transcript_list])
+    except asyncio.TimeoutError:
+        return "Transcript retrieval timed out."
     except Exception as e:
-        return f"Transcript retrieval failed: {
-            str(e)}"
-    
+        return f"Transcript retrieval failed: {str(e)}"
+
+@mcp.tool()
+async def get_transcripts(video_ids: list[str]) -> str:
+    """Get transcripts for several YouTube video IDs or URLs at once.
+    Args:
+        video_ids: List of video IDs or full URLs.
+    Returns:
+        str: Each transcript under a "### <video_id>" header.
+    """
+    ids = [extract_video_id(v) for v in video_ids]
+    results = await get_fetcher().fetch_many_async([v for v in ids if v], LANGUAGES, timeout=TOOL_TIMEOUT)
+
+    sections = []
+    for original, video_id in zip(video_ids, ids):
+        if not video_id:
+            sections.append(f"### {original}\nInvalid YouTube URL or ID.")
+            continue
+        result = results[video_id]
+        if isinstance(result, asyncio.TimeoutError):
+            sections.append(f"### {video_id}\nTranscript retrieval timed out.")
+        elif isinstance(result, Exception):
+            sections.append(f"### {video_id}\nTranscript retrieval failed: {str(result)}")
+        else:
+            sections.append(f"### {video_id}\n" + " ".join([line['text'] for line in result]))
+    return "\n\n".join(sections)
+
+@mcp.tool()
+async def get_transcript_page(video_id: str, page: int = 1, page_size: int = 20) -> str:
+    """Get one page of timestamped passages (about 30 seconds each) from a video transcript.
+    Prefer this or search_transcript over get_transcript for long videos.
+    Args:
+        video_id: The video ID or full URL.
+        page: Page number starting at 1.
+        page_size: Number of passages per page.
+    Returns:
+        str: Passages formatted as "[#index start-end] text".
+    """
+    if page < 1 or page_size < 1:
+        return "Invalid argument: page and page_size must be positive integers."
+    video_id = extract_video_id(video_id)
+    if not video_id:
+        return "Invalid YouTube URL or ID."
+
+    try:
+        index = await get_index(video_id)
+        pages = index.page_count(page_size)
+        passages = index.page(page, page_size)
+        if not passages:
+            return f"Page {page} is out of range (1-{pages})."
+        header = f"Video {video_id}, page {page}/{pages}, duration {format_timestamp(index.duration)}"
+        return header + "\n" + format_passages(passages)
+    except asyncio.TimeoutError:
+        return "Transcript retrieval timed out."
+    except Exception as e:
+        return f"Transcript retrieval failed: {str(e)}"
+
+@mcp.tool()
+async def get_transcript_range(video_id: str, start_seconds: float, end_seconds: float) -> str:
+    """Get the transcript passages between two offsets of a video.
+    Args:
+        video_id: The video ID or full URL.
+        start_seconds: Start offset in seconds.
+        end_seconds: End offset in seconds.
+    Returns:
+        str: Passages formatted as "[#index start-end] text".
+    """
+    if end_seconds < start_seconds:
+        return "Invalid argument: end_seconds must not be before start_seconds."
+    video_id = extract_video_id(video_id)
+    if not video_id:
+        return "Invalid YouTube URL or ID."
+
+    try:
+        passages = (await get_index(video_id)).time_range(start_seconds, end_seconds)
+        if not passages:
+            return "No transcript passages in this time range."
+        return format_passages(passages)
+    except asyncio.TimeoutError:
+        return "Transcript retrieval timed out."
+    except Exception as e:
+        return f"Transcript retrieval failed: {str(e)}"
+
+@mcp.tool()
+async def search_transcript(video_id: str, query: str, top_k: int = 5) -> str:
+    """Search a video transcript by keywords and return only the best matching passages.
+    Args:
+        video_id: The video ID or full URL.
+        query: Keywords to search for.
+        top_k: Maximum number of passages to return.
+    Returns:
+        str: Matching passages with their time offsets, best match first.
+    """
+    if top_k < 1:
+        return "Invalid argument: top_k must be a positive integer."
+    if not query.strip():
+        return "Invalid argument: query must not be empty."
+    video_id = extract_video_id(video_id)
+    if not video_id:
+        return "Invalid YouTube URL or ID."
+
+    try:
+        results = (await get_index(video_id)).search(query, top_k=top_k)
+        if not results:
+            return "No matching passages found."
+        return "\n".join(
+            f"[#{i} {format_timestamp(p['start'])}-{format_timestamp(p['end'])} score={score:.2f}] {p['text']}"
+            for score, i, p in results)
+    except asyncio.TimeoutError:
+        return "Transcript retrieval timed out."
+    except Exception as e:
+        return f"Transcript retrieval failed: {str(e)}"
+
 if __name__ == "__main__":
     mcp.run(transport="stdio")